@@ -1,31 +1,41 @@
 import pandas as pd
 import numpy as np
-from faker import Faker
-import random
-from datetime import datetime, timedelta, time
+from datetime import datetime
 import json
 import os
 
-
-start_time = datetime.now()
-print(f"Program started at: {start_time}")
-
-# Set random seed for reproducibility
-np.random.seed(42)
-random.seed(42)
-
-# Initialize Faker
-fake = Faker('en_IN')  # Using Indian locale
-
-
-if not os.path.exists('data1'):
-    os.makedirs('data1')
-    
-if not os.path.exists('data2'):
-    os.makedirs('data2')
-
-if not os.path.exists('data3'):
-    os.makedirs('data3')
+from index_utils import distinct_picks, resolve_relative
+from timestamps import timestamps_between
+from order_engine import generate_orders_bulk, generate_orders_exact, generate_order_items, generate_deliveries
+from order_simulator import OrderSimulator
+from settlement import settle_orders
+from coupon_catalog import CouponCatalog
+from ratings import menu_item_ratings, restaurant_ratings, apply_menu_item_ratings, apply_restaurant_ratings, RatingState, RATING_STATE_PATH
+from sharding import generate_customer_shards
+from chunk_writer import id_chunks
+from output_layer import get_backend, write_table
+from faker_pools import FakerPools
+from id_registry import IDRegistry
+from instrumentation import RunReport, progress
+from cardinality import plan_counts, split_total, orderable_restaurants
+from scd_engine import emails, distinct_samples
+import rng
+
+
+## RANDOM SEED AND SHARDS
+# Every column draws from its own rng substream ('customer.Gender', 'orders.Status', ...) of a
+# RNG_BIT_GENERATOR ('pcg64' or 'philox') seeded from MASTER_SEED. With NUM_SHARDS > 1 customers,
+# addresses, logins and orders are generated in a process pool, shard n jumping every substream n times
+# ahead. Output only depends on MASTER_SEED, RNG_BIT_GENERATOR and NUM_SHARDS.
+MASTER_SEED = 42
+RNG_BIT_GENERATOR = 'pcg64'
+NUM_SHARDS = 1
+
+# Names, companies and street names are picked from pools drawn from Faker once (cached under state/)
+faker_pools = FakerPools('en_IN', MASTER_SEED)
+
+# Last generated ID per table, recorded after a run so incremental runs continue after it
+id_registry = IDRegistry()
 
 ## LOCATIONS
 NUM_LOCATIONS = 50  # Number of locations
@@ -74,8 +84,48 @@ NUM_DELIVERY_AGENT = 150
 DELIVERY_AGENT_START_ID = 1
 DELIVERY_AGENT_END_ID= DELIVERY_AGENT_START_ID + NUM_DELIVERY_AGENT
 
-## CURRENT DATE FOR FILE SAVE 
-CURRENT_DATE = datetime.now()
+## STREAMING
+# Customers per chunk. When set, customers and every table hanging off them are generated and
+# appended to data1 one chunk at a time instead of being built in memory first (None = off).
+STREAM_CHUNK_SIZE = None
+
+## OUTPUT FORMAT
+# 'csv' (plus delivery_agent.json) or 'parquet' (typed, see output_layer.TABLE_SCHEMAS)
+OUTPUT_FORMAT = 'csv'
+OUTPUT_FOLDER = 'data1'
+# The ID registry and the rating state (ratings.RATING_STATE_PATH) describe this folder, the one the
+# generate_new_orders / side_main_dg batches extend. Runs written anywhere else (a run spec's
+# output_folder) leave both alone.
+BASE_FOLDER = 'data1'
+
+## INSTRUMENTATION
+# Every stage is timed (rows, rows/s, memory) into a JSON run report in state/run_reports.
+# PROFILE = 'cprofile' or 'pyinstrument' also profiles PROFILE_STAGES (None = every stage).
+PROFILE = None
+PROFILE_STAGES = None
+
+## CURRENT DATE FOR FILE SAVE (also the "now" every generated date is bounded by)
+CURRENT_DATE = datetime.now().replace(microsecond=0)
+
+## EXACT CARDINALITY
+# When True every NUM_* target above is hit exactly (locations up to the 40 known cities): totals are split
+# over their parents up front, weighted like the random per-parent counts they replace, instead of
+# randint(40, 100) restaurants per city, 1-8 orders per customer, ... Set NUM_ORDERS / NUM_ORDERS_ITEMS.
+EXACT_CARDINALITY = False
+# Planned rows per parent for the customer-side tables, filled by plan_cardinality()
+CARDINALITY_PLAN = {}
+
+## HISTORY: earliest location / customer CreatedDate, an offset from CURRENT_DATE ('-5y') or a datetime
+HISTORY_START = '-5y'
+
+## ORDER SIMULATION
+# When True orders are a time-ordered Poisson process per city from SIMULATION_START to CURRENT_DATE, following
+# the hourly, weekday and festival curves in order_simulator (load tests with realistic peaks), instead of
+# 1-8 orders per customer at uniform dates. About SIMULATION_ORDERS_PER_CUSTOMER orders per customer are
+# expected; not combinable with EXACT_CARDINALITY.
+ORDER_SIMULATION = False
+SIMULATION_START = '-1y'
+SIMULATION_ORDERS_PER_CUSTOMER = 4.5
 
 
 def generate_location_data(location_start_id, location_end_id):
@@ -124,30 +174,37 @@ def generate_location_data(location_start_id, location_end_id):
 
     ]
     
+    if EXACT_CARDINALITY:
+        cities_states = cities_states[:location_end_id - location_start_id]
+
     data = []
     location_id = location_start_id
-    for city, state in cities_states:
-        zipcode = f"{random.randint(110000, 999999)}"
+    pincodes = rng.stream('location.PinCode').integers(110000, 1000000, size=len(cities_states))
+    for (city, state), pincode in zip(cities_states, pincodes):
+        zipcode = f"{pincode}"
         # active_flag = np.random.choice([True , False], p=[0.90, 0.1])
         active_flag = True
-        created_date = fake.date_time_between(start_date='-5y', end_date='-6m')
-        modified_date = fake.date_time_between(start_date=created_date, end_date='now') if random.random() > 0.3 else None
         
         data.append({
             'LocationID': location_id,
             'City': city,
             'State': state,
             'PinCode': zipcode,
-            'ActiveFlag': active_flag,
-            'CreatedDate': created_date,
-            'ModifiedDate': modified_date
+            'ActiveFlag': active_flag
         })
         location_id += 1
         
         # if location_id >= location_end_id:
             # break
     
-    return pd.DataFrame(data)
+    location_df = pd.DataFrame(data)
+
+    # Dates for all locations at once
+    location_df['CreatedDate'] = timestamps_between(HISTORY_START, '-6m', len(location_df), reference=CURRENT_DATE,
+                                                    stream='location.CreatedDate')
+    location_df['ModifiedDate'] = timestamps_between(location_df['CreatedDate'], CURRENT_DATE, fill_rate=0.7,
+                                                     stream='location.ModifiedDate')
+    return location_df
 
 
 def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df):
@@ -352,33 +409,43 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
     ]
     
     data = []
+    coupon_rows = []
     # Get only active locations
     active_locations = location_df[location_df['ActiveFlag'] == True]
     
     # Distribute restaurants across all active locations
     restaurant_id = restaurant_start_id
     
+    # Exact mode: the restaurant target split over the locations up front
+    planned = plan_counts(restaurant_end_id - restaurant_start_id, len(active_locations), 40, 100, 0,
+                          stream='restaurant.Count') if EXACT_CARDINALITY else None
+
+    # Scalar draws of the row loop below come from the table's own substream, the categorical columns are
+    # drawn for every restaurant at once
+    rnd = rng.python_stream('restaurant')
+    num_restaurants = planned if EXACT_CARDINALITY else rng.stream('restaurant.Count').integers(40, 101, size=len(active_locations))
+    active_flags = rng.choice('restaurant.ActiveFlag', [True, False], int(np.sum(num_restaurants)), [0.9, 0.1])
+
     # Ensure each location has at least 2-5 restaurants
-    for _, location_row in active_locations.iterrows():
+    for location_number, (_, location_row) in enumerate(active_locations.iterrows()):
         location_id = location_row['LocationID']
         city_name = location_row['City']
         
         # Create 2-5 restaurants per location
-        num_restaurants_for_location = random.randint(40, 100)
-        location_created_date = location_df[location_df['LocationID'] == location_id]['CreatedDate'].values[0]
+        num_restaurants_for_location = num_restaurants[location_number]
         
         for _ in range(num_restaurants_for_location):
             # Generate restaurant name
-            name = random.choice(restaurant_names)
+            name = rnd.choice(restaurant_names)
             
             # Generate cuisine types (1-3 random cuisine types)
-            num_cuisines = random.randint(1, 3)
-            restaurant_cuisines = random.sample(cuisine_types, num_cuisines)
+            num_cuisines = rnd.randint(1, 3)
+            restaurant_cuisines = rnd.sample(cuisine_types, num_cuisines)
             cuisine_type = ", ".join(restaurant_cuisines)
             
             # Other fields
-            pricing_for_2 = random.randint(200, 2000)
-            phone = f"9{random.randint(100000000, 999999999)}"
+            pricing_for_2 = rnd.randint(200, 2000)
+            phone = f"9{rnd.randint(100000000, 999999999)}"
             
             # Opening and closing hours
             # opening_hour = random.randint(7, 12)
@@ -397,7 +464,7 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
             ]
 
             # Choose shift based on new probabilities
-            chosen_shift = random.choices(shifts, weights=[s[2] for s in shifts])[0]
+            chosen_shift = rnd.choices(shifts, weights=[s[2] for s in shifts])[0]
             start_raw, end_raw, shift_prob = chosen_shift
 
             # Convert to 24-hour time
@@ -405,44 +472,38 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
             closing_hour = end_raw % 24
             operating_hours = f"{opening_hour:02d}:00 - {closing_hour:02d}:00"
             
-            active_flag = np.random.choice([True, False], p=[0.9, 0.1])
+            active_flag = active_flags[restaurant_id - restaurant_start_id]
             open_status = 'Open' if active_flag == True else 'Closed'
     
             # Address and locality
-            locality = f"{fake.street_name()}"
+            locality = f"{faker_pools.street_name()}"
             city_pincode = location_row['PinCode']
-            restaurant_address = f'{random.choice(["Ground Floor,","First Floor,","Second Floor,","Third Floor,", ""])} {locality}, {city_name} - {city_pincode}'
+            restaurant_address = f'{rnd.choice(["Ground Floor,","First Floor,","Second Floor,","Third Floor,", ""])} {locality}, {city_name} - {city_pincode}'
             
             # Coordinates (latitude and longitude for India)
-            latitude = random.uniform(8.4, 37.6)
-            longitude = random.uniform(68.7, 97.25)
-            
-            # Dates
-            created_date = fake.date_time_between(start_date=pd.to_datetime(location_created_date), end_date='-4m')
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
+            latitude = rnd.uniform(8.4, 37.6)
+            longitude = rnd.uniform(68.7, 97.25)
             
             # Generate 3-6 coupons for this restaurant
-            num_coupons = random.randint(3, 5)
-            restaurant_coupons = random.sample(coupon_types, min(num_coupons, len(coupon_types)))
+            num_coupons = rnd.randint(3, 5)
+            restaurant_coupons = rnd.sample(coupon_types, min(num_coupons, len(coupon_types)))
             
-            # Create JSON structure for coupons
-            coupons_json = []
-            for coupon in restaurant_coupons:
+            # Add the coupons to the coupon catalog (serialized to JSON only at export time)
+            for rank, coupon in enumerate(restaurant_coupons):
                 # Slightly vary the coupon parameters to make them unique
-                min_amount_variation = random.uniform(0.9, 1.1)
-                discount_variation = random.uniform(0.9, 1.1)
+                min_amount_variation = rnd.uniform(0.9, 1.1)
+                discount_variation = rnd.uniform(0.9, 1.1)
                 
-                coupon_data = {
-                    "code": f"{coupon[0]}_{restaurant_id}",
-                    "min_amount": int(coupon[1] * min_amount_variation),
-                    "discount_amount": int(coupon[2] * discount_variation),
-                    "description": coupon[3],
-                    "payment_method": coupon[4]  # None or specific payment method
-                }
-                coupons_json.append(coupon_data)
-            
-            # Convert to JSON string
-            coupons_str = json.dumps(coupons_json)
+                coupon_rows.append({
+                    'RestaurantID': restaurant_id,
+                    'code': f"{coupon[0]}_{restaurant_id}",
+                    'min_amount': int(coupon[1] * min_amount_variation),
+                    'discount_amount': int(coupon[2] * discount_variation),
+                    'description': coupon[3],
+                    'payment_method': coupon[4],  # None or specific payment method
+                    'is_first_order': coupon[0] == 'FIRSTORDER',
+                    'rank': rank
+                })
             
             
             data.append({
@@ -458,11 +519,9 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
                 'Locality': locality,
                 'Restaurant_Address': restaurant_address,
                 'Ratings': 0,
-                'Coupons': coupons_str,  # New field for coupons
+                'Coupons': None,  # Filled from the coupon catalog at export time
                 'Latitude': latitude,
-                'Longitude': longitude,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date
+                'Longitude': longitude
             })
             
             restaurant_id += 1
@@ -472,7 +531,15 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
         # if restaurant_id >= restaurant_end_id:
         #     break
     
-    return pd.DataFrame(data)
+    restaurant_df = pd.DataFrame(data)
+
+    # Dates, created after the restaurant's location
+    location_created = restaurant_df['LocationID'].map(location_df.set_index('LocationID')['CreatedDate'])
+    restaurant_df['CreatedDate'] = timestamps_between(location_created, '-4m', reference=CURRENT_DATE,
+                                                      stream='restaurant.CreatedDate')
+    restaurant_df['ModifiedDate'] = timestamps_between(restaurant_df['CreatedDate'], CURRENT_DATE,
+                                                       stream='restaurant.ModifiedDate')
+    return restaurant_df, CouponCatalog(coupon_rows)
 
 
 def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
@@ -547,22 +614,25 @@ def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
     data = []
     menu_id = menu_start_id
     
+    planned = plan_counts(menu_end_id - menu_start_id, len(restaurant_df), 10, 15,
+                          stream='menu_items.Count') if EXACT_CARDINALITY else None
+    rnd = rng.python_stream('menu_items')
+
     # Ensure each restaurant has at least a few menu items
-    for restaurant_id in restaurant_df['RestaurantID']:
+    for restaurant_number, restaurant_id in enumerate(restaurant_df['RestaurantID']):
         # Create 3-10 menu items per restaurant
-        num_items = random.randint(10, 15)
+        num_items = planned[restaurant_number] if EXACT_CARDINALITY else rnd.randint(10, 15)
         
         # Create a set to track what items we've already added to this restaurant
         restaurant_items = set()
-        restaurant_created_date = restaurant_df[restaurant_df['RestaurantID'] == restaurant_id]['CreatedDate'].values[0]
         
         for _ in range(num_items):
-            category = random.choice(categories)
+            category = rnd.choice(categories)
             
             # Try to find an item name not already in use for this restaurant
             attempts = 0
             while attempts < 20:  # Prevent infinite loop
-                item_name = random.choice(item_names[category])
+                item_name = rnd.choice(item_names[category])
                 if item_name not in restaurant_items:
                     restaurant_items.add(item_name)
                     break
@@ -570,7 +640,7 @@ def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
             
             if attempts >= 20:
                 # Just pick any item if we can't find a unique one
-                item_name = random.choice(item_names[category])
+                item_name = rnd.choice(item_names[category])
             
             # Set item type based on item name
             if item_name in ["Chicken Tikka", "Fish Fry", "Seekh Kebab", "Chicken Wings", "Prawn Skewers",
@@ -588,9 +658,9 @@ def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
             else:
                 item_type = "Veg"
             
-            description = random.choice(descriptions).format(item_name)
+            description = rnd.choice(descriptions).format(item_name)
             # price = random.randint(50, 500)
-            price_tier = random.choices(
+            price_tier = rnd.choices(
                 population=[
                     (50, 99),
                     (100, 199),
@@ -602,9 +672,7 @@ def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
                 k=1
             )[0]
 
-            price = random.randint(price_tier[0], price_tier[1])
-            created_date = fake.date_time_between(start_date=pd.to_datetime(restaurant_created_date), end_date=pd.to_datetime(restaurant_created_date) + pd.DateOffset(months=2))
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
+            price = rnd.randint(price_tier[0], price_tier[1])
 
             data.append({
                 "MenuItemID": menu_id,
@@ -615,9 +683,7 @@ def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
                 "Category": category,
                 "Availability": True,
                 "ItemType": item_type,
-                "Ratings" : 0,
-                "CreatedDate": created_date,
-                "ModifiedDate": modified_date
+                "Ratings" : 0
             })
             
             menu_id += 1
@@ -627,7 +693,22 @@ def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
         # if menu_id >= menu_end_id:
         #     break
     
-    return pd.DataFrame(data)
+    menu_df = pd.DataFrame(data)
+
+    # Dates, within two months of the restaurant opening
+    restaurant_created = pd.to_datetime(menu_df['RestaurantID'].map(restaurant_df.set_index('RestaurantID')['CreatedDate']))
+    menu_df['CreatedDate'] = timestamps_between(restaurant_created, restaurant_created + pd.DateOffset(months=2),
+                                                stream='menu_items.CreatedDate')
+    menu_df['ModifiedDate'] = timestamps_between(menu_df['CreatedDate'], CURRENT_DATE, stream='menu_items.ModifiedDate')
+    return menu_df
+
+
+def names_for_genders(gender, stream):
+    # Names from the Faker pools matching every row's gender, any name for 'Other'. Every pool is drawn
+    # for all rows, so a row's name doesn't depend on how many rows are generated with it.
+    return np.where(gender == 'Male', faker_pools.sample('name_male', len(gender), f'{stream}.male'),
+                    np.where(gender == 'Female', faker_pools.sample('name_female', len(gender), f'{stream}.female'),
+                             faker_pools.sample('name', len(gender), stream)))
 
 
 def generate_customer_data(customer_start_id, customer_end_id):
@@ -638,140 +719,120 @@ def generate_customer_data(customer_start_id, customer_end_id):
     cuisine_types = ['North Indian', 'South Indian', 'Chinese', 'Italian', 'Continental', 
                       'Mediterranean', 'Mexican', 'Thai', 'Japanese', 'Street Food']
     
-    data = []
-    for i in range(customer_start_id, customer_end_id):
-        # Basic info
-        gender = np.random.choice(genders , p=[0.49,0.48,0.03])
-        if gender == 'Male':
-            name = fake.name_male()
-        elif gender == 'Female':
-            name = fake.name_female()
-        else:
-            name = fake.name()
-            
-        mobile = f"{random.randint(7000000000, 9999999999)}"
-        email_domain = random.choice(['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'])
-        email = f"{name.lower().replace(' ', '')}{random.randint(1, 999)}@{email_domain}"
-        login_using = random.choice(login_methods)
-        
-        # Generate random birth date (18-60 years old)
-        dob = fake.date_of_birth(minimum_age=15, maximum_age=75)
-        
-        # Generate anniversary date (0-30 years after birth date)
-        years_after_dob = random.randint(18, 30)  # Most people marry after 21
-        anniversary = dob + timedelta(days=365 * years_after_dob)
-        
-        # Check if anniversary is in the future
-        anniversary = anniversary if anniversary < datetime.date(datetime.now()) else None
-        anniversary = np.random.choice([anniversary, None], p=[0.7, 0.3])
-
-        # Generate food preferences
-        food_pref = random.choice(food_preferences)
-        num_cuisines = random.randint(1, 5)
-        cuisine_pref = random.sample(cuisine_types, num_cuisines)
-        
-        preferences = {
-            'FoodPreference': food_pref,
-            'CuisineTypes': cuisine_pref
-        }
-        # Customer reting
-        rating = round(random.uniform(3.0, 5.0), 1)
-        # Dates
-        created_date = fake.date_time_between(start_date='-5y', end_date='-1m')
-        modified_date = fake.date_time_between(start_date=created_date, end_date='now')
-        
-        data.append({
-            'CustomerID': i,
-            'Full_Name': name,
-            'Email': email,
-            'Mobile_no': mobile,
-            'LoginByUsing': login_using,
-            'Gender': gender,
-            'DOB': dob,
-            'Anniversary': anniversary,
-            'Rating': rating,
-            'Preferences': json.dumps(preferences),
-            'CreatedDate': created_date,
-            'ModifiedDate': modified_date
-        })
-    
-    return pd.DataFrame(data)
+    # Every column is drawn for all customers at once, each from its own substream
+    num_rows = customer_end_id - customer_start_id
+
+    # Basic info
+    gender = rng.choice('customer.Gender', genders, num_rows, [0.49, 0.48, 0.03])
+    name = names_for_genders(gender, 'customer.Full_Name')
+    mobile = rng.stream('customer.Mobile_no').integers(7000000000, 10000000000, size=num_rows).astype(str)
+    email = emails(name, stream='customer.Email')
+    login_using = rng.choice('customer.LoginByUsing', login_methods, num_rows)
+
+    # Birth date (15-75 years old)
+    dob = timestamps_between('-75y', '-15y', num_rows, reference=CURRENT_DATE, stream='customer.DOB').astype('datetime64[D]')
+
+    # Anniversary 18-30 years after the birth date, none if it is still in the future and for 30% of customers
+    years_after_dob = rng.stream('customer.Anniversary').integers(18, 31, size=num_rows)  # Most people marry after 21
+    anniversary = dob + (365 * years_after_dob).astype('timedelta64[D]')
+    married = (anniversary < np.datetime64(CURRENT_DATE.date())) & (rng.stream('customer.Anniversary.fill').random(num_rows) < 0.7)
+    anniversary = np.where(married, anniversary.astype(object), None)
+
+    # Food preferences
+    food_pref = rng.choice('customer.FoodPreference', food_preferences, num_rows)
+    cuisine_pref = distinct_samples(cuisine_types, 1, 5, num_rows, stream='customer.CuisineTypes')
+    preferences = [json.dumps({'FoodPreference': food, 'CuisineTypes': cuisines})
+                   for food, cuisines in zip(food_pref, cuisine_pref)]
+
+    # Customer rating
+    rating = np.round(rng.stream('customer.Rating').uniform(3.0, 5.0, size=num_rows), 1)
+
+    customer_df = pd.DataFrame({
+        'CustomerID': np.arange(customer_start_id, customer_end_id),
+        'Full_Name': name,
+        'Email': email,
+        'Mobile_no': mobile,
+        'LoginByUsing': login_using,
+        'Gender': gender,
+        'DOB': dob.astype(object),
+        'Anniversary': anniversary,
+        'Rating': rating,
+        'Preferences': preferences
+    })
+
+    # Dates for all customers at once
+    customer_df['CreatedDate'] = timestamps_between(HISTORY_START, '-1m', len(customer_df), reference=CURRENT_DATE,
+                                                    stream='customer.CreatedDate')
+    customer_df['ModifiedDate'] = timestamps_between(customer_df['CreatedDate'], CURRENT_DATE, stream='customer.ModifiedDate')
+    return customer_df
 
 
 def generate_customer_address_data(customer_address_start_id, customer_address_end_id, customer_df, location_df):
     address_types = ['Home', 'Work', 'Other']
-    
-    data = []
-    address_id = customer_address_start_id
-    
+    building_types = ['Apartments', 'Residency', 'Heights', 'Towers', 'Complex']
+    landmark_prefixes = ["Near ", "Opp. ", "B/h. ", "Beside ", "Behind ", ""]
+    localities = [
+        'Saket', 'Connaught Place', 'Dwarka', 'Vasant Kunj', 'South Extension',
+        'Rohini', 'Karol Bagh', 'Pitampura', 'Janakpuri', 'Lajpat Nagar',
+        'Malviya Nagar', 'Greater Kailash', 'Hauz Khas', 'Mayur Vihar', 'Rajouri Garden'
+    ]
+
     # Get active locations for address assignment
     active_locations = location_df[location_df['ActiveFlag'] == True]
-    
-    # Generate 1-4 addresses per customer in different cities
-    for customer_id in customer_df['CustomerID']:
-        # Number of addresses for this customer
-        num_addresses = random.randint(1, 3)
-        
-        # Randomly select locations for this customer
-        customer_locations = active_locations.sample(min(num_addresses, len(active_locations)))
-        
-        for idx, location_row in enumerate(customer_locations.iterrows()):
-            location_data = location_row[1]  # Get the Series from the tuple
-            location_id = location_data['LocationID']
-            city = location_data['City']
-            state = location_data['State']
-            pincode = location_data['PinCode']
-            
-            flat_no = str(random.randint(1, 50))
-            # house_no = str(random.randint(1, 10)) if random.random() > 0.5 else ""
-            floor = str(random.randint(1, 40)) if random.random() > 0.3 else ""
-            building = fake.company() + " " + random.choice(['Apartments', 'Residency', 'Heights', 'Towers', 'Complex'])
-            landmark = random.choice(["Near ","Opp. ","B/h. ","Beside ","Behind ",""]) + fake.company()
-            
-            # Locality
-            locality =  locality = random.choice([
-                'Saket', 'Connaught Place', 'Dwarka', 'Vasant Kunj', 'South Extension',
-                'Rohini', 'Karol Bagh', 'Pitampura', 'Janakpuri', 'Lajpat Nagar',
-                'Malviya Nagar', 'Greater Kailash', 'Hauz Khas', 'Mayur Vihar', 'Rajouri Garden'
-            ])
-            
-            # Coordinates
-            latitude = random.uniform(8.4, 37.6)
-            longitude = random.uniform(68.7, 97.25)
-            coordinates = f"{latitude},{longitude}"
-            
-            # Primary flag (only one primary address per customer)
-            primary_flag = True if idx == 0 else False
-            address_type = random.choice(address_types)
-            
-            # Dates
-            customer_created_date = customer_df[customer_df['CustomerID'] == customer_id]['CreatedDate'].values[0]
-            created_date = fake.date_time_between(start_date=pd.to_datetime(customer_created_date), end_date='now')
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now') if random.random() > 0.3 else None
 
-            data.append({
-                'AddressID': address_id,
-                'CustomerID': customer_id,
-                'FlatNo/HouseNo': flat_no,
-                'Floor': floor,
-                'Building': building,
-                'Landmark': landmark,
-                'Locality': locality,
-                'City': city,
-                'State': state,
-                'PinCode': pincode,
-                'Coordinates': coordinates,
-                'PrimaryFlag': primary_flag,
-                'AddressType': address_type,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date,
-                'LocationID': location_id  # Adding this temporarily to link addresses to locations
-            })
-            
-            address_id += 1
-            
-    
-    result_df = pd.DataFrame(data)
+    # 1-3 addresses per customer, each in a different city
+    customer_ids = customer_df['CustomerID'].to_numpy()
+    if EXACT_CARDINALITY:
+        num_addresses = CARDINALITY_PLAN['customer_address'][customer_ids - CUSTOMER_START_ID]
+    else:
+        num_addresses = rng.stream('customer_address.Count').integers(1, 4, size=len(customer_ids))
+    num_addresses = np.minimum(num_addresses, len(active_locations))
+    locations = active_locations.iloc[distinct_picks(num_addresses, len(active_locations), 'customer_address.LocationID')]
+
+    # Every column is drawn for all addresses at once, each from its own substream
+    num_rows = len(locations)
+    first_rows = np.cumsum(num_addresses) - num_addresses
+    primary_flag = np.zeros(num_rows, dtype=bool)
+    primary_flag[first_rows[num_addresses > 0]] = True  # only one primary address per customer
+
+    flat_no = rng.stream('customer_address.FlatNo').integers(1, 51, size=num_rows).astype(str)
+    floor = np.where(rng.stream('customer_address.Floor.fill').random(num_rows) > 0.3,
+                     rng.stream('customer_address.Floor').integers(1, 41, size=num_rows).astype(str), '')
+    building = (faker_pools.sample('company', num_rows, 'customer_address.Building') + ' '
+                + rng.choice('customer_address.BuildingType', building_types, num_rows))
+    landmark = (rng.choice('customer_address.LandmarkPrefix', landmark_prefixes, num_rows)
+                + faker_pools.sample('company', num_rows, 'customer_address.Landmark'))
+    locality = rng.choice('customer_address.Locality', localities, num_rows)
+
+    # Coordinates
+    latitude = rng.stream('customer_address.Latitude').uniform(8.4, 37.6, size=num_rows)
+    longitude = rng.stream('customer_address.Longitude').uniform(68.7, 97.25, size=num_rows)
+    coordinates = [f"{lat},{lon}" for lat, lon in zip(latitude.tolist(), longitude.tolist())]
+
+    result_df = pd.DataFrame({
+        'AddressID': np.arange(customer_address_start_id, customer_address_start_id + num_rows),
+        'CustomerID': np.repeat(customer_ids, num_addresses),
+        'FlatNo/HouseNo': flat_no,
+        'Floor': floor,
+        'Building': building,
+        'Landmark': landmark,
+        'Locality': locality,
+        'City': locations['City'].to_numpy(),
+        'State': locations['State'].to_numpy(),
+        'PinCode': locations['PinCode'].to_numpy(),
+        'Coordinates': coordinates,
+        'PrimaryFlag': primary_flag,
+        'AddressType': rng.choice('customer_address.AddressType', address_types, num_rows),
+        'LocationID': locations['LocationID'].to_numpy()  # Adding this temporarily to link addresses to locations
+    })
+
+    # Dates, after the customer signed up
+    customer_created = result_df['CustomerID'].map(customer_df.set_index('CustomerID')['CreatedDate'])
+    result_df.insert(result_df.columns.get_loc('LocationID'), 'CreatedDate',
+                     timestamps_between(customer_created, CURRENT_DATE, stream='customer_address.CreatedDate'))
+    result_df.insert(result_df.columns.get_loc('LocationID'), 'ModifiedDate',
+                     timestamps_between(result_df['CreatedDate'], CURRENT_DATE, fill_rate=0.7,
+                                        stream='customer_address.ModifiedDate'))
     
     return result_df
 
@@ -782,621 +843,435 @@ def generate_login_audit_data(customer_login_audit_start_id, customer_login_audi
     mobile_devices = ['Samsung Galaxy', 'OnePlus', 'Xiaomi', 'Oppo', 'Vivo', 'Realme']
     web_interfaces = ['Chrome', 'Firefox', 'Safari', 'Edge', 'Opera']
     
-    data = []
-    for i in range(customer_login_audit_start_id, customer_login_audit_end_id):
-        # Random customer
-        customer_id = random.choice(customer_df['CustomerID'])
-        customer_created_date = customer_df[customer_df['CustomerID'] == customer_id]['CreatedDate'].values[0]
-        # Login details
-        login_type = np.random.choice(login_types, p=[0.9, 0.1])
-        
-        # Device details depend on login type
-        if login_type == 'App':
-            device_interface = np.random.choice(device_interfaces, p=[0.7, 0.3])
-            mobile_device_name = 'iPhone' if device_interface=='iOS' else random.choice(mobile_devices)
-            web_interface = None
-        else:  # Web or Desktop
-            device_interface = None
-            mobile_device_name = None
-            web_interface = random.choice(web_interfaces)
-        
-        # Login timestamp
-        last_login = fake.date_time_between(start_date=pd.to_datetime(customer_created_date), end_date='now')
-        
-        data.append({
-            'LoginID': i,
-            'CustomerID': customer_id,
-            'LoginType': login_type,
-            'DeviceInterface': device_interface,
-            'MobileDeviceName': mobile_device_name,
-            'WebInterface': web_interface,
-            'LastLogin': last_login
-        })
-    
-    return pd.DataFrame(data)
+    num_rows = max(customer_login_audit_end_id - customer_login_audit_start_id, 0)
+
+    # Random customer
+    customer_ids = customer_df['CustomerID'].to_numpy()
+    customer_id = customer_ids[rng.stream('login_audit.CustomerID').integers(0, len(customer_ids), size=num_rows)]
+
+    # Login details; device details depend on login type
+    login_type = rng.choice('login_audit.LoginType', login_types, num_rows, [0.9, 0.1])
+    is_app = login_type == 'App'
+    device_interface = np.where(is_app, rng.choice('login_audit.DeviceInterface', device_interfaces, num_rows, [0.7, 0.3]), None)
+    mobile_device_name = np.where(device_interface == 'iOS', 'iPhone',
+                                  rng.choice('login_audit.MobileDeviceName', mobile_devices, num_rows))
+    mobile_device_name = np.where(is_app, mobile_device_name, None)
+    web_interface = np.where(is_app, None, rng.choice('login_audit.WebInterface', web_interfaces, num_rows))
+
+    login_audit_df = pd.DataFrame({
+        'LoginID': np.arange(customer_login_audit_start_id, customer_login_audit_start_id + num_rows),
+        'CustomerID': customer_id,
+        'LoginType': login_type,
+        'DeviceInterface': device_interface,
+        'MobileDeviceName': mobile_device_name,
+        'WebInterface': web_interface
+    })
+
+    # Login timestamps, after the customer signed up
+    customer_created = login_audit_df['CustomerID'].map(customer_df.set_index('CustomerID')['CreatedDate'])
+    login_audit_df['LastLogin'] = timestamps_between(customer_created, CURRENT_DATE, stream='login_audit.LastLogin')
+    return login_audit_df
 
 
 def generate_delivery_agent_data(delivery_agents_start_id, delivery_agent_end_id, location_df):
     vehicle_types = ['Bike', 'Scooter']
     
-    data = []
-    
     # Ensure each active location has at least 2-5 delivery agents
     active_locations = location_df[location_df['ActiveFlag'] == True]
-    delivery_agent_id = delivery_agents_start_id
-    
-    for _, location_row in active_locations.iterrows():
-        location_id = location_row['LocationID']
-        location_created_date = location_df[location_df['LocationID'] == location_id]['CreatedDate'].values[0]
-        # Number of agents for this location
-        num_agents = random.randint(100, 150)
-        
-        for _ in range(num_agents):
-            # Basic info
-            gender = np.random.choice(['Male', 'Female', 'Other'], p=[0.9, 0.09, 0.01])
-            
-            if gender == 'Male':
-                name = fake.name_male()
-            elif gender == 'Female':
-                name = fake.name_female()
-            else:
-                name = fake.name()
-                
-            phone = f"{random.randint(6000000000, 9999999999)}"
-            vehicle_type = random.choice(vehicle_types)
-            status = np.random.choice([True, False], p=[0.9, 0.1]) # True = Active , False = Inactive Delivery
-            
-            # Rating (1.0 to 5.0)
-            # rating = round(random.uniform(3.0, 5.0), 1)
-            ranges = [(1.0, 2.0), (2.0, 3.0), (3.0, 4.0), (4.0, 5.0)]
-            probabilities = [0.05, 0.15, 0.20, 0.60]
-            chosen_range = random.choices(ranges, weights=probabilities, k=1)[0]
-            rating = round(random.uniform(*chosen_range), 1)
-            
-            email_domain = random.choice(['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'])
-            email = f"{name.lower().replace(' ', '')}{random.randint(1, 999)}@{email_domain}"
-            
-            # Dates
-            created_date = fake.date_time_between(start_date=pd.to_datetime(location_created_date), end_date='-3m')
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
-            
-            data.append({
-                'DeliveryAgentID': delivery_agent_id,
-                'Full_Name': name,
-                'email': email,
-                'Mobile_no': phone,
-                'VehicleType': vehicle_type,
-                'LocationID': location_id,
-                'Status': status,
-                'Gender': gender,
-                'Rating': rating,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date
-            })
-            
-            delivery_agent_id += 1
-        #     if delivery_agent_id >= delivery_agent_end_id:
-        #         break
-                
-        # if delivery_agent_id >= delivery_agent_end_id:
-        #     break
     
-    return pd.DataFrame(data)
+    # Number of agents per location, then every column drawn for all agents at once
+    if EXACT_CARDINALITY:
+        num_agents = plan_counts(delivery_agent_end_id - delivery_agents_start_id, len(active_locations), 100, 150, 0,
+                                 stream='delivery_agent.Count')
+    else:
+        num_agents = rng.stream('delivery_agent.Count').integers(100, 151, size=len(active_locations))
+    num_rows = int(np.sum(num_agents))
+
+    # Basic info
+    gender = rng.choice('delivery_agent.Gender', ['Male', 'Female', 'Other'], num_rows, [0.9, 0.09, 0.01])
+    name = names_for_genders(gender, 'delivery_agent.Full_Name')
+    phone = rng.stream('delivery_agent.Mobile_no').integers(6000000000, 10000000000, size=num_rows).astype(str)
+    vehicle_type = rng.choice('delivery_agent.VehicleType', vehicle_types, num_rows)
+    status = rng.choice('delivery_agent.Status', [True, False], num_rows, [0.9, 0.1]).astype(bool) # True = Active , False = Inactive Delivery
+
+    # Rating (1.0 to 5.0), mostly 4 - 5
+    probabilities = [0.05, 0.15, 0.20, 0.60]
+    range_low = 1.0 + rng.stream('delivery_agent.Rating.range').choice(len(probabilities), size=num_rows, p=probabilities)
+    rating = np.round(rng.stream('delivery_agent.Rating').uniform(range_low, range_low + 1.0), 1)
+
+    delivery_agent_df = pd.DataFrame({
+        'DeliveryAgentID': np.arange(delivery_agents_start_id, delivery_agents_start_id + num_rows),
+        'Full_Name': name,
+        'email': emails(name, stream='delivery_agent.email'),
+        'Mobile_no': phone,
+        'VehicleType': vehicle_type,
+        'LocationID': np.repeat(active_locations['LocationID'].to_numpy(), num_agents),
+        'Status': status,
+        'Gender': gender,
+        'Rating': rating
+    })
+
+    # Dates, onboarded after the location went live
+    location_created = delivery_agent_df['LocationID'].map(location_df.set_index('LocationID')['CreatedDate'])
+    delivery_agent_df['CreatedDate'] = timestamps_between(location_created, '-3m', reference=CURRENT_DATE,
+                                                          stream='delivery_agent.CreatedDate')
+    delivery_agent_df['ModifiedDate'] = timestamps_between(delivery_agent_df['CreatedDate'], CURRENT_DATE,
+                                                           stream='delivery_agent.ModifiedDate')
+    return delivery_agent_df
 
 
 def generate_orders_data(order_start_id, order_end_id, customer_df, restaurant_df, address_df, location_df):
-    order_statuses = ['Delivered', 'Canceled', 'Failed', 'Returned']
-    payment_methods = ['Cash', 'UPI', 'CreditCard', 'DebitCard']
-    
-    data = []
-    order_id = order_start_id
-    
-    # Add location information to address_df for easier joining
-    address_with_location = pd.DataFrame()
-    
-    # For each customer, generate orders from restaurants in the same city as their address
-    for customer_id in customer_df['CustomerID']:
-        # Get all addresses for this customer
-        customer_addresses = address_df[address_df['CustomerID'] == customer_id]
-        
-        if len(customer_addresses) == 0:
-            continue
-            
-        # Generate 1-5 orders for this customer
-        num_orders = random.randint(1, 8)
-        
-        # Track if this is the first order for this customer
-        is_first_order = True
-        
-        for _ in range(num_orders):
-            
-            # Randomly select one of the customer's addresses
-            address = customer_addresses.sample(1).iloc[0]
-            # print(pd.to_datetime(address['CreatedDate']))
-            address_id = address['AddressID']
-            city = address['City']
-            
-            
-            # Order date (last 90 days)
-            order_date = fake.date_time_between(start_date=pd.to_datetime(address['CreatedDate']), end_date='now')
-            # print(order_date)
-            # Created and modified dates
-            created_date = order_date
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
-            
-            # Find restaurants in the same city
-            city_location_ids = location_df[location_df['City'] == city]['LocationID'].tolist()
-            city_restaurants = restaurant_df[restaurant_df['LocationID'].isin(city_location_ids)]
-            # print(city_restaurants)
-            # Skip if no restaurants found in this city
-            if len(city_restaurants) == 0:
-                continue
-                
-            # Select a random restaurant from the same city
-            filtered_restaurants = city_restaurants[pd.to_datetime(city_restaurants['CreatedDate']) < order_date]
-            # print(filtered_restaurants)
-            # print(len(filtered_restaurants))
-            if len(filtered_restaurants) == 0:
-                continue
-            # print('hello')
-            restaurant = filtered_restaurants.sample(1).iloc[0]
-            # print(restaurant)
-            restaurant_id = restaurant['RestaurantID']
-            # print(restaurant_id)
-            
-             # Parse operating hours from restaurant
-            start_hr, end_hr = [
-                int(time_part.split(":")[0]) for time_part in restaurant['OperatingHours'].replace(" ", "").split("-")
-            ]
-
-            # Construct available hours across midnight
-            if end_hr > start_hr:
-                available_hours = list(range(start_hr, end_hr))
-            else:
-                available_hours = list(range(start_hr, 24)) + list(range(0, end_hr))
+    # Orders are drawn in one batched pass (1-8 orders per customer, restaurants from the address's city)
+    if ORDER_SIMULATION:
+        return order_simulator(customer_df, restaurant_df, address_df, location_df).orders(order_start_id)
+    if EXACT_CARDINALITY:
+        num_orders = CARDINALITY_PLAN['orders'][customer_df['CustomerID'].to_numpy() - CUSTOMER_START_ID]
+        return generate_orders_exact(order_start_id, num_orders, customer_df, restaurant_df, address_df, location_df,
+                                     order_end_date=CURRENT_DATE, run_date=CURRENT_DATE)
+    return generate_orders_bulk(order_start_id, customer_df, restaurant_df, address_df, location_df,
+                                max_orders_per_customer=8, order_end_date=CURRENT_DATE, run_date=CURRENT_DATE)
 
-            # Just pick a random hour — shift probability already handled upstream
-            order_hour = random.choice(available_hours)
 
-            # Final order datetime
-            # order_date_date = pd.to_datetime(address['CreatedDate']) + timedelta(days=random.randint(1, 90))
-            order_date = datetime.combine(order_date.date(), time(hour=order_hour, minute=random.randint(0, 59)))
-            
-            # Order amount (initially set to 0, will be updated later)
-            total_amount = 0
-            final_amount = 0
-            
-            # Status
-            # days_since_order = (datetime.now() - order_date).days
-            status = random.choices(
-                    order_statuses, 
-                    weights=[0.8, 0.1, 0.03, 0.07]
-            )[0]
-            
-            # Payment method
-            payment_method = np.random.choice(payment_methods,p=[0.2,0.7,0.05,0.05])
-            
-            # Created and modified dates
-            created_date = order_date
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
-            # Get restaurant coupons
-            coupon_applied = False
-            coupon_code = None
-            discount_amount = 0
-            delivery_charges = 0
-            restaurant_coupons = None
-            try:
-                restaurant_coupons = json.loads(restaurant['Coupons'])
-            except:
-                restaurant_coupons = None
-            
-            # Randomly decide whether to keep the coupons or set them to None
-            if np.random.rand() > 0.3:
-                restaurant_coupons = restaurant_coupons
-            else:
-                restaurant_coupons = None
-                   
-            data.append({
-                'OrderID': order_id,
-                'CustomerID': customer_id,
-                'RestaurantID': restaurant_id,
-                'OrderDate': order_date,
-                'TotalAmount': total_amount,  # Will be updated in order_items function
-                'DiscountAmount': discount_amount,
-                'DeliveryCharges' : delivery_charges,
-                'FinalAmount' : final_amount,
-                'Status': status,
-                'PaymentMethod': payment_method,
-                'IsFirstOrder': is_first_order,
-                'RestaurantCoupons': restaurant['Coupons'] if restaurant_coupons != None else None,  # Store all restaurant coupons
-                'CouponApplied': coupon_applied,
-                'CouponCode': coupon_code,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date,
-                'AddressID': address_id
-            })
-            
-            order_id += 1
-            is_first_order = False  # Mark subsequent orders as not first orders
-        #     if order_id >= 10:
-        #         break
-                
-        # if order_id >= 10:
-        #     break
-    
-    result_df = pd.DataFrame(data)
-    
-    return result_df
+def order_simulator(customer_df, restaurant_df, address_df, location_df):
+    # Orders of these customers as a time-ordered process from SIMULATION_START to CURRENT_DATE
+    return OrderSimulator(customer_df, restaurant_df, address_df, location_df,
+                          SIMULATION_ORDERS_PER_CUSTOMER * len(customer_df),
+                          resolve_relative(SIMULATION_START, CURRENT_DATE), CURRENT_DATE, run_date=CURRENT_DATE)
 
 
 def generate_order_items_data(order_items_start_id,order_df, menu_df):
-    data = []
-    order_item_id = order_items_start_id
-    
-    # Get the mapping of restaurant to their menu items
-    restaurant_menu_map = {}
-    for _, menu_item in menu_df.iterrows():
-        restaurant_id = menu_item['RestaurantID']
-        menu_id = menu_item['MenuItemID']
-        
-        if restaurant_id not in restaurant_menu_map:
-            restaurant_menu_map[restaurant_id] = []
-            
-        restaurant_menu_map[restaurant_id].append(menu_id)
-    
-    # For each order, generate 1-5 order items
-    for idx, order in order_df.iterrows():
-        order_id = order['OrderID']
-        order_date = order['CreatedDate']
-        restaurant_id = order['RestaurantID']
-        payment_method = order['PaymentMethod']
-        # print('Payment method' , payment_method)
-        is_first_order = order['IsFirstOrder']
-        
-        
-        # Get available menu items for this restaurant
-        menu_ids = restaurant_menu_map.get(restaurant_id, [])
-        # print('menu ids',menu_ids)
-        if not menu_ids:
-            continue
-            
-        filtered_menu_id = []
-        for menu_id in menu_ids:
-            if pd.to_datetime(menu_df[menu_df['MenuItemID'] == menu_id]['CreatedDate'].values[0]) < pd.to_datetime(order_date):
-                filtered_menu_id.append(menu_id)
-        
-        if not filtered_menu_id:
+    # 1-5 items per order, only from menu items created before the order (see order_engine). Exact mode
+    # passes the planned items per order.
+    planned_items = None
+    if EXACT_CARDINALITY:
+        planned_items = CARDINALITY_PLAN['order_items'][order_df['OrderID'].to_numpy() - ORDER_START_ID]
+    return generate_order_items(order_items_start_id, order_df, menu_df, planned_items)
+
+
+def generate_delivery_data(order_df, delivery_agent_df, delivery_start_id,restaurant_df):
+    return generate_deliveries(order_df, delivery_agent_df, delivery_start_id, restaurant_df)
+
+
+def update_menu_item_ratings(order_items_df,menu_df):
+    # One groupby over all order items instead of a filter per menu item
+    apply_menu_item_ratings(menu_df, menu_item_ratings(order_items_df))
+
+
+def update_restaurant_ratings(menu_df,restaurant_df):
+    apply_restaurant_ratings(restaurant_df, restaurant_ratings(menu_df))
+
+
+def drop_temporary_columns(order_df, address_df):
+    # Columns only kept around to link orders to coupons and addresses to locations
+    order_df = order_df.drop(columns=[c for c in ['CouponsOffered', 'AddressID', 'CouponApplied'] if c in order_df.columns])
+    address_df = address_df.drop(columns=[c for c in ['LocationID'] if c in address_df.columns])
+    return order_df, address_df
+
+
+def write_customer_tables(folder, customer_df, address_df, login_audit_df, order_df, order_items_df, delivery_df):
+    # Returns the rows written
+    write_table(customer_df, folder, 'customer', OUTPUT_FORMAT)
+    write_table(address_df, folder, 'customer_address', OUTPUT_FORMAT)
+    write_table(login_audit_df, folder, 'login_audit', OUTPUT_FORMAT)
+    write_table(order_df, folder, 'orders', OUTPUT_FORMAT)
+    write_table(order_items_df, folder, 'order_items', OUTPUT_FORMAT)
+    write_table(delivery_df, folder, 'delivery', OUTPUT_FORMAT)
+    return len(customer_df) + len(address_df) + len(login_audit_df) + len(order_df) + len(order_items_df) + len(delivery_df)
+
+
+def write_dimension_tables(folder, location_df, delivery_agent_df, restaurant_df, coupon_catalog, menu_df):
+    # Location, delivery agent (plus delivery_agent.json in csv mode), restaurant with its coupon JSON
+    # column and menu tables. Returns the rows written
+    write_table(location_df, folder, 'location', OUTPUT_FORMAT)
+    write_table(delivery_agent_df, folder, 'delivery_agent', OUTPUT_FORMAT)
+
+    if OUTPUT_FORMAT == 'csv':
+        agents = delivery_agent_df.assign(CreatedDate=delivery_agent_df['CreatedDate'].dt.strftime('%m/%d/%Y %H:%M'),
+                                          ModifiedDate=delivery_agent_df['ModifiedDate'].dt.strftime('%m/%d/%Y %H:%M'))
+        agents.to_json(os.path.join(folder, 'delivery_agent.json'),orient='records', lines=False, indent=4)
+
+    restaurant_df = restaurant_df.assign(Coupons=coupon_catalog.to_json_column(restaurant_df['RestaurantID']))
+    write_table(restaurant_df, folder, 'restaurant', OUTPUT_FORMAT)
+    write_table(menu_df, folder, 'menu_items', OUTPUT_FORMAT)
+    return len(location_df) + len(delivery_agent_df) + len(restaurant_df) + len(menu_df)
+
+
+def plan_cardinality():
+    # Exact mode: addresses and orders per customer and items per order, planned for the whole run so
+    # chunks and shards share one plan and the totals come out exact
+    CARDINALITY_PLAN['customer_address'] = plan_counts(NUM_CUSTOMER_ADDRESS, NUM_CUSTOMERS, 1, 3, stream='customer_address.Count')
+    CARDINALITY_PLAN['orders'] = plan_counts(NUM_ORDERS, NUM_CUSTOMERS, 1, 8, stream='orders.Count')
+    item_weights = rng.stream('order_items.Count').choice([1, 2, 3, 4, 5], size=NUM_ORDERS, p=[0.5, 0.3, 0.1, 0.06, 0.04])
+    CARDINALITY_PLAN['order_items'] = split_total(NUM_ORDERS_ITEMS, item_weights, 1, stream='order_items.Count')
+
+
+def order_restaurant_data(restaurant_df, menu_df):
+    # Restaurants orders are drawn from. In exact mode only the ones with a menu item at order time, so
+    # settlement never drops an order for having no items.
+    return orderable_restaurants(restaurant_df, menu_df) if EXACT_CARDINALITY else restaurant_df
+
+
+def stream_customer_tables(chunk_size, location_df, restaurant_df, menu_df, delivery_agent_df, coupon_catalog, folder=None):
+    # Customer, address, login audit, order, order item and delivery rows generated chunk_size customers
+    # at a time and appended to the CSVs in folder. Only ratings are carried across chunks (as running
+    # sums), so peak memory follows the chunk size instead of NUM_CUSTOMERS. Returns the rating state and
+    # the last ID used per table.
+    rating_state = RatingState()
+    address_id = CUSTOMER_ADDRESS_START_ID
+    login_id = CUSTOMER_LOGIN_AUDIT_START_ID
+    order_id = ORDER_START_ID
+    order_item_id = ORDER_ITEMS_START_ID
+    delivery_id = DELIVERY_START_ID
+    folder = folder or OUTPUT_FOLDER
+    order_restaurant_df = order_restaurant_data(restaurant_df, menu_df)
+
+    chunks = id_chunks(CUSTOMER_START_ID, NUM_CUSTOMERS, chunk_size)
+    with get_backend(OUTPUT_FORMAT).chunk_writer(folder) as writer:
+        for customer_start_id, customer_end_id in progress(chunks, -(-NUM_CUSTOMERS // chunk_size), 'customer chunks'):
+            customer_df = generate_customer_data(customer_start_id, customer_end_id)
+            address_df = generate_customer_address_data(address_id, 0, customer_df, location_df)
+
+            # Logins are spread over the customers, keep the configured logins per customer
+            logins_done = NUM_CUSTOMER_LOGIN_AUDIT * (customer_end_id - CUSTOMER_START_ID) // NUM_CUSTOMERS
+            login_audit_df = generate_login_audit_data(login_id, CUSTOMER_LOGIN_AUDIT_START_ID + logins_done, customer_df)
+
+            order_df = generate_orders_data(order_id, 0, customer_df, order_restaurant_df, address_df, location_df)
+            num_orders = len(order_df)
+            order_items_df = generate_order_items_data(order_item_id, order_df, menu_df)
+            order_df = settle_orders(order_df, order_items_df, coupon_catalog.offered_for_orders(order_df))
+            order_df = order_df[(order_df['TotalAmount'] != 0)]
+            delivery_df = generate_delivery_data(order_df, delivery_agent_df, delivery_id, restaurant_df)
+            rating_state.add(order_items_df, os.path.normpath(folder))
+
+            address_id += len(address_df)
+            login_id += len(login_audit_df)
+            order_id += num_orders
+            order_item_id += len(order_items_df)
+            delivery_id += len(delivery_df)
+
+            order_df, address_df = drop_temporary_columns(order_df, address_df)
+            writer.write('customer', customer_df)
+            writer.write('customer_address', address_df)
+            writer.write('login_audit', login_audit_df)
+            writer.write('orders', order_df)
+            writer.write('order_items', order_items_df)
+            writer.write('delivery', delivery_df)
+
+    last_ids = {
+        'customer': CUSTOMER_START_ID + NUM_CUSTOMERS - 1,
+        'customer_address': address_id - 1,
+        'login_audit': login_id - 1,
+        'orders': order_id - 1,
+        'order_items': order_item_id - 1,
+        'delivery': delivery_id - 1,
+    }
+    return rating_state, last_ids
+
+
+
+def order_event_frames():
+    # The (orders, order_items, delivery) frames behind the event stream (event_stream.EventEmitter), in
+    # timestamp order: one per simulation window with ORDER_SIMULATION, else every order at once sorted by
+    # date. Dimension and customer tables are built in memory, nothing is written.
+    rng.seed_streams(MASTER_SEED, RNG_BIT_GENERATOR)
+    if EXACT_CARDINALITY:
+        if ORDER_SIMULATION:
+            raise ValueError("ORDER_SIMULATION can't be combined with EXACT_CARDINALITY, simulated order counts are random")
+        plan_cardinality()
+
+    location_df = generate_location_data(LOCATION_START_ID, LOCATION_END_ID)
+    restaurant_df, coupon_catalog = generate_restaurant_data(RESTAURANT_START_ID, RESTAURANT_END_ID, location_df)
+    menu_df = generate_menu_data(MENU_START_ID, MENU_END_ID, restaurant_df)
+    delivery_agent_df = generate_delivery_agent_data(DELIVERY_AGENT_START_ID, DELIVERY_AGENT_END_ID, location_df)
+    customer_df = generate_customer_data(CUSTOMER_START_ID, CUSTOMER_END_ID)
+    address_df = generate_customer_address_data(CUSTOMER_ADDRESS_START_ID, CUSTOMER_ADDRESS_END_ID, customer_df, location_df)
+    order_restaurant_df = order_restaurant_data(restaurant_df, menu_df)
+
+    if ORDER_SIMULATION:
+        order_batches = order_simulator(customer_df, order_restaurant_df, address_df, location_df).stream(ORDER_START_ID)
+    else:
+        order_df = generate_orders_data(ORDER_START_ID, ORDER_END_ID, customer_df, order_restaurant_df, address_df, location_df)
+        order_batches = [order_df.sort_values(['CreatedDate', 'OrderID'], kind='stable')]
+
+    order_item_id = ORDER_ITEMS_START_ID
+    delivery_id = DELIVERY_START_ID
+    for order_df in order_batches:
+        if not len(order_df):
             continue
-        # print('filtered menu ids',filtered_menu_id)
-        # Generate 1-5 random order items
-        # num_items = random.randint(1, 5)
-        num_items = random.choices(
-            population=[1, 2, 3, 4, 5],
-            weights=[0.5, 0.3, 0.1, 0.06, 0.04],
-            k=1
-        )[0]
-        # Select unique menu items
-        selected_menu_ids = random.sample(filtered_menu_id, min(num_items, len(filtered_menu_id)))
-        
-        order_total = 0
-        
-        for menu_id in selected_menu_ids:
-            # Get the menu item details
-            menu_item = menu_df[menu_df['MenuItemID'] == menu_id].iloc[0]
-            price = menu_item['Price']
-            
-            # Generate random quantity
-            # quantity = random.randint(1, 3)
-            quantity = random.choices(
-                population=[1, 2, 3],
-                weights=[0.65, 0.25, 0.1],
-                k=1
-            )[0]
-            
-            # Calculate subtotal
-            subtotal = price * quantity
-            order_total += subtotal
-            
-            # Generate rating (if delivered)
-            if order['Status'] == 'Delivered':
-                ratings = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.1, 0.1, 0.3, 0.4])
-            else:
-                ratings = None
-            
-            # Dates
-            created_date = order['CreatedDate']
-            modified_date = order['ModifiedDate']
-            
-            data.append({
-                'OrderItemID': order_item_id,
-                'OrderID': order_id,
-                'MenuItemID': menu_id,
-                'Quantity': quantity,
-                'Price': price,
-                'Subtotal': subtotal,
-                'Ratings' : ratings,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date
-            })
-            
-            order_item_id += 1
+        order_items_df = generate_order_items_data(order_item_id, order_df, menu_df)
+        order_df = settle_orders(order_df, order_items_df, coupon_catalog.offered_for_orders(order_df))
+        order_df = order_df[(order_df['TotalAmount'] != 0)]
+        delivery_df = generate_delivery_data(order_df, delivery_agent_df, delivery_id, restaurant_df)
+        order_item_id += len(order_items_df)
+        delivery_id += len(delivery_df)
 
-    
-        # Now that we know the total order amount, we can apply coupons
-        final_amount = order_total  # Default to original amount
-        coupon_applied = False
-        coupon_code = None
-        discount_amount = 0
-        delivery_charges = 0
-
-        if order_total < 199:
-            delivery_charges = random.randint(80,100)
-        elif order_total >= 200 and order_total < 399 :
-            delivery_charges = random.randint(50,80)
-        elif order_total >= 400 and order_total < 599 :
-            delivery_charges = random.randint(30, 50)
-        else :
-            delivery_charges = 0
-
-        # Check if there are available coupons
-        if 'RestaurantCoupons' in order_df.columns and order['RestaurantCoupons'] is not None:
-            try:
-                restaurant_coupons = json.loads(order['RestaurantCoupons'])
-                eligible_coupons = []
-                
-                # Find eligible coupons based on:
-                # 1. Order amount meets minimum
-                # 2. Payment method matches (if payment-specific)
-                # 3. First order status (if first-order coupon)
-                for coupon in restaurant_coupons:
-                    # Skip if the order amount doesn't meet the minimum
-                    if order_total < coupon['min_amount']:
-                        continue
-                    
-                    # Skip if it's a payment-specific coupon and payment method doesn't match
-                    if coupon['payment_method'] is not None and coupon['payment_method'] != payment_method:
-                        continue
-                    
-                    # Skip if it's a first-order coupon but this isn't the first order
-                    if 'FIRSTORDER' in coupon['code'] and not is_first_order:
-                        continue
-                    
-                    # Add to eligible coupons
-                    eligible_coupons.append(coupon)
-                
-                # Apply the best coupon (most discount)
-                if eligible_coupons:
-                    # Sort by discount amount, highest first
-                    eligible_coupons.sort(key=lambda x: x['discount_amount'], reverse=True)
-                    best_coupon = eligible_coupons[0]
-                    
-                    coupon_code = best_coupon['code']
-                    discount_amount = best_coupon['discount_amount']
-                    final_amount = max(0, order_total - discount_amount)
-                    coupon_applied = True
-                    
-                    # Update the order with the coupon information
-                    order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-                    order_df.loc[order_df['OrderID'] == order_id, 'CouponApplied'] = coupon_applied
-                    order_df.loc[order_df['OrderID'] == order_id, 'CouponCode'] = coupon_code
-                    order_df.loc[order_df['OrderID'] == order_id, 'DiscountAmount'] = discount_amount
-                    
-                    order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-                    order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-
-                else:
-                    # No eligible coupons, update order with the original amount
-                    # order_df.at[idx, 'TotalAmount'] = order_total
-                    order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-                    order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-                    order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-            except Exception as e:
-                # If there's an error applying coupons, just use the original amount
-                order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-                order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-                order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-        else:
-            # No coupons available, update with the original amount
-           order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-           order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-           order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-    
-    return pd.DataFrame(data)
+        order_df, _ = drop_temporary_columns(order_df, address_df)
+        yield order_df, order_items_df, delivery_df
 
 
-def generate_delivery_data(order_df, delivery_agent_df, delivery_start_id,restaurant_df):
-    # delivery_statuses = ['Delivered', 'In Transit', 'Assigned', 'Failed']
-    
-    data = []
-    delivery_id = delivery_start_id
-    
-    # For each order, generate a delivery record
-    for _, order in order_df.iterrows():
-        order_id = order['OrderID']
-        address_id = order['AddressID']
-        order_date = order['CreatedDate']
+def main():
+    start_time = datetime.now()
+    print(f"Program started at: {start_time}")
+    run_report = RunReport('Main_DG', PROFILE, PROFILE_STAGES)
+
+    # Set random seed for reproducibility
+    rng.seed_streams(MASTER_SEED, RNG_BIT_GENERATOR)
+
+    if not os.path.exists(OUTPUT_FOLDER):
+        os.makedirs(OUTPUT_FOLDER)
         
-        total_amount = order['TotalAmount']
-        if total_amount == 0:
-            continue
-        # Only generate delivery for non-canceled orders
-        if order['Status'] not in ['Canceled']:
-            # Find delivery agents in the same city as the restaurant
-            restaurant_id = order['RestaurantID']
-            restaurant_location_id = restaurant_df[restaurant_df['RestaurantID'] == restaurant_id]['LocationID'].values[0]            
-            available_agents = delivery_agent_df[delivery_agent_df['LocationID'] == restaurant_location_id]
-            # Get delivery agents (we'll assume agents can deliver to any location)
-            if len(available_agents) == 0:
-                continue
-            
-            filtered_available_agents = available_agents[pd.to_datetime(available_agents['CreatedDate']) < order_date]
-            
-            if len(filtered_available_agents) == 0:
-                continue
-            
-            # Select a random delivery agent
-            agent = filtered_available_agents.sample(1).iloc[0]
-            agent_id = agent['DeliveryAgentID']
-            
-            # Set status based on order status
-            if order['Status'] == 'Failed':
-                delivery_status = 'Failed'
-            elif order['Status'] == 'Returned':
-                delivery_status = 'Returned'
-            else:
-                delivery_status = 'Delivered'
-            
-            # Estimated time (10-60 minutes)
-            estimated_time = random.randint(15, 55)
-
-            if delivery_status in ['Delivered', 'Returned']:
-                # Increase the chance of fast delivery
-                delay_type = np.random.choice(['fast', 'normal', 'slow'], p=[0.4, 0.4, 0.2])
-
-                if delay_type == 'fast':
-                    delivered_time = random.randint(max(10, estimated_time - 10), estimated_time)
-                elif delay_type == 'normal':
-                    delivered_time = random.randint(estimated_time + 1, estimated_time + 10)
-                else:  # slow
-                    delivered_time = random.randint(estimated_time + 11, estimated_time + 30)
-            else:
-                delivered_time = None
-            
-            # Delivery date based on order date
-            if delivery_status in ['Delivered','Returned']:
-                # Add 30-90 minutes to order date
-                minutes_to_add = random.randint(30, 90)
-                delivery_date = pd.to_datetime(order['OrderDate']) + timedelta(minutes=int(delivered_time))
-            else:
-                delivery_date = None
-            
-            if delivered_time != None:
-                delivered_time = int(delivered_time)
-            
-            # Dates
-            created_date = order['CreatedDate']
-            modified_date = order['ModifiedDate']
-            
-            data.append({
-                'DeliveryID': delivery_id,
-                'OrderID': order_id,
-                'DeliveryAgentID': agent_id,
-                'DeliveryStatus': delivery_status,
-                'EstimatedTime': estimated_time,
-                'DeliveredTime' : delivered_time,
-                'AddressID': address_id,
-                'DeliveryDate': delivery_date,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date
-            })
-            
-            delivery_id += 1
+    if not os.path.exists('data2'):
+        os.makedirs('data2')
 
-            # if(delivery_id >= 100):
-            #     break
-    
-    return pd.DataFrame(data)
+    if not os.path.exists('data3'):
+        os.makedirs('data3')
 
+    if EXACT_CARDINALITY:
+        if ORDER_SIMULATION:
+            raise ValueError("ORDER_SIMULATION can't be combined with EXACT_CARDINALITY, simulated order counts are random")
+        plan_cardinality()
 
-def update_menu_item_ratings(order_items_df,menu_df):
-    for _,items in menu_df.iterrows():
-        menu_id = items['MenuItemID']
-        avg_of_menu_item_ratings = order_items_df[order_items_df['MenuItemID'] == menu_id]['Ratings'].agg('mean')
-        menu_df.loc[menu_df['MenuItemID'] == menu_id,'Ratings'] = round(avg_of_menu_item_ratings,1)
+    with run_report.stage('location') as stage:
+        location_df = generate_location_data(LOCATION_START_ID, LOCATION_END_ID)
+        stage.rows = len(location_df)
 
 
-def update_restaurant_ratings(menu_df,restaurant_df):
-    for _,restaurant in restaurant_df.iterrows():
-        restaurant_id = restaurant['RestaurantID']
-        avg_of_restaurant_ratings = menu_df[menu_df['RestaurantID'] == restaurant_id]['Ratings'].agg('mean')
-        restaurant_df.loc[restaurant_df['RestaurantID'] == restaurant_id, 'Ratings'] = round(avg_of_restaurant_ratings,1)
+    with run_report.stage('restaurant') as stage:
+        restaurant_df, coupon_catalog = generate_restaurant_data(RESTAURANT_START_ID, RESTAURANT_END_ID, location_df)
+        stage.rows = len(restaurant_df)
 
 
+    with run_report.stage('menu') as stage:
+        menu_df = generate_menu_data(MENU_START_ID, MENU_END_ID, restaurant_df)
+        stage.rows = len(menu_df)
 
 
+    if STREAM_CHUNK_SIZE:
+        with run_report.stage('delivery_agent') as stage:
+            delivery_agent_df = generate_delivery_agent_data(DELIVERY_AGENT_START_ID, DELIVERY_AGENT_END_ID, location_df)
+            stage.rows = len(delivery_agent_df)
 
-location_df = generate_location_data(LOCATION_START_ID, LOCATION_END_ID)
-print('Location Data Generated')
+        # Customer, address, login audit, order, order item and delivery files written chunk by chunk
+        with run_report.stage('customer_tables_streamed') as stage:
+            rating_state, last_ids = stream_customer_tables(STREAM_CHUNK_SIZE, location_df, restaurant_df, menu_df, delivery_agent_df, coupon_catalog)
+            stage.rows = NUM_CUSTOMERS
 
+        with run_report.stage('menu_ratings'):
+            apply_menu_item_ratings(menu_df, rating_state.menu_item_ratings())
 
-restaurant_df = generate_restaurant_data(RESTAURANT_START_ID, RESTAURANT_END_ID, location_df)
-print('Restaurant Data Generated')
+    else:
+        if NUM_SHARDS > 1:
+            # Customers and everything hanging off them (addresses, logins, orders) per shard
+            with run_report.stage('customer_shards') as stage:
+                customer_df, address_df, login_audit_df, order_df = generate_customer_shards(
+                    NUM_SHARDS, MASTER_SEED, CURRENT_DATE, location_df, order_restaurant_data(restaurant_df, menu_df),
+                    CUSTOMER_START_ID, NUM_CUSTOMERS, CUSTOMER_ADDRESS_START_ID,
+                    CUSTOMER_LOGIN_AUDIT_START_ID, NUM_CUSTOMER_LOGIN_AUDIT, ORDER_START_ID,
+                    settings={'HISTORY_START': HISTORY_START, 'faker_pools': faker_pools, 'CUSTOMER_START_ID': CUSTOMER_START_ID,
+                              'EXACT_CARDINALITY': EXACT_CARDINALITY, 'CARDINALITY_PLAN': CARDINALITY_PLAN,
+                              'ORDER_SIMULATION': ORDER_SIMULATION, 'SIMULATION_START': SIMULATION_START,
+                              'SIMULATION_ORDERS_PER_CUSTOMER': SIMULATION_ORDERS_PER_CUSTOMER},
+                    bit_generator=RNG_BIT_GENERATOR)
+                stage.rows = len(customer_df) + len(address_df) + len(login_audit_df) + len(order_df)
 
+            with run_report.stage('delivery_agent') as stage:
+                delivery_agent_df = generate_delivery_agent_data(DELIVERY_AGENT_START_ID, DELIVERY_AGENT_END_ID, location_df)
+                stage.rows = len(delivery_agent_df)
 
-menu_df = generate_menu_data(MENU_START_ID, MENU_END_ID, restaurant_df)
-print('Menu Data Generated')
+        else:
+            with run_report.stage('customer') as stage:
+                customer_df = generate_customer_data(CUSTOMER_START_ID, CUSTOMER_END_ID)
+                stage.rows = len(customer_df)
 
 
-customer_df = generate_customer_data(CUSTOMER_START_ID, CUSTOMER_END_ID)
-print('Customer Data Generated')
+            with run_report.stage('address') as stage:
+                address_df = generate_customer_address_data(CUSTOMER_ADDRESS_START_ID, CUSTOMER_ADDRESS_END_ID, customer_df, location_df)
+                stage.rows = len(address_df)
 
 
-address_df = generate_customer_address_data(CUSTOMER_ADDRESS_START_ID, CUSTOMER_ADDRESS_END_ID, customer_df, location_df)
-print('Customer Address Data Generated')
+            with run_report.stage('login_audit') as stage:
+                login_audit_df = generate_login_audit_data(CUSTOMER_LOGIN_AUDIT_START_ID, CUSTOMER_LOGIN_AUDIT_END_ID, customer_df)
+                stage.rows = len(login_audit_df)
 
 
-login_audit_df = generate_login_audit_data(CUSTOMER_LOGIN_AUDIT_START_ID, CUSTOMER_LOGIN_AUDIT_END_ID, customer_df)
-print('Login Audit Data Generated')
+            with run_report.stage('delivery_agent') as stage:
+                delivery_agent_df = generate_delivery_agent_data(DELIVERY_AGENT_START_ID, DELIVERY_AGENT_END_ID, location_df)
+                stage.rows = len(delivery_agent_df)
 
 
-delivery_agent_df = generate_delivery_agent_data(DELIVERY_AGENT_START_ID, DELIVERY_AGENT_END_ID, location_df)
-print('Delivery Agent Data Generated')
+            with run_report.stage('orders') as stage:
+                order_df = generate_orders_data(ORDER_START_ID, ORDER_END_ID, customer_df, order_restaurant_data(restaurant_df, menu_df), address_df, location_df)
+                stage.rows = len(order_df)
 
 
-order_df = generate_orders_data(ORDER_START_ID, ORDER_END_ID, customer_df, restaurant_df, address_df, location_df)
-print('order data generated')
+        with run_report.stage('order_items') as stage:
+            order_items_df = generate_order_items_data(ORDER_ITEMS_START_ID,order_df, menu_df)
+            stage.rows = len(order_items_df)
 
+        with run_report.stage('settlement') as stage:
+            order_df = settle_orders(order_df, order_items_df, coupon_catalog.offered_for_orders(order_df))
+            order_df = order_df[(order_df['TotalAmount'] != 0)]
+            stage.rows = len(order_df)
 
-order_items_df = generate_order_items_data(ORDER_ITEMS_START_ID,order_df, menu_df)
-print('order item data generated')
-order_df = order_df[(order_df['TotalAmount'] != 0)]
-print('order totalprice and all updated')
 
+        with run_report.stage('delivery') as stage:
+            delivery_df = generate_delivery_data(order_df, delivery_agent_df, DELIVERY_START_ID,restaurant_df)
+            stage.rows = len(delivery_df)
 
-delivery_df = generate_delivery_data(order_df, delivery_agent_df, DELIVERY_START_ID,restaurant_df)
-print('delivered')
 
+        # Remove temporary columns
+        order_df, address_df = drop_temporary_columns(order_df, address_df)
 
 
-    # Remove temporary columns
-if 'RestaurantCoupons' in order_df.columns:
-    order_df = order_df.drop(columns=['RestaurantCoupons'])
-    
-if 'AddressID' in order_df.columns:
-    order_df = order_df.drop(columns=['AddressID'])
+        with run_report.stage('menu_ratings') as stage:
+            update_menu_item_ratings(order_items_df,menu_df)
+            rating_state = RatingState.from_order_items(order_items_df, os.path.normpath(OUTPUT_FOLDER))
+            stage.rows = len(order_items_df)
 
-if 'CouponApplied' in order_df.columns:
-    order_df = order_df.drop(columns=['CouponApplied'])
+        with run_report.stage('write_customer_tables') as stage:
+            stage.rows = write_customer_tables(OUTPUT_FOLDER, customer_df, address_df, login_audit_df, order_df,
+                                               order_items_df, delivery_df)
 
-if 'LocationID' in address_df.columns:
-    address_df =  address_df.drop(columns=['LocationID'])
+        last_ids = {
+            'customer': customer_df['CustomerID'].max(),
+            'customer_address': address_df['AddressID'].max(),
+            'login_audit': login_audit_df['LoginID'].max(),
+            'orders': order_df['OrderID'].max(),
+            'order_items': order_items_df['OrderItemID'].max(),
+            'delivery': delivery_df['DeliveryID'].max(),
+        }
 
+    last_ids.update({
+        'location': location_df['LocationID'].max(),
+        'restaurant': restaurant_df['RestaurantID'].max(),
+        'menu_items': menu_df['MenuItemID'].max(),
+        'delivery_agent': delivery_agent_df['DeliveryAgentID'].max(),
+    })
+    if os.path.normpath(OUTPUT_FOLDER) == BASE_FOLDER:
+        for table, last_id in last_ids.items():
+            if not pd.isna(last_id):  # an empty table has no last ID
+                id_registry.record(table, last_id)
+        print('ID watermarks recorded')
+        # A regenerated data1 starts the rating totals over, batches written against the old one no longer apply
+        rating_state.save(RATING_STATE_PATH)
 
-update_menu_item_ratings(order_items_df,menu_df)
-print('menu rattings updated')
-update_restaurant_ratings(menu_df,restaurant_df)    
-print('restaurant rattings updated')
+    with run_report.stage('restaurant_ratings') as stage:
+        update_restaurant_ratings(menu_df,restaurant_df)
+        stage.rows = len(restaurant_df)
 
-location_df.to_csv('data1/location.csv',index=False)
-customer_df.to_csv('data1/customer.csv', index=False)
-address_df.to_csv('data1/customer_address.csv', index=False)
-delivery_agent_df.to_csv('data1/delivery_agent.csv', index=False)
+    with run_report.stage('write_dimension_tables') as stage:
+        stage.rows = write_dimension_tables(OUTPUT_FOLDER, location_df, delivery_agent_df, restaurant_df,
+                                            coupon_catalog, menu_df)
 
-delivery_agent_df['CreatedDate'] = delivery_agent_df['CreatedDate'].dt.strftime('%m/%d/%Y %H:%M')
-delivery_agent_df['ModifiedDate'] = delivery_agent_df['ModifiedDate'].dt.strftime('%m/%d/%Y %H:%M')
-delivery_agent_df.to_json('data1/delivery_agent.json',orient='records', lines=False, indent=4)
+    print(f"Run report saved to {run_report.save()}")
 
-restaurant_df.to_csv('data1/restaurant.csv', index=False)
-menu_df.to_csv('data1/menu_items.csv', index=False)
-login_audit_df.to_csv('data1/login_audit.csv', index=False)
-order_df.to_csv('data1/orders.csv', index=False)
-order_items_df.to_csv('data1/order_items.csv', index=False)
-delivery_df.to_csv('data1/delivery.csv', index=False)
+    end_time = datetime.now()
+    print(f"Program ended at: {end_time}")
 
+    # Total duration
+    duration = end_time - start_time
+    print(f"Total execution time: {duration}")
 
-end_time = datetime.now()
-print(f"Program ended at: {end_time}")
 
-# Total duration
-duration = end_time - start_time
-print(f"Total execution time: {duration}")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+import pandas as pd
+import numpy as np
+
+from index_utils import to_ns, group_offsets, grouped_searchsorted
+import rng
+
+
+class AgentIndex:
+    # RestaurantID -> LocationID lookup plus per-location delivery agent arrays sorted by CreatedDate,
+    # so "agents onboarded before the order" is a binary search and the pick is a random offset
+
+    def __init__(self, delivery_agent_df, restaurant_df):
+        self.restaurant_ids = pd.Index(restaurant_df['RestaurantID'].to_numpy())
+        self.restaurant_location = restaurant_df['LocationID'].to_numpy()
+
+        self.location_ids = pd.Index(np.unique(delivery_agent_df['LocationID'].to_numpy()))
+        location_code = self.location_ids.get_indexer(delivery_agent_df['LocationID'].to_numpy())
+        created_ns = to_ns(delivery_agent_df['CreatedDate'])
+
+        order = np.lexsort((created_ns, location_code))
+        self.location_code = location_code[order]
+        self.agent_id = delivery_agent_df['DeliveryAgentID'].to_numpy()[order]
+        self.created_ns = created_ns[order]
+        self.offsets = group_offsets(self.location_code, len(self.location_ids))
+
+    def __len__(self):
+        return len(self.agent_id)
+
+    def location_codes(self, restaurant_ids):
+        # Agent location code of every restaurant, -1 when the restaurant or its location has no agents
+        restaurant_pos = self.restaurant_ids.get_indexer(np.asarray(restaurant_ids))
+        codes = np.full(len(restaurant_pos), -1, dtype=np.int64)
+        known = restaurant_pos >= 0
+        codes[known] = self.location_ids.get_indexer(self.restaurant_location[restaurant_pos[known]])
+        return codes
+
+    def sample_agents(self, restaurant_ids, order_ns):
+        # A random agent of the restaurant's location created strictly before each order;
+        # -1 where no such agent exists
+        codes = self.location_codes(restaurant_ids)
+        known = codes >= 0
+        count = np.zeros(len(codes), dtype=np.int64)
+        count[known] = grouped_searchsorted(self.location_code, self.created_ns,
+                                            codes[known], np.asarray(order_ns)[known])
+
+        agents = np.full(len(codes), -1, dtype=self.agent_id.dtype)
+        has_agent = count > 0
+        pick = self.offsets[codes[has_agent]] + (rng.stream('delivery.DeliveryAgentID').random(has_agent.sum())
+                                                 * count[has_agent]).astype(np.int64)
+        agents[has_agent] = self.agent_id[pick]
+        return agents
@@ -0,0 +1,181 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import RunReport
+import rng
+
+
+## Customer counts the stages are run at; the customer-side tables are scaled from Main_DG's defaults
+BENCH_SCALES = [1000, 10000, 100000, 1000000]
+BENCH_REPORT_DIR = 'state/benchmarks'
+BENCH_SEED = 42
+
+## A stage counts as a regression when it got slower than baseline by more than this fraction
+REGRESSION_THRESHOLD = 0.2
+
+STAGES = ['location', 'restaurant', 'menu', 'customer', 'address', 'login_audit', 'delivery_agent',
+          'orders', 'order_items', 'settlement', 'delivery', 'rating_rollup',
+          'write_customer_tables', 'write_dimension_tables']
+
+# Stages that cost the same at every scale: locations, restaurants, menus and agents are drawn per location
+# (40 cities, 40-100 restaurants and 100-150 agents each, ...), whatever the customer count
+FIXED_STAGES = ['location', 'restaurant', 'menu', 'delivery_agent', 'write_dimension_tables']
+
+
+def scale_counts(num_customers):
+    # Customer-side table sizes for a benchmark scale, in the proportions Main_DG uses for NUM_CUSTOMERS
+    return {
+        'customer': num_customers,
+        'address': num_customers * 2,
+        'login_audit': num_customers * 3,
+    }
+
+
+def run_scale(num_customers, seed=BENCH_SEED):
+    # Runs every generation stage once at this scale in stage order, then writes the tables in
+    # Main_DG.OUTPUT_FORMAT to a temporary folder that is removed afterwards. Exact mode is off for the
+    # run: it plans whole-run targets up front, so the random mode is measured and run_spec.estimate_run
+    # scales it to the exact targets.
+    import Main_DG as dg
+
+    rng.seed_streams(seed, dg.RNG_BIT_GENERATOR)
+    counts = scale_counts(num_customers)
+    report = RunReport(f'benchmark_{num_customers}', verbose=False)
+    exact = dg.EXACT_CARDINALITY
+    dg.EXACT_CARDINALITY = False
+
+    frame_bytes = {}
+
+    def stage(name, run, rows=len):
+        with report.stage(name) as timed:
+            output = run()
+            timed.rows = rows(output)
+        frame = output[0] if isinstance(output, tuple) else output
+        frame_bytes[name] = int(frame.memory_usage(deep=True).sum()) if isinstance(frame, pd.DataFrame) else 0
+        return output
+
+    try:
+        location_df = stage('location', lambda: dg.generate_location_data(dg.LOCATION_START_ID, dg.LOCATION_END_ID))
+        restaurant_df, coupon_catalog = stage(
+            'restaurant', lambda: dg.generate_restaurant_data(dg.RESTAURANT_START_ID, dg.RESTAURANT_END_ID, location_df),
+            rows=lambda output: len(output[0]))
+        menu_df = stage('menu', lambda: dg.generate_menu_data(dg.MENU_START_ID, dg.MENU_END_ID, restaurant_df))
+        customer_df = stage('customer', lambda: dg.generate_customer_data(1, 1 + counts['customer']))
+        address_df = stage('address', lambda: dg.generate_customer_address_data(
+            1, 1 + counts['address'], customer_df, location_df))
+        login_audit_df = stage('login_audit', lambda: dg.generate_login_audit_data(
+            1, 1 + counts['login_audit'], customer_df))
+        delivery_agent_df = stage('delivery_agent', lambda: dg.generate_delivery_agent_data(
+            dg.DELIVERY_AGENT_START_ID, dg.DELIVERY_AGENT_END_ID, location_df))
+        order_df = stage('orders', lambda: dg.generate_orders_data(
+            1, 1, customer_df, restaurant_df, address_df, location_df))
+        order_items_df = stage('order_items', lambda: dg.generate_order_items_data(1, order_df, menu_df))
+        order_df = stage('settlement', lambda: dg.settle_orders(
+            order_df, order_items_df, coupon_catalog.offered_for_orders(order_df)))
+        order_df = order_df[(order_df['TotalAmount'] != 0)]
+        delivery_df = stage('delivery', lambda: dg.generate_delivery_data(order_df, delivery_agent_df, 1, restaurant_df))
+
+        def rating_rollup():
+            dg.update_menu_item_ratings(order_items_df, menu_df)
+            dg.update_restaurant_ratings(menu_df, restaurant_df)
+            return order_items_df
+        stage('rating_rollup', rating_rollup)
+
+        # Export (csv / parquet, coupon JSON, delivery_agent.json), rows = rows written
+        order_df, address_df = dg.drop_temporary_columns(order_df, address_df)
+        with tempfile.TemporaryDirectory() as folder:
+            stage('write_customer_tables', lambda: dg.write_customer_tables(
+                folder, customer_df, address_df, login_audit_df, order_df, order_items_df, delivery_df), rows=int)
+            stage('write_dimension_tables', lambda: dg.write_dimension_tables(
+                folder, location_df, delivery_agent_df, restaurant_df, coupon_catalog, menu_df), rows=int)
+    finally:
+        dg.EXACT_CARDINALITY = exact
+    return [dict(result, scale=num_customers, frame_mb=frame_bytes[result['stage']] / 2 ** 20,
+                 fixed_cost=result['stage'] in FIXED_STAGES)
+            for result in report.stages]
+
+
+def run_benchmark(scales=BENCH_SCALES, name=None, report_dir=BENCH_REPORT_DIR, seed=BENCH_SEED):
+    # Every scale runs in a fresh process so its RSS numbers are not inflated by the previous scale.
+    # The report is saved as <report_dir>/<name>.json and returned.
+    created = datetime.now().replace(microsecond=0)
+    name = name or created.strftime('%Y%m%d_%H%M%S')
+    results = []
+    for scale in scales:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            results.extend(pool.submit(run_scale, scale, seed).result())
+        print(f'scale {scale} done')
+
+    report = {
+        'name': name,
+        'created': created.isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': seed,
+        'results': results,
+    }
+    os.makedirs(report_dir, exist_ok=True)
+    with open(os.path.join(report_dir, f'{name}.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def load_report(name_or_path, report_dir=BENCH_REPORT_DIR):
+    path = name_or_path if os.path.exists(name_or_path) else os.path.join(report_dir, f'{name_or_path}.json')
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare_reports(baseline, current, threshold=REGRESSION_THRESHOLD):
+    # One row per stage and scale present in both reports, with the seconds / peak RSS ratios and a
+    # REGRESSION flag where the current run is more than threshold slower
+    columns = ['stage', 'scale', 'seconds', 'rows_per_second', 'peak_rss_mb']
+    before = pd.DataFrame(baseline['results'])[columns]
+    after = pd.DataFrame(current['results'])[columns]
+    merged = before.merge(after, on=['stage', 'scale'], suffixes=('_baseline', '_current'))
+    merged['time_ratio'] = merged['seconds_current'] / merged['seconds_baseline']
+    merged['rss_ratio'] = merged['peak_rss_mb_current'] / merged['peak_rss_mb_baseline']
+    merged['flag'] = np.where(merged['time_ratio'] > 1 + threshold, 'REGRESSION',
+                              np.where(merged['time_ratio'] < 1 - threshold, 'faster', ''))
+    merged['stage'] = pd.Categorical(merged['stage'], categories=STAGES, ordered=True)
+    return merged.sort_values(['scale', 'stage']).reset_index(drop=True)
+
+
+def format_report(report):
+    table = pd.DataFrame(report['results'])
+    return table.to_string(index=False, float_format=lambda value: f'{value:,.2f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the Main_DG generation stages at several scales')
+    parser.add_argument('--scales', type=int, nargs='+', default=BENCH_SCALES, help='customer counts to run')
+    parser.add_argument('--name', help='report name (default: a timestamp)')
+    parser.add_argument('--baseline', help='report name or path to compare this run against')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='only compare two saved reports')
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (load_report(name) for name in args.compare)
+    else:
+        current = run_benchmark(args.scales, args.name)
+        print(format_report(current))
+        baseline = load_report(args.baseline) if args.baseline else None
+
+    if baseline is not None:
+        comparison = compare_reports(baseline, current)
+        print(comparison.to_string(index=False, float_format=lambda value: f'{value:,.2f}'))
+        regressions = comparison[comparison['flag'] == 'REGRESSION']
+        if len(regressions):
+            print(f"{len(regressions)} stage(s) regressed: "
+                  + ', '.join(f"{row.stage}@{row.scale}" for row in regressions.itertuples()))
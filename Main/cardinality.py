@@ -0,0 +1,52 @@
+import pandas as pd
+import numpy as np
+
+import rng
+
+
+def split_total(total, weights, minimum=0, stream='cardinality'):
+    # Splits total over len(weights) parents: minimum each when the total allows it, the rest drawn
+    # multinomially in proportion to weights. The counts always sum to total exactly.
+    weights = np.asarray(weights, dtype=float)
+    num_parents = len(weights)
+    if num_parents == 0:
+        if total:
+            raise ValueError(f"Can't split {total} rows over no parents")
+        return np.zeros(0, dtype=np.int64)
+    base = minimum if total >= minimum * num_parents else 0
+    rest = total - base * num_parents
+    if weights.sum() <= 0:
+        weights = np.ones(num_parents)
+    return base + rng.stream(stream).multinomial(rest, weights / weights.sum()).astype(np.int64)
+
+
+def cap_counts(counts, capacity):
+    # counts limited to capacity per parent; what is cut off moves to parents with room left, so the
+    # total is kept whenever the capacities allow it
+    counts = np.asarray(counts, dtype=np.int64)
+    capacity = np.asarray(capacity, dtype=np.int64)
+    capped = np.minimum(counts, capacity)
+    excess = int(counts.sum() - capped.sum())
+    while excess > 0:
+        room = capacity - capped
+        if not room.any():
+            break
+        extra = np.minimum(split_total(excess, room), room)
+        capped += extra
+        excess -= int(extra.sum())
+    return capped
+
+
+def plan_counts(total, num_parents, low, high, minimum=1, stream='cardinality'):
+    # Rows per parent for a total that used to come from randint(low, high) per parent; the random
+    # per-parent draws become the weights, so big and small parents keep their shape
+    return split_total(total, rng.stream(f'{stream}.weights').integers(low, high + 1, size=num_parents), minimum, stream)
+
+
+def orderable_restaurants(restaurant_df, menu_df):
+    # Restaurants with a menu, dated from the day after their first menu item. Orders drawn against this
+    # frame (order time >= restaurant CreatedDate) always find an item, so none is dropped at settlement.
+    first_item = pd.to_datetime(menu_df['CreatedDate']).groupby(menu_df['RestaurantID']).min().dt.ceil('D')
+    orderable = restaurant_df[restaurant_df['RestaurantID'].isin(first_item.index)].copy()
+    orderable['CreatedDate'] = orderable['RestaurantID'].map(first_item).to_numpy()
+    return orderable
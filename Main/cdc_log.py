@@ -0,0 +1,163 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime, date
+import json
+import os
+import uuid
+
+from output_layer import TABLE_SCHEMAS
+
+
+CDC_LOG_PATH = 'state/cdc'
+
+# One record per changed cell. OldValue / NewValue hold the JSON encoded cell so ints, floats, bools,
+# strings, timestamps and nulls all share one column and decode back to the same value.
+CDC_COLUMNS = ['Table', 'Key', 'Op', 'Column', 'OldValue', 'NewValue', 'ChangedAt', 'Seq']
+INSERT, UPDATE, DELETE = 'I', 'U', 'D'
+
+
+def encode_value(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return json.dumps(value.isoformat())
+    return json.dumps(value)
+
+
+def decode_value(value):
+    return None if value is None or pd.isna(value) else json.loads(value)
+
+
+def same_values(before, after):
+    # Element-wise equality that treats two nulls as equal
+    before = pd.Series(before).reset_index(drop=True)
+    after = pd.Series(after).reset_index(drop=True)
+    both_null = (before.isna() & after.isna()).to_numpy()
+    equal = np.array([b == a for b, a in zip(before.astype(object), after.astype(object))], dtype=bool)
+    return equal | both_null
+
+
+def change_records(table, key, before_df, after_df, changed_at):
+    # U records for every cell that differs between the rows of after_df and the same rows (same index)
+    # of before_df; only the changed rows are compared, never the whole table
+    before_df = before_df.loc[after_df.index]
+    frames = []
+    for column in after_df.columns:
+        if column == key or column not in before_df.columns:
+            continue
+        changed = ~same_values(before_df[column], after_df[column])
+        if not changed.any():
+            continue
+        frames.append(pd.DataFrame({
+            'Key': after_df[key].to_numpy()[changed],
+            'Column': column,
+            'OldValue': [encode_value(v) for v in before_df[column].to_numpy()[changed]],
+            'NewValue': [encode_value(v) for v in after_df[column].to_numpy()[changed]],
+        }))
+    return finish_records(table, UPDATE, frames, changed_at)
+
+
+def insert_records(table, key, df, changed_at):
+    # I records (one per cell) for rows that did not exist before
+    frames = [pd.DataFrame({
+        'Key': df[key].to_numpy(),
+        'Column': column,
+        'OldValue': None,
+        'NewValue': [encode_value(v) for v in df[column].to_numpy()],
+    }) for column in df.columns if column != key]
+    return finish_records(table, INSERT, frames, changed_at)
+
+
+def delete_records(table, keys, changed_at):
+    frames = [pd.DataFrame({'Key': np.asarray(keys), 'Column': None, 'OldValue': None, 'NewValue': None})]
+    return finish_records(table, DELETE, frames, changed_at)
+
+
+def finish_records(table, op, frames, changed_at):
+    if not frames:
+        return pd.DataFrame(columns=CDC_COLUMNS)
+    records = pd.concat(frames, ignore_index=True)
+    records.insert(0, 'Table', table)
+    records.insert(2, 'Op', op)
+    records['ChangedAt'] = pd.Timestamp(changed_at).floor('s')
+    records['Seq'] = np.arange(len(records), dtype=np.int64)
+    return records[CDC_COLUMNS]
+
+
+def append_changes(records, log_path=CDC_LOG_PATH):
+    # Appends a batch as new Parquet files under <log>/Table=<table>/ChangeDate=<YYYY-MM-DD>/;
+    # existing files are never rewritten
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if len(records) == 0:
+        return
+    records = records.copy()
+    records['ChangeDate'] = records['ChangedAt'].dt.strftime('%Y-%m-%d')
+    schema = pa.schema([
+        ('Table', pa.string()), ('Key', pa.int64()), ('Op', pa.dictionary(pa.int8(), pa.string())),
+        ('Column', pa.dictionary(pa.int32(), pa.string())), ('OldValue', pa.string()), ('NewValue', pa.string()),
+        ('ChangedAt', pa.timestamp('s')), ('Seq', pa.int64()), ('ChangeDate', pa.string()),
+    ])
+    data = pa.Table.from_pandas(records.astype({'ChangedAt': 'datetime64[s]'}), schema=schema, preserve_index=False)
+    pq.write_to_dataset(data, log_path, partition_cols=['Table', 'ChangeDate'],
+                        basename_template=f'batch-{uuid.uuid4().hex}-{{i}}.parquet',
+                        existing_data_behavior='overwrite_or_ignore')
+
+
+def read_changes(table, since=None, until=None, log_path=CDC_LOG_PATH):
+    # Change records of one table with since < ChangedAt <= until, in the order they were made
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    if not os.path.exists(log_path):
+        return pd.DataFrame(columns=CDC_COLUMNS)
+    dataset = ds.dataset(log_path, format='parquet', partitioning='hive')
+    condition = ds.field('Table') == table
+    if since is not None:
+        condition &= ds.field('ChangedAt') > pa.scalar(pd.Timestamp(since), type=pa.timestamp('s'))
+    if until is not None:
+        condition &= ds.field('ChangedAt') <= pa.scalar(pd.Timestamp(until), type=pa.timestamp('s'))
+    records = dataset.to_table(columns=CDC_COLUMNS, filter=condition).to_pandas()
+    return records.sort_values(['ChangedAt', 'Seq'], kind='stable').reset_index(drop=True)
+
+
+def replay(base_df, table, key, until=None, since=None, log_path=CDC_LOG_PATH):
+    # Snapshot of table as of until: base_df (the snapshot at since, e.g. data1) with every logged
+    # insert, update and delete applied in order
+    records = read_changes(table, since, until, log_path)
+    snapshot = base_df.set_index(key)
+    if len(records) == 0:
+        return snapshot.reset_index()
+
+    records['Order'] = np.arange(len(records))
+    deleted_at = records[records['Op'] == DELETE].groupby('Key')['Order'].max()
+    cells = records[records['Op'] != DELETE]
+    cells = cells[cells['Order'] > cells['Key'].map(deleted_at).fillna(-1).to_numpy()]
+    last_cells = cells.drop_duplicates(['Key', 'Column'], keep='last')
+
+    # Keys whose last event is a delete go, keys re-inserted after it come back through their cells
+    snapshot = snapshot.drop(index=snapshot.index.intersection(deleted_at.index))
+    new_keys = pd.Index(last_cells['Key'].unique()).difference(snapshot.index)
+    if len(new_keys):
+        snapshot = pd.concat([snapshot, pd.DataFrame(index=new_keys, columns=snapshot.columns)])
+
+    for column, changes in last_cells.groupby('Column', observed=True, sort=False):
+        column_values = snapshot[column].to_numpy(dtype=object, copy=True)
+        positions = snapshot.index.get_indexer(changes['Key'].to_numpy())
+        new_values = [decode_value(v) for v in changes['NewValue']]
+        is_timestamp = TABLE_SCHEMAS.get(table, {}).get(column) == 'timestamp'
+        if is_timestamp and not pd.api.types.is_datetime64_any_dtype(base_df[column]):
+            # A base read from csv keeps its timestamps as text: the replayed ones are written the way
+            # to_csv writes them ('2025-02-01 08:30:00'), not as the ISO strings they were logged as
+            new_values = [None if value is None else str(pd.Timestamp(value)) for value in new_values]
+        column_values[positions] = new_values
+        values = pd.Series(column_values, index=snapshot.index).infer_objects()
+        if pd.api.types.is_datetime64_any_dtype(base_df[column]):
+            values = pd.to_datetime(values, format='mixed')
+        snapshot[column] = values
+
+    snapshot.index.name = key
+    return snapshot.reset_index()[base_df.columns]
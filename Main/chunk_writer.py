@@ -0,0 +1,39 @@
+import os
+
+
+def id_chunks(start_id, count, chunk_size):
+    # Consecutive [start, end) ID ranges of at most chunk_size IDs
+    for chunk_start in range(start_id, start_id + count, chunk_size):
+        yield chunk_start, min(chunk_start + chunk_size, start_id + count)
+
+
+class ChunkedCSVWriter:
+    # Appends DataFrame chunks to <folder>/<table>.csv. The file is truncated and the header written
+    # with a table's first chunk, later chunks are appended, so a table never has to be held whole.
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = {}
+        self.rows = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, table, df):
+        if len(df) == 0:
+            return
+        if table not in self.files:
+            self.files[table] = open(os.path.join(self.folder, f'{table}.csv'), 'w', newline='')
+            df.to_csv(self.files[table], index=False)
+            self.rows[table] = len(df)
+        else:
+            df.to_csv(self.files[table], index=False, header=False)
+            self.rows[table] += len(df)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
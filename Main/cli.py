@@ -0,0 +1,76 @@
+import argparse
+import sys
+
+from event_stream import BACKPRESSURE_POLICIES, REPORT_INTERVAL, ROTATE_BYTES, EventEmitter, get_sink, save_stream_report
+from run_spec import apply_run_spec, estimate_run, format_estimate, load_run_spec, unenforced_targets
+
+
+def generate(args):
+    import Main_DG as dg
+
+    spec = load_run_spec(args.spec)
+    apply_run_spec(spec, dg)
+    if args.dry_run:
+        print(format_estimate(estimate_run(spec, dg, args.calibration_customers), spec))
+        return
+    for table in unenforced_targets(spec):
+        print(f"note: rows.{table} is not enforced, {table} rows follow from their parent tables")
+    dg.main()
+
+
+def stream(args):
+    import Main_DG as dg
+
+    spec = load_run_spec(args.spec)
+    apply_run_spec(spec, dg)
+    # Events may go to stdout, everything else goes to stderr
+    sink = get_sink(args.sink, max_bytes=args.max_bytes, max_files=args.max_files)
+    emitter = EventEmitter(sink, rate=args.rate, speed=args.speed, backpressure=args.backpressure,
+                           report_interval=args.report_interval)
+    try:
+        emitter.emit_frames(dg.order_event_frames())
+    except BrokenPipeError:
+        # The consumer stopped reading (e.g. `| head`), what it got is reported below
+        print("the consumer closed the stream", file=sys.stderr)
+    metrics = emitter.close()
+    settings = {'spec': args.spec, 'sink': args.sink, 'rate': args.rate, 'speed': args.speed,
+                'backpressure': args.backpressure}
+    print(f"{metrics['events']:,} events in {metrics['elapsed_seconds']:.1f}s ({metrics['events_per_second']:,.0f}/s, "
+          f"{metrics['mb_per_second']:.2f} MB/s), dropped {metrics['dropped']:,}, blocked {metrics['blocked_seconds']:.1f}s",
+          file=sys.stderr)
+    print(f"Stream report saved to {save_stream_report(metrics, settings)}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Food delivery data generator')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help='generate the base tables (Main_DG) from a run spec')
+    generate_parser.add_argument('spec', help='run spec, .toml or .yaml (see run_spec.example.toml)')
+    generate_parser.add_argument('--dry-run', action='store_true',
+                                 help='only estimate rows, memory and runtime, nothing is written')
+    generate_parser.add_argument('--calibration-customers', type=int, default=1000,
+                                 help='customers generated to calibrate the dry-run estimate')
+    generate_parser.set_defaults(run=generate)
+
+    stream_parser = commands.add_parser('stream', help='emit orders, order items and deliveries as paced NDJSON events')
+    stream_parser.add_argument('spec', help='run spec, .toml or .yaml (see run_spec.example.toml)')
+    stream_parser.add_argument('--sink', default='stdout',
+                               help="'stdout', 'unix:<socket path>' or 'file:<folder>' (rotated NDJSON files)")
+    stream_parser.add_argument('--rate', type=float, help='events per second (default: as fast as the sink takes them)')
+    stream_parser.add_argument('--speed', type=float,
+                               help='replay at event time, SPEED times faster than real time (3600 = an hour per second)')
+    stream_parser.add_argument('--backpressure', choices=BACKPRESSURE_POLICIES, default='block',
+                               help='when the sink falls behind: block (slow down) or drop events')
+    stream_parser.add_argument('--report-interval', type=float, default=REPORT_INTERVAL,
+                               help='seconds between throughput lines on stderr')
+    stream_parser.add_argument('--max-bytes', type=int, default=ROTATE_BYTES, help='file sink: bytes per file')
+    stream_parser.add_argument('--max-files', type=int, help='file sink: newest files kept (default: all)')
+    stream_parser.set_defaults(run=stream)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
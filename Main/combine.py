@@ -1,21 +1,76 @@
-import pandas as pd
 import numpy as np
-from faker import Faker
-import random
-from datetime import datetime, timedelta, time
-import json
+import sqlite3
 import os
 
+from output_layer import get_backend
+from merge_store import PRIMARY_KEYS
 
-# Load both CSVs
-df1 = pd.read_csv('data1/order_items.csv')
-df2 = pd.read_csv('data2/order_items.csv')
+## 'csv' or 'parquet'
+OUTPUT_FORMAT = 'csv'
 
-# Combine them
-combined = pd.concat([df1, df2], ignore_index=True)
+## Folders combined, oldest snapshot first. The newest version of a primary key wins: folders are read
+## newest first and the first row read for a key is kept.
+COMBINE_FOLDERS = ['data1', 'data2', 'data3', 'data4', 'data5', 'data6']
 
-# Optional: remove duplicates if needed
-combined = combined.drop_duplicates()
+## Rows read per chunk; memory stays bounded by the chunk, the keys seen so far live in SQLite on disk
+CHUNK_SIZE = 100000
 
-# Save to a new CSV
-combined.to_csv('temp/combined.csv', index=False)
\ No newline at end of file
+
+class DiskKeySet:
+    # Set of int keys in a temporary SQLite file. new_keys(keys) returns the mask of keys not seen
+    # before (nor earlier in the same call) and adds them.
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            os.remove(path)
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode = OFF')
+        self.conn.execute('PRAGMA synchronous = OFF')
+        self.conn.execute('CREATE TABLE seen (id INTEGER PRIMARY KEY)')
+        self.conn.execute('CREATE TEMP TABLE chunk (id INTEGER PRIMARY KEY)')
+
+    def new_keys(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        unique_keys, first = np.unique(keys, return_index=True)
+        self.conn.execute('BEGIN')
+        self.conn.executemany('INSERT INTO chunk VALUES (?)', ((int(k),) for k in unique_keys))
+        fresh = np.array([row[0] for row in self.conn.execute(
+            'SELECT id FROM chunk WHERE id NOT IN (SELECT id FROM seen)')], dtype=np.int64)
+        self.conn.execute('INSERT OR IGNORE INTO seen SELECT id FROM chunk')
+        self.conn.execute('DELETE FROM chunk')
+        self.conn.execute('COMMIT')
+
+        mask = np.zeros(len(keys), dtype=bool)
+        mask[first[np.isin(unique_keys, fresh)]] = True
+        return mask
+
+    def close(self):
+        self.conn.close()
+        os.remove(self.path)
+
+
+def combine_table(table, folders, output_folder='temp', output_name=None, chunk_size=CHUNK_SIZE):
+    # Streams table from every folder that has it into <output_folder>/<output_name>, one row per primary key.
+    # folders go oldest first and are read in reverse, so a key's row from the newest folder is the one kept.
+    backend = get_backend(OUTPUT_FORMAT)
+    key = PRIMARY_KEYS[table]
+    os.makedirs(output_folder, exist_ok=True)
+    seen = DiskKeySet(os.path.join(output_folder, f'.{table}_keys.sqlite'))
+    read = duplicates = 0
+    try:
+        with backend.chunk_writer(output_folder) as writer:
+            for folder in reversed(folders):
+                if not os.path.exists(backend.path(folder, table)):
+                    continue
+                for chunk in backend.read_chunks(folder, table, chunk_size):
+                    fresh = seen.new_keys(chunk[key].to_numpy())
+                    writer.write(output_name or table, chunk[fresh])
+                    read += len(chunk)
+                    duplicates += int((~fresh).sum())
+    finally:
+        seen.close()
+    print(f"{table}: {read} rows read, {duplicates} duplicates dropped, {read - duplicates} written.")
+
+
+combine_table('order_items', COMBINE_FOLDERS, 'temp', 'combined')
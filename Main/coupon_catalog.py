@@ -0,0 +1,70 @@
+import pandas as pd
+import numpy as np
+import json
+
+
+CATALOG_COLUMNS = ['RestaurantID', 'code', 'min_amount', 'discount_amount', 'description',
+                   'payment_method', 'is_first_order', 'rank']
+
+# Keys of every coupon inside the restaurant 'Coupons' JSON column, in export order
+JSON_KEYS = ['code', 'min_amount', 'discount_amount', 'description', 'payment_method']
+
+
+class CouponCatalog:
+    # Normalized restaurant coupons, one row per (RestaurantID, coupon).
+    # Built once when restaurants are generated (or when restaurant.csv is read back) so that
+    # coupon eligibility is a join + filter; the JSON column is only produced at export time.
+
+    def __init__(self, coupon_df):
+        coupon_df = pd.DataFrame(coupon_df, columns=CATALOG_COLUMNS)
+        coupon_df['is_first_order'] = coupon_df['is_first_order'].astype(bool)
+        self.coupons = coupon_df.sort_values(['RestaurantID', 'rank'], kind='stable').reset_index(drop=True)
+        self.by_restaurant = self.coupons.set_index('RestaurantID')
+
+    @classmethod
+    def from_restaurants(cls, restaurant_df):
+        # Parse the 'Coupons' JSON of an exported restaurant table, once per restaurant
+        rows = []
+        for restaurant_id, coupons_str in zip(restaurant_df['RestaurantID'], restaurant_df['Coupons']):
+            try:
+                coupons = json.loads(coupons_str)
+            except (TypeError, ValueError):
+                continue
+            for rank, coupon in enumerate(coupons):
+                rows.append({
+                    'RestaurantID': restaurant_id,
+                    'code': coupon['code'],
+                    'min_amount': coupon['min_amount'],
+                    'discount_amount': coupon['discount_amount'],
+                    'description': coupon.get('description'),
+                    'payment_method': coupon['payment_method'],
+                    'is_first_order': 'FIRSTORDER' in coupon['code'],
+                    'rank': rank,
+                })
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.coupons)
+
+    def lookup(self, restaurant_id):
+        # All coupons of one restaurant
+        if restaurant_id not in self.by_restaurant.index:
+            return self.coupons.iloc[0:0]
+        return self.by_restaurant.loc[[restaurant_id]].reset_index()
+
+    def offered_for_orders(self, order_df):
+        # One row per coupon offered on an order (orders with CouponsOffered == False get none)
+        offered = order_df.loc[order_df['CouponsOffered'].astype(bool), ['OrderID', 'RestaurantID']]
+        return offered.merge(self.coupons, on='RestaurantID')
+
+    def to_json_column(self, restaurant_ids):
+        # Serialize back to the restaurant 'Coupons' JSON strings, aligned with restaurant_ids. Records are
+        # built once (python scalars, NaN -> None) and grouped in plain python, a groupby slice per
+        # restaurant costs milliseconds each.
+        grouped = {}
+        records = self.coupons[JSON_KEYS].to_dict('records')
+        for restaurant_id, record in zip(self.coupons['RestaurantID'].tolist(), records):
+            grouped.setdefault(restaurant_id, []).append(
+                {key: (None if isinstance(value, float) and np.isnan(value) else value) for key, value in record.items()})
+        serialized = {restaurant_id: json.dumps(coupons) for restaurant_id, coupons in grouped.items()}
+        return pd.Series(restaurant_ids).map(serialized).fillna('[]').to_numpy()
@@ -0,0 +1,118 @@
+import pandas as pd
+import json
+import os
+import shutil
+
+from output_layer import arrow_table, get_backend, read_table, restore_timestamps
+from merge_store import file_signature, is_current, read_merged
+
+
+DIMENSION_STORE_PATH = 'state/dimensions'
+
+# Tables an order batch draws from, partitioned by the month their rows were created in
+DIMENSION_TABLES = ['restaurant', 'menu_items', 'customer', 'customer_address', 'delivery_agent']
+PARTITION_COLUMN = 'CreatedMonth'
+# Size and mtime of every source file the store was built from, compared before each batch
+SOURCES_FILE = '_sources.json'
+
+
+def created_month(created_dates):
+    return pd.to_datetime(created_dates, format='mixed').dt.strftime('%Y-%m')
+
+
+def window_months(window_start, window_end):
+    # 'YYYY-MM' partitions that can hold rows created in [window_start, window_end)
+    last = pd.Timestamp(window_end) - pd.Timedelta(seconds=1)
+    return [p.strftime('%Y-%m') for p in pd.period_range(pd.Timestamp(window_start), last, freq='M')]
+
+
+def source_files(source_folder='data1', output_format='csv', tables=DIMENSION_TABLES, source_folders=None,
+                 merge_store_path=None):
+    # table -> source file, source_folders overrides the folder per table ({'customer': 'temp'}). With
+    # merge_store_path, a table whose merge store is current (synced updates on top of data1) is read from
+    # there instead, its source is then the store's table folder.
+    source_folders = source_folders or {}
+    backend = get_backend(output_format)
+    paths = {}
+    for table in tables:
+        if table not in source_folders and merge_store_path is not None and is_current(table, merge_store_path):
+            paths[table] = os.path.join(merge_store_path, table)
+        else:
+            paths[table] = backend.path(source_folders.get(table, source_folder), table)
+    return paths
+
+
+def source_signature(paths):
+    # Size and mtime per source file, a regenerated data1 changes both. For a merge store folder: total size,
+    # newest mtime and number of its partitions, a sync that rewrites a partition changes them.
+    signature = {}
+    for table, path in paths.items():
+        if not os.path.isdir(path):
+            signature[table] = file_signature(path)
+            continue
+        parts = [file_signature(os.path.join(path, name))
+                 for name in sorted(os.listdir(path)) if name.endswith('.parquet')]
+        signature[table] = {'path': path, 'size': sum(part['size'] for part in parts),
+                            'mtime_ns': max((part['mtime_ns'] for part in parts), default=0), 'files': len(parts)}
+    return signature
+
+
+def build_dimension_store(source_folder='data1', store_path=DIMENSION_STORE_PATH, output_format='csv',
+                          tables=DIMENSION_TABLES, source_folders=None, merge_store_path=None):
+    # Rewrites every table as a hive-partitioned Parquet dataset (<store>/<table>/CreatedMonth=YYYY-MM/),
+    # typed with the output layer schemas, and records the source files it was built from
+    import pyarrow.parquet as pq
+
+    paths = source_files(source_folder, output_format, tables, source_folders, merge_store_path)
+    signature = source_signature(paths)
+    for table in tables:
+        if os.path.isdir(paths[table]):
+            df = read_merged(table, store_path=merge_store_path)
+        else:
+            df = read_table(os.path.dirname(paths[table]), table, output_format=output_format)
+        df[PARTITION_COLUMN] = created_month(df['CreatedDate'])
+
+        table_path = os.path.join(store_path, table)
+        if os.path.exists(table_path):
+            shutil.rmtree(table_path)
+        pq.write_to_dataset(arrow_table(df, table), table_path, partition_cols=[PARTITION_COLUMN])
+
+    with open(os.path.join(store_path, SOURCES_FILE), 'w') as f:
+        json.dump(signature, f, indent=2)
+
+
+def load_dimension_window(table, window_start, window_end, columns=None, store_path=DIMENSION_STORE_PATH):
+    # Rows created in [window_start, window_end). Only the matching month partitions are opened, and the
+    # CreatedDate bound is pushed down into the Parquet scan.
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(os.path.join(store_path, table), format='parquet', partitioning='hive')
+    created = ds.field('CreatedDate')
+    window_filter = (ds.field(PARTITION_COLUMN).isin(window_months(window_start, window_end))
+                     & (created >= pa.scalar(pd.Timestamp(window_start), type=dataset.schema.field('CreatedDate').type))
+                     & (created < pa.scalar(pd.Timestamp(window_end), type=dataset.schema.field('CreatedDate').type)))
+
+    if columns is None:
+        columns = [name for name in dataset.schema.names if name != PARTITION_COLUMN]
+    data = dataset.to_table(columns=columns, filter=window_filter)
+    return restore_timestamps(data, table).to_pandas()
+
+
+def has_dimension_store(store_path=DIMENSION_STORE_PATH, tables=DIMENSION_TABLES):
+    return all(os.path.exists(os.path.join(store_path, table)) for table in tables)
+
+
+def stale_dimension_tables(source_folder='data1', store_path=DIMENSION_STORE_PATH, output_format='csv',
+                           tables=DIMENSION_TABLES, source_folders=None, merge_store_path=None):
+    # Tables whose source file changed (or is not recorded) since the store was built, all of them
+    # when there is no store yet
+    if not has_dimension_store(store_path, tables):
+        return list(tables)
+    try:
+        with open(os.path.join(store_path, SOURCES_FILE)) as f:
+            recorded = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return list(tables)
+    current = source_signature(source_files(source_folder, output_format, tables, source_folders, merge_store_path))
+    return [table for table in tables if recorded.get(table) != current[table]]
@@ -0,0 +1,377 @@
+import pandas as pd
+import numpy as np
+from collections import Counter
+from datetime import datetime
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+from index_utils import to_ns
+
+
+## EVENTS
+# table -> (event type, key column, event time column, fallback time column where the first is empty)
+EVENT_TABLES = {
+    'orders': ('order', 'OrderID', 'CreatedDate', None),
+    'order_items': ('order_item', 'OrderItemID', 'CreatedDate', None),
+    'delivery': ('delivery', 'DeliveryID', 'DeliveryDate', 'CreatedDate'),
+}
+
+## EMITTER
+BATCH_SIZE = 500  # Most events written to the sink in one call
+QUEUE_BATCHES = 64  # Batches buffered between the emitter and the sink writer before backpressure kicks in
+# 'block': the emitter waits for the sink and shifts its schedule by the time waited (no burst afterwards),
+# 'drop': batches that don't fit in the queue are dropped and counted
+BACKPRESSURE_POLICIES = ('block', 'drop')
+REPORT_INTERVAL = 5.0  # Seconds between throughput lines on stderr, None = only the final summary
+STREAM_REPORT_DIR = 'state/stream_reports'
+
+## SINKS
+ROTATE_BYTES = 64 * 1024 * 1024
+SOCKET_CONNECT_TIMEOUT = 30
+
+
+def table_events(table, df):
+    # One NDJSON line per row: {"type", "ts", "key", "data": row}. Returns the lines with their event time
+    # (int64 ns), type rank and key, for sorting
+    event_type, key_column, time_column, fallback_column = EVENT_TABLES[table]
+    event_time = pd.to_datetime(df[time_column])
+    if fallback_column is not None:
+        event_time = event_time.fillna(pd.to_datetime(df[fallback_column]))
+    event_ns = to_ns(event_time)
+    keys = df[key_column].to_numpy()
+
+    rows = df.to_json(orient='records', lines=True, date_format='iso').splitlines() if len(df) else []
+    stamps = np.datetime_as_string(event_ns.astype('datetime64[ns]'), unit='s')
+    lines = [f'{{"type":"{event_type}","ts":"{stamp}","key":{key},"data":{row}}}'
+             for stamp, key, row in zip(stamps, keys, rows)]
+    return pd.DataFrame({
+        'event_ns': event_ns,
+        'rank': list(EVENT_TABLES).index(table),
+        'key': keys,
+        'type': event_type,
+        'line': lines,
+    })
+
+
+def order_events(orders_df, order_items_df, delivery_df):
+    # Events of one batch of orders, in event time order (an order before its items, then its delivery)
+    events = pd.concat([table_events('orders', orders_df), table_events('order_items', order_items_df),
+                        table_events('delivery', delivery_df)], ignore_index=True)
+    return events.iloc[np.lexsort((events['key'].to_numpy(), events['rank'].to_numpy(),
+                                   events['event_ns'].to_numpy()))].reset_index(drop=True)
+
+
+class StdoutSink:
+    # NDJSON on stdout (progress and metrics go to stderr). A consumer that stops reading (`| head`) raises
+    # BrokenPipeError once; stdout is then pointed at devnull so the interpreter's own flush at exit stays quiet.
+
+    def write(self, data):
+        try:
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        except BrokenPipeError:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            raise
+
+    def close(self):
+        try:
+            sys.stdout.buffer.flush()
+        except BrokenPipeError:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+
+class UnixSocketSink:
+    # NDJSON over a Unix stream socket a consumer listens on. sendall blocks while the consumer's receive
+    # buffer is full, which is what the emitter's backpressure policy reacts to.
+
+    def __init__(self, path, connect_timeout=SOCKET_CONNECT_TIMEOUT):
+        self.path = path
+        deadline = time.monotonic() + connect_timeout
+        while True:
+            try:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.connect(path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                self.sock.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.2)
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class RotatingFileSink:
+    # NDJSON files <folder>/<prefix>-000001.ndjson, -000002, ... each up to max_bytes. With max_files only the
+    # newest max_files are kept (a consumer tailing the folder is expected to keep up).
+
+    def __init__(self, folder, prefix='events', max_bytes=ROTATE_BYTES, max_files=None):
+        self.folder = folder
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.index = 0
+        self.file = None
+        self.size = 0
+        self.paths = []
+        os.makedirs(folder, exist_ok=True)
+
+    def rotate(self):
+        if self.file is not None:
+            self.file.close()
+        self.index += 1
+        path = os.path.join(self.folder, f'{self.prefix}-{self.index:06d}.ndjson')
+        self.file = open(path, 'wb')
+        self.size = 0
+        self.paths.append(path)
+        if self.max_files and len(self.paths) > self.max_files:
+            os.remove(self.paths.pop(0))
+
+    def write(self, data):
+        if self.file is None or (self.size and self.size + len(data) > self.max_bytes):
+            self.rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def get_sink(spec, max_bytes=ROTATE_BYTES, max_files=None):
+    # 'stdout', 'unix:<socket path>' or 'file:<folder>'
+    kind, _, target = spec.partition(':')
+    if kind == 'stdout':
+        return StdoutSink()
+    if kind == 'unix' and target:
+        return UnixSocketSink(target)
+    if kind == 'file' and target:
+        return RotatingFileSink(target, max_bytes=max_bytes, max_files=max_files)
+    raise ValueError(f"Unknown sink `{spec}`, expected 'stdout', 'unix:<socket path>' or 'file:<folder>'")
+
+
+class StreamMetrics:
+    # Counters shared by the emitter and the sink writer thread
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.produced = Counter()
+        self.events = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.blocked_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self.last_report = (self.started, 0)
+
+    def sent(self, num_events, num_bytes):
+        with self.lock:
+            self.events += num_events
+            self.bytes += num_bytes
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            return {
+                'elapsed_seconds': round(elapsed, 3),
+                'events': self.events,
+                'bytes': self.bytes,
+                'dropped': self.dropped,
+                'events_per_second': round(self.events / elapsed, 1) if elapsed else 0.0,
+                'mb_per_second': round(self.bytes / elapsed / 1e6, 3) if elapsed else 0.0,
+                'blocked_seconds': round(self.blocked_seconds, 3),
+                'max_lag_seconds': round(self.max_lag_seconds, 3),
+                'produced': dict(self.produced),
+            }
+
+    def report_line(self):
+        # Throughput since the previous line plus the running totals
+        now = time.perf_counter()
+        with self.lock:
+            last_time, last_events = self.last_report
+            self.last_report = (now, self.events)
+            rate = (self.events - last_events) / (now - last_time) if now > last_time else 0.0
+            return (f"{self.events:,} events, {rate:,.0f}/s now, {self.events / (now - self.started):,.0f}/s overall, "
+                    f"{self.bytes / 1e6:,.1f} MB, dropped {self.dropped:,}, blocked {self.blocked_seconds:.1f}s, "
+                    f"max lag {self.max_lag_seconds:.2f}s")
+
+
+class EventEmitter:
+    # Paces events to a sink. rate = events per second; speed = replay of the event time, speed times faster
+    # than real time (3600 = an hour of orders per second); with both, the replay is capped at rate; with
+    # neither, as fast as the sink takes them. A writer thread feeds the sink from a bounded queue, a full
+    # queue is the backpressure signal (see BACKPRESSURE_POLICIES).
+
+    def __init__(self, sink, rate=None, speed=None, backpressure='block', batch_size=BATCH_SIZE,
+                 queue_batches=QUEUE_BATCHES, report_interval=REPORT_INTERVAL):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy `{backpressure}`, expected one of {BACKPRESSURE_POLICIES}")
+        self.sink = sink
+        self.rate = rate
+        self.speed = speed
+        self.backpressure = backpressure
+        self.batch_size = batch_size
+        self.report_interval = report_interval
+        self.metrics = StreamMetrics()
+
+        self.queue = queue.Queue(maxsize=queue_batches)
+        self.error = None
+        self.error_raised = False
+        self.writer = threading.Thread(target=self.write_batches, name='event-sink-writer', daemon=True)
+        self.writer.start()
+
+        # Schedule: the first event is due at clock_start, later ones by their position and event time
+        self.clock_start = None
+        self.first_event_ns = None
+        self.scheduled = 0
+        self.held = None
+
+    def write_batches(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            data, num_events = batch
+            try:
+                self.sink.write(data)
+            except Exception as error:  # surfaced in the emitting thread
+                self.error = error
+                return
+            self.metrics.sent(num_events, len(data))
+
+    def due_seconds(self, event_ns):
+        # Seconds after clock_start each event is due
+        due = np.zeros(len(event_ns))
+        if self.speed:
+            due = np.maximum(due, (event_ns - self.first_event_ns) / 1e9 / self.speed)
+        if self.rate:
+            due = np.maximum(due, (self.scheduled + np.arange(len(event_ns))) / self.rate)
+        return due
+
+    def raise_sink_error(self):
+        self.error_raised = True
+        raise self.error
+
+    def enqueue(self, lines, types):
+        if self.error is not None:
+            self.raise_sink_error()
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        with self.metrics.lock:
+            self.metrics.produced.update(types)
+        if self.backpressure == 'drop':
+            try:
+                self.queue.put_nowait((data, len(lines)))
+            except queue.Full:
+                with self.metrics.lock:
+                    self.metrics.dropped += len(lines)
+            return
+
+        waited = time.perf_counter()
+        while True:
+            try:
+                self.queue.put((data, len(lines)), timeout=1)
+                break
+            except queue.Full:
+                if self.error is not None:
+                    self.raise_sink_error()
+        waited = time.perf_counter() - waited
+        if waited > 0.001:
+            # Blocked on the sink: the schedule moves by the wait instead of bursting to catch up
+            self.clock_start += waited
+            with self.metrics.lock:
+                self.metrics.blocked_seconds += waited
+
+    def emit(self, events):
+        # events: order_events frame, already in event time order
+        if not len(events):
+            return
+        event_ns = events['event_ns'].to_numpy()
+        lines = events['line'].to_numpy()
+        types = events['type'].to_numpy()
+        if self.clock_start is None:
+            # Throughput is measured from the first event, not from building the tables
+            self.clock_start = time.perf_counter()
+            self.first_event_ns = event_ns[0]
+            with self.metrics.lock:
+                self.metrics.started = self.clock_start
+                self.metrics.last_report = (self.clock_start, 0)
+        due = self.due_seconds(event_ns)
+
+        position = 0
+        while position < len(events):
+            wait = due[position] - (time.perf_counter() - self.clock_start)
+            if wait > 0:
+                time.sleep(wait)
+            now = time.perf_counter() - self.clock_start
+            end = min(max(int(np.searchsorted(due, now, side='right')), position + 1), position + self.batch_size)
+            with self.metrics.lock:
+                self.metrics.max_lag_seconds = max(self.metrics.max_lag_seconds, now - due[position])
+            self.enqueue(lines[position:end].tolist(), types[position:end].tolist())
+            self.scheduled += end - position
+            position = end
+            self.maybe_report()
+
+    def emit_frames(self, frames):
+        # frames: (orders, order_items, delivery) batches whose orders come in timestamp order (e.g. one per
+        # simulation window). Deliveries land after their order, so events later than the batch's last order
+        # are held back and merged with the next batch, keeping the stream in event time order.
+        for orders_df, order_items_df, delivery_df in frames:
+            events = order_events(orders_df, order_items_df, delivery_df)
+            if self.held is not None:
+                events = pd.concat([self.held, events], ignore_index=True)
+                events = events.iloc[np.lexsort((events['key'].to_numpy(), events['rank'].to_numpy(),
+                                                 events['event_ns'].to_numpy()))].reset_index(drop=True)
+            if len(orders_df):
+                watermark = pd.to_datetime(orders_df['CreatedDate']).max().as_unit('ns').value
+                ready = events['event_ns'].to_numpy() <= watermark
+                self.held = events[~ready]
+                events = events[ready]
+            self.emit(events)
+        if self.held is not None:
+            self.emit(self.held)
+            self.held = None
+
+    def maybe_report(self):
+        if self.report_interval is None:
+            return
+        if time.perf_counter() - self.metrics.last_report[0] >= self.report_interval:
+            sys.stderr.write(self.metrics.report_line() + '\n')
+            sys.stderr.flush()
+
+    def close(self):
+        # Drains the queue into the sink and returns the final metrics. A writer stopped by a sink error no
+        # longer reads the queue, so the end marker is only offered while it is alive (a full queue would
+        # block forever). A sink error is raised here unless emit already raised it.
+        while self.writer.is_alive():
+            try:
+                self.queue.put(None, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        self.writer.join()
+        self.sink.close()
+        if self.error is not None and not self.error_raised:
+            self.raise_sink_error()
+        return self.metrics.snapshot()
+
+
+def save_stream_report(metrics, settings, report_dir=STREAM_REPORT_DIR):
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"event_stream_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump({'settings': settings, 'metrics': metrics}, f, indent=2, default=str)
+    return path
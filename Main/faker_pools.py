@@ -0,0 +1,78 @@
+import numpy as np
+from faker import Faker
+import json
+import os
+
+import rng
+
+
+POOL_SIZE = 10000  # Values drawn per provider
+POOL_PROVIDERS = ['name_male', 'name_female', 'name', 'company', 'street_name']
+POOL_CACHE_DIR = 'state/faker_pools'
+
+
+class FakerPools:
+    # Faker values drawn once per (locale, seed, size) and cached on disk. Rows then pick from the pools
+    # with the 'faker.<provider>' rng substreams instead of paying Faker's per-call cost; the pools load
+    # lazily on first use.
+
+    def __init__(self, locale, seed, size=POOL_SIZE, cache_dir=POOL_CACHE_DIR):
+        self.locale = locale
+        self.seed = seed
+        self.size = size
+        self.cache_dir = cache_dir
+        self._pools = None
+
+    @property
+    def path(self):
+        return os.path.join(self.cache_dir, f'{self.locale}_seed{self.seed}_{self.size}.json')
+
+    @property
+    def pools(self):
+        if self._pools is None:
+            values = self.load() if os.path.exists(self.path) else self.build()
+            self._pools = {provider: np.array(values[provider], dtype=object) for provider in POOL_PROVIDERS}
+        return self._pools
+
+    def load(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def build(self):
+        fake = Faker(self.locale)
+        fake.seed_instance(self.seed)
+        values = {provider: [getattr(fake, provider)() for _ in range(self.size)] for provider in POOL_PROVIDERS}
+
+        # Written under a temporary name first so parallel shards never read a half written cache
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(values, f)
+        os.replace(temp_path, self.path)
+        return values
+
+    def sample(self, provider, size, stream=None):
+        # size values of one provider in a single draw
+        pool = self.pools[provider]
+        return pool[rng.stream(stream or f'faker.{provider}').integers(0, len(pool), size=size)]
+
+    def pick(self, provider):
+        pool = self.pools[provider]
+        return pool[rng.python_stream(f'faker.{provider}').randrange(len(pool))]
+
+    # Drop-in replacements for the Faker calls the generators make per row
+    def name_male(self):
+        return self.pick('name_male')
+
+    def name_female(self):
+        return self.pick('name_female')
+
+    def name(self):
+        return self.pick('name')
+
+    def company(self):
+        return self.pick('company')
+
+    def street_name(self):
+        return self.pick('street_name')
@@ -0,0 +1,69 @@
+import sqlite3
+import os
+
+
+ID_REGISTRY_PATH = 'state/id_registry.sqlite'
+
+
+class IDRegistry:
+    # Last ID handed out per table, kept in SQLite. Ranges are reserved inside an IMMEDIATE transaction,
+    # so parallel and incremental runs always get disjoint IDs and nobody rescans old files for the last one.
+
+    def __init__(self, path=ID_REGISTRY_PATH, timeout=30):
+        self.path = path
+        self.timeout = timeout
+
+    def connect(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute('CREATE TABLE IF NOT EXISTS id_watermarks (table_name TEXT PRIMARY KEY, last_id INTEGER NOT NULL)')
+        return conn
+
+    def last_id(self, table):
+        # None until the table has been allocated from or recorded
+        conn = self.connect()
+        try:
+            row = conn.execute('SELECT last_id FROM id_watermarks WHERE table_name = ?', (table,)).fetchone()
+        finally:
+            conn.close()
+        return None if row is None else row[0]
+
+    def allocate(self, table, count, first_start_id=1):
+        # Reserves count consecutive IDs and returns the first one. A table the registry has not seen yet
+        # starts at first_start_id (the start ID the scripts used to hard-code).
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT last_id FROM id_watermarks WHERE table_name = ?', (table,)).fetchone()
+            start_id = first_start_id if row is None else row[0] + 1
+            conn.execute('INSERT INTO id_watermarks (table_name, last_id) VALUES (?, ?) '
+                         'ON CONFLICT(table_name) DO UPDATE SET last_id = excluded.last_id',
+                         (table, start_id + count - 1))
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+        return start_id
+
+    def record(self, table, last_id):
+        # Raises the watermark to last_id after a full regeneration. It is never lowered: IDs an earlier
+        # dataset or batch handed out may still be around (data2..data6, another output folder).
+        conn = self.connect()
+        try:
+            conn.execute('INSERT INTO id_watermarks (table_name, last_id) VALUES (?, ?) '
+                         'ON CONFLICT(table_name) DO UPDATE SET last_id = MAX(last_id, excluded.last_id)',
+                         (table, int(last_id)))
+        finally:
+            conn.close()
+
+    def watermarks(self):
+        conn = self.connect()
+        try:
+            return dict(conn.execute('SELECT table_name, last_id FROM id_watermarks ORDER BY table_name').fetchall())
+        finally:
+            conn.close()
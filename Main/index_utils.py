@@ -0,0 +1,101 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+import re
+
+import rng
+
+
+NS_PER_SECOND = 10**9
+NS_PER_MINUTE = 60 * NS_PER_SECOND
+NS_PER_HOUR = 60 * NS_PER_MINUTE
+NS_PER_DAY = 24 * NS_PER_HOUR
+
+# Same offset syntax as Faker's date_time_between ('-5y', '-2M', '-6m' = six *minutes*, ...)
+RELATIVE_OFFSET = re.compile(r'^(?:(?P<years>[+-]\d+?)y)?(?:(?P<months>[+-]\d+?)M)?(?:(?P<weeks>[+-]\d+?)w)?'
+                             r'(?:(?P<days>[+-]\d+?)d)?(?:(?P<hours>[+-]\d+?)h)?(?:(?P<minutes>[+-]\d+?)m)?'
+                             r'(?:(?P<seconds>[+-]\d+?)s)?$')
+
+
+def to_ns(values):
+    # Any datetime-like column (datetime objects, strings, datetime64 of any unit) -> int64 nanoseconds
+    return pd.to_datetime(pd.Series(values)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+def scalar_to_ns(value):
+    # 'now', datetime or timestamp string -> int64 nanoseconds
+    if value is None or value == 'now':
+        value = datetime.now()
+    return pd.Timestamp(value).as_unit('ns').value
+
+
+def resolve_relative(value, reference):
+    # 'now' / Faker-style offsets resolved against a fixed reference time instead of the wall clock
+    if not isinstance(value, str):
+        return value
+    if value in ('now', 'today'):
+        return reference
+    parts = RELATIVE_OFFSET.match(value)
+    if not parts or not any(parts.groupdict().values()):
+        raise ValueError(f"Can't parse date string `{value}`")
+    offset = {name: int(part) for name, part in parts.groupdict().items() if part}
+    days = offset.pop('days', 0) + 365.24 * offset.pop('years', 0) + 30.42 * offset.pop('months', 0)
+    return reference + timedelta(days=days, **offset)
+
+
+def from_ns(values):
+    # int64 nanoseconds -> datetime64 series usable as a DataFrame column
+    return pd.to_datetime(np.asarray(values, dtype=np.int64), unit='ns')
+
+
+def uniform_seconds_between(lower_ns, upper_ns, stream='timestamps'):
+    # Uniform timestamp between per-row bounds, truncated to whole seconds like Faker's output
+    lower_s = np.asarray(lower_ns, dtype=np.int64) // NS_PER_SECOND
+    upper_s = np.asarray(upper_ns, dtype=np.int64) // NS_PER_SECOND
+    span = np.maximum(upper_s - lower_s, 0)
+    offset = (rng.stream(stream).random(len(lower_s)) * (span + 1)).astype(np.int64)
+    return (lower_s + np.minimum(offset, span)) * NS_PER_SECOND
+
+
+def distinct_picks(counts, num_values, stream):
+    # counts[i] distinct indices in [0, num_values) for every row i, flattened row by row (random.sample per
+    # row, one draw per slot for all rows: the slot's draw among the values not taken yet is shifted past
+    # the taken ones in ascending order)
+    counts = np.minimum(np.asarray(counts, dtype=np.int64), num_values)
+    num_slots = int(counts.max()) if len(counts) else 0
+    picks = np.zeros((len(counts), num_slots), dtype=np.int64)
+    generator = rng.stream(stream)
+    for slot in range(num_slots):
+        draw = generator.integers(0, num_values - slot, size=len(counts))
+        for taken in np.sort(picks[:, :slot], axis=1).T:
+            draw += draw >= taken
+        picks[:, slot] = draw
+    return picks[np.arange(num_slots) < counts[:, None]]
+
+
+def group_offsets(sorted_codes, num_groups):
+    # Start/end positions of each group code inside an array sorted by that code
+    return np.searchsorted(sorted_codes, np.arange(num_groups + 1), side='left')
+
+
+def grouped_searchsorted(data_groups, data_values, query_groups, query_values):
+    # data_* must be sorted by (group, value). For every query returns how many entries
+    # of the same group have a value strictly lower than the query value.
+    data_groups = np.asarray(data_groups)
+    query_groups = np.asarray(query_groups)
+    n_data = len(data_groups)
+
+    groups = np.concatenate([data_groups, query_groups])
+    values = np.concatenate([np.asarray(data_values), np.asarray(query_values)])
+    is_data = np.concatenate([np.ones(n_data, dtype=bool), np.zeros(len(query_groups), dtype=bool)])
+
+    # Queries sort ahead of data with an equal value so that ties are not counted
+    order = np.lexsort((is_data, values, groups))
+    sorted_is_data = is_data[order]
+    data_before = np.cumsum(sorted_is_data) - sorted_is_data
+
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+
+    group_start = np.searchsorted(data_groups, query_groups, side='left')
+    return data_before[position[n_data:]] - group_start
@@ -0,0 +1,198 @@
+from datetime import datetime
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+
+RUN_REPORT_DIR = 'state/run_reports'
+
+## PROFILERS a stage can run under: None, 'cprofile' (.prof for pstats / snakeviz) or 'pyinstrument' (.html)
+PROFILERS = (None, 'cprofile', 'pyinstrument')
+
+
+def current_rss():
+    # Resident set size in bytes (Linux /proc; elsewhere the process peak so far)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    # Samples the RSS every interval seconds on a background thread while the with block runs;
+    # .peak is the highest value seen
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self.stop = threading.Event()
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    def sample(self):
+        while not self.stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+
+class StageProfiler:
+    # cProfile or pyinstrument around one stage, saved as <folder>/<run>_<stage>.prof / .html
+
+    def __init__(self, kind, path):
+        if kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler `{kind}`, expected one of {PROFILERS}")
+        self.kind = kind
+        self.path = path
+
+    def __enter__(self):
+        if self.kind == 'cprofile':
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        elif self.kind == 'pyinstrument':
+            from pyinstrument import Profiler
+            self.profiler = Profiler()
+            self.profiler.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.kind == 'cprofile':
+            self.profiler.disable()
+            self.profiler.dump_stats(self.path + '.prof')
+        elif self.kind == 'pyinstrument':
+            self.profiler.stop()
+            with open(self.path + '.html', 'w') as f:
+                f.write(self.profiler.output_html())
+
+
+class Stage:
+    # Handed out by RunReport.stage; set .rows to the number of rows the stage emitted
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+
+
+class RunReport:
+    # Per-stage wall time, rows, throughput and memory of one run, printed as each stage ends and saved
+    # as a JSON report. profile_stages picks the stages run under the profiler (None = all of them).
+
+    def __init__(self, name, profile=None, profile_stages=None, report_dir=RUN_REPORT_DIR, verbose=True):
+        StageProfiler(profile, None)  # fails early on an unknown profiler
+        self.name = name
+        self.profile = profile
+        self.profile_stages = profile_stages
+        self.report_dir = report_dir
+        self.verbose = verbose
+        self.started = datetime.now().replace(microsecond=0)
+        self.clock = time.perf_counter()
+        self.stages = []
+
+    def stage(self, name):
+        return StageTimer(self, name)
+
+    def record(self, stage, seconds, rss_start, rss_end, peak_rss):
+        rows = None if stage.rows is None else int(stage.rows)
+        entry = {
+            'stage': stage.name,
+            'rows': rows,
+            'seconds': seconds,
+            'rows_per_second': rows / seconds if rows is not None and seconds > 0 else None,
+            'rss_start_mb': rss_start / 2 ** 20,
+            'rss_end_mb': rss_end / 2 ** 20,
+            'peak_rss_mb': peak_rss / 2 ** 20,
+        }
+        self.stages.append(entry)
+        if self.verbose:
+            throughput = '' if entry['rows_per_second'] is None else f", {rows} rows, {entry['rows_per_second']:,.0f} rows/s"
+            print(f"{stage.name}: {seconds:.2f}s{throughput}, peak rss {entry['peak_rss_mb']:,.0f} MB "
+                  f"< total time > {time.perf_counter() - self.clock:.2f}s")
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started': self.started.isoformat(),
+            'seconds': time.perf_counter() - self.clock,
+            'peak_rss_mb': max([s['peak_rss_mb'] for s in self.stages], default=current_rss() / 2 ** 20),
+            'profile': self.profile,
+            'stages': self.stages,
+        }
+
+    def save(self):
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, f"{self.name}_{self.started.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+
+class StageTimer:
+
+    def __init__(self, report, name):
+        self.report = report
+        self.stage = Stage(name)
+
+    def __enter__(self):
+        report = self.report
+        profile = report.profile if report.profile_stages is None or self.stage.name in report.profile_stages else None
+        if profile:
+            os.makedirs(report.report_dir, exist_ok=True)
+        self.profiler = StageProfiler(profile, os.path.join(report.report_dir, f'{report.name}_{self.stage.name}'))
+        self.rss = PeakRSS()
+        self.rss_start = current_rss()
+        self.rss.__enter__()
+        self.profiler.__enter__()
+        self.clock = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, exc_type, *exc):
+        seconds = time.perf_counter() - self.clock
+        self.profiler.__exit__(exc_type, *exc)
+        self.rss.__exit__(exc_type, *exc)
+        if exc_type is None:
+            self.report.record(self.stage, seconds, self.rss_start, current_rss(), self.rss.peak)
+
+
+def progress(iterable, total=None, desc=None):
+    # tqdm when it is installed, else a one-line bar redrawn on stderr
+    try:
+        from tqdm import tqdm
+        return tqdm(iterable, total=total, desc=desc)
+    except ImportError:
+        return SimpleProgress(iterable, total, desc)
+
+
+class SimpleProgress:
+
+    def __init__(self, iterable, total=None, desc=None, width=30):
+        self.iterable = iterable
+        self.total = total if total is not None else (len(iterable) if hasattr(iterable, '__len__') else None)
+        self.desc = desc or ''
+        self.width = width
+
+    def __iter__(self):
+        started = time.perf_counter()
+        for done, item in enumerate(self.iterable, 1):
+            yield item
+            elapsed = time.perf_counter() - started
+            if self.total:
+                filled = self.width * done // self.total
+                eta = elapsed / done * (self.total - done)
+                line = f"{self.desc} |{'#' * filled}{'.' * (self.width - filled)}| {done}/{self.total} " \
+                       f"[{elapsed:.0f}s < {eta:.0f}s]"
+            else:
+                line = f"{self.desc} {done} [{elapsed:.0f}s]"
+            sys.stderr.write('\r' + line)
+            sys.stderr.flush()
+        sys.stderr.write('\n')
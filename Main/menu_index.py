@@ -0,0 +1,57 @@
+import pandas as pd
+import numpy as np
+
+from index_utils import to_ns, group_offsets, grouped_searchsorted
+import rng
+
+
+class MenuIndex:
+    # Per-restaurant menu arrays (MenuItemID, Price, CreatedDate in ns) sorted by creation date,
+    # so "items created before the order" is a binary search and prices are an array gather
+
+    def __init__(self, menu_df):
+        self.restaurant_ids = pd.Index(np.unique(menu_df['RestaurantID'].to_numpy()))
+        restaurant_code = self.restaurant_ids.get_indexer(menu_df['RestaurantID'].to_numpy())
+        created_ns = to_ns(menu_df['CreatedDate'])
+
+        order = np.lexsort((created_ns, restaurant_code))
+        self.restaurant_code = restaurant_code[order]
+        self.menu_item_id = menu_df['MenuItemID'].to_numpy()[order]
+        self.price = menu_df['Price'].to_numpy()[order]
+        self.created_ns = created_ns[order]
+        self.offsets = group_offsets(self.restaurant_code, len(self.restaurant_ids))
+
+    def __len__(self):
+        return len(self.menu_item_id)
+
+    def lookup(self, restaurant_ids):
+        # Restaurant code for every id, -1 when the restaurant has no menu
+        return self.restaurant_ids.get_indexer(np.asarray(restaurant_ids))
+
+    def eligible(self, restaurant_ids, order_ns):
+        # First index position and number of menu items created strictly before each order
+        codes = self.lookup(restaurant_ids)
+        known = codes >= 0
+        start = np.zeros(len(codes), dtype=np.int64)
+        count = np.zeros(len(codes), dtype=np.int64)
+        start[known] = self.offsets[codes[known]]
+        count[known] = grouped_searchsorted(self.restaurant_code, self.created_ns,
+                                            codes[known], np.asarray(order_ns)[known])
+        return start, count
+
+    def sample_items(self, restaurant_ids, order_ns, num_items):
+        # Picks min(num_items, eligible) distinct menu items per order.
+        # Returns the order position and the index position of every picked item.
+        start, count = self.eligible(restaurant_ids, order_ns)
+        take = np.minimum(np.asarray(num_items), count)
+
+        # One random key per eligible (order, item) pair; the lowest keys of every order win
+        candidate_order = np.repeat(np.arange(len(count)), count)
+        candidate_start = np.repeat(np.cumsum(count) - count, count)
+        local = np.arange(len(candidate_order)) - candidate_start
+        shuffled = np.lexsort((rng.stream('order_items.MenuItemID').random(len(candidate_order)), candidate_order))
+
+        # Orders keep their slots after the shuffle, so `local` is also the rank inside the order
+        picked = shuffled[local < take[candidate_order]]
+        picked_order = candidate_order[picked]
+        return picked_order, start[picked_order] + local[picked]
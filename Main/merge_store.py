@@ -0,0 +1,150 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+
+from output_layer import arrow_table, restore_timestamps
+
+
+MERGE_STORE_PATH = 'state/merged'
+
+# Tables are split into key ranges of PARTITION_KEYS IDs (<store>/<table>/part-000012.parquet holds IDs
+# 12 * PARTITION_KEYS .. 13 * PARTITION_KEYS - 1). A sync only rewrites the partitions its batches touch,
+# and new IDs, which only grow, land in the last partitions.
+PARTITION_KEYS = 4096
+# Size and mtime of the file a table's store was built from (<store>/<table>/_source.json, skipped by the
+# Parquet dataset reader), so a store built from an older data1 is told apart from a current one
+SOURCE_FILE = '_source.json'
+
+PRIMARY_KEYS = {
+    'location': 'LocationID',
+    'restaurant': 'RestaurantID',
+    'menu_items': 'MenuItemID',
+    'customer': 'CustomerID',
+    'customer_address': 'AddressID',
+    'delivery_agent': 'DeliveryAgentID',
+    'login_audit': 'LoginID',
+    'orders': 'OrderID',
+    'order_items': 'OrderItemID',
+    'delivery': 'DeliveryID',
+}
+
+
+def partition_path(table, partition, store_path=MERGE_STORE_PATH):
+    return os.path.join(store_path, table, f'part-{partition:06d}.parquet')
+
+
+def has_merge_store(table, store_path=MERGE_STORE_PATH):
+    return os.path.exists(os.path.join(store_path, table))
+
+
+def read_partition(table, partition, store_path=MERGE_STORE_PATH):
+    import pyarrow.parquet as pq
+
+    path = partition_path(table, partition, store_path)
+    if not os.path.exists(path):
+        return None
+    return restore_timestamps(pq.read_table(path), table).to_pandas()
+
+
+def write_partition(df, table, partition, store_path=MERGE_STORE_PATH):
+    # Written next to the old file and swapped in, so a failed sync never leaves half a partition
+    import pyarrow.parquet as pq
+
+    path = partition_path(table, partition, store_path)
+    pq.write_table(arrow_table(df, table), path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def is_current(table, store_path=MERGE_STORE_PATH):
+    # The table has a store and the file it was built from has not changed since
+    try:
+        with open(os.path.join(store_path, table, SOURCE_FILE)) as f:
+            recorded = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return False
+    return os.path.exists(recorded['path']) and file_signature(recorded['path']) == recorded
+
+
+def build_merge_store(table, df, key=None, store_path=MERGE_STORE_PATH, source_path=None):
+    key = key or PRIMARY_KEYS[table]
+    table_path = os.path.join(store_path, table)
+    if os.path.exists(table_path):
+        shutil.rmtree(table_path)
+    os.makedirs(table_path)
+
+    df = df.sort_values(key, kind='stable')
+    partitions = df[key].to_numpy() // PARTITION_KEYS
+    bounds = np.flatnonzero(np.diff(partitions)) + 1
+    for rows in np.split(np.arange(len(df)), bounds):
+        if len(rows):
+            write_partition(df.iloc[rows], table, int(partitions[rows[0]]), store_path)
+    if source_path is not None:
+        with open(os.path.join(table_path, SOURCE_FILE), 'w') as f:
+            json.dump(file_signature(source_path), f)
+
+
+def read_merged(table, columns=None, store_path=MERGE_STORE_PATH):
+    import pyarrow.dataset as ds
+
+    data = ds.dataset(os.path.join(store_path, table), format='parquet').to_table(columns=columns)
+    return restore_timestamps(data, table).to_pandas()
+
+
+def merge_rows(base, updates, key):
+    # Upsert of updates into base by key through the hash index of base's keys: existing keys get the
+    # update's columns overwritten, unknown keys are appended. Values are merged as objects and re-inferred,
+    # like the SCD engine does, so a None or a str date never fails the setitem.
+    base = base.set_index(key)
+    updates = updates.drop_duplicates(key, keep='last').set_index(key)
+    positions = base.index.get_indexer(updates.index)
+    found = positions >= 0
+
+    for column in updates.columns:
+        if column not in base.columns:
+            base[column] = None
+        column_values = base[column].to_numpy(dtype=object, copy=True)
+        column_values[positions[found]] = updates[column].to_numpy(dtype=object)[found]
+        base[column] = pd.Series(column_values, index=base.index).infer_objects()
+
+    inserted = updates[~found]
+    if len(inserted):
+        base = pd.concat([base, inserted.reindex(columns=base.columns)])
+    base.index.name = key
+    return base.sort_index().reset_index(), int(found.sum()), len(inserted)
+
+
+def upsert_batches(table, batches, key=None, store_path=MERGE_STORE_PATH):
+    # Applies update batches (DataFrames, oldest first) to the table in the merge store. Every batch is
+    # sorted by key and cut at the partition boundaries; partitions are then visited in key order, each
+    # read once, given its slice of every batch in batch order and written once if it changed.
+    key = key or PRIMARY_KEYS[table]
+    slices = {}
+    for batch in batches:
+        batch = batch.sort_values(key, kind='stable')
+        partitions = batch[key].to_numpy() // PARTITION_KEYS
+        bounds = np.flatnonzero(np.diff(partitions)) + 1
+        for rows in np.split(np.arange(len(batch)), bounds):
+            if len(rows):
+                slices.setdefault(int(partitions[rows[0]]), []).append(batch.iloc[rows])
+
+    stats = {'partitions_written': 0, 'updated': 0, 'inserted': 0}
+    for partition in sorted(slices):
+        stored = read_partition(table, partition, store_path)
+        # a new key range starts empty, everything in it is an insert
+        merged = stored if stored is not None else slices[partition][0].iloc[:0]
+        for updates in slices[partition]:
+            merged, updated, inserted = merge_rows(merged, updates, key)
+            stats['updated'] += updated
+            stats['inserted'] += inserted
+        if stored is not None and arrow_table(merged, table).equals(arrow_table(stored, table)):
+            continue  # the batches only repeat what the partition already holds (a re-run sync)
+        write_partition(merged, table, partition, store_path)
+        stats['partitions_written'] += 1
+    return stats
@@ -0,0 +1,258 @@
+import pandas as pd
+import numpy as np
+
+from index_utils import (NS_PER_DAY, NS_PER_HOUR, NS_PER_MINUTE, to_ns, scalar_to_ns, from_ns,
+                         group_offsets, grouped_searchsorted)
+from timestamps import sample_seconds_ns
+from cardinality import split_total, cap_counts
+from menu_index import MenuIndex
+from agent_index import AgentIndex
+import rng
+
+
+ORDER_STATUSES = ['Delivered', 'Canceled', 'Failed', 'Returned']
+ORDER_STATUS_WEIGHTS = [0.8, 0.1, 0.03, 0.07]
+
+PAYMENT_METHODS = ['Cash', 'UPI', 'CreditCard', 'DebitCard']
+PAYMENT_METHOD_WEIGHTS = [0.2, 0.7, 0.05, 0.05]
+
+ORDER_COLUMNS = ['OrderID', 'CustomerID', 'RestaurantID', 'OrderDate', 'TotalAmount', 'DiscountAmount',
+                 'DeliveryCharges', 'FinalAmount', 'Status', 'PaymentMethod', 'IsFirstOrder',
+                 'CouponsOffered', 'CouponApplied', 'CouponCode', 'CreatedDate', 'ModifiedDate', 'AddressID']
+
+
+def parse_operating_hours(operating_hours):
+    # "20:00 - 00:00" -> opening hour and number of open hours (shifts may cross midnight)
+    hours = operating_hours.astype(str).str.extract(r'^\s*(\d+):\d+\s*-\s*(\d+):\d+')
+    start_hr = hours[0].astype(int).to_numpy()
+    end_hr = hours[1].astype(int).to_numpy()
+    num_hours = np.where(end_hr > start_hr, end_hr - start_hr, 24 - start_hr + end_hr)
+    return start_hr, num_hours
+
+
+def build_city_restaurant_groups(restaurant_df, location_df):
+    # Restaurants grouped by the city of their location, sorted by CreatedDate inside each city
+    city_by_location = location_df.drop_duplicates('LocationID').set_index('LocationID')['City']
+    restaurant_city = restaurant_df['LocationID'].map(city_by_location).to_numpy()
+    known = pd.notna(restaurant_city)
+
+    cities = pd.Index(pd.unique(restaurant_city[known]))
+    city_code = np.full(len(restaurant_df), -1, dtype=np.int64)
+    city_code[known] = cities.get_indexer(restaurant_city[known])
+    created_ns = to_ns(restaurant_df['CreatedDate'])
+
+    rows = np.flatnonzero(known)
+    rows = rows[np.lexsort((created_ns[rows], city_code[rows]))]
+    start_hr, num_hours = parse_operating_hours(restaurant_df['OperatingHours'])
+
+    return {
+        'cities': cities,
+        'city_code': city_code[rows],
+        'created_ns': created_ns[rows],
+        'offsets': group_offsets(city_code[rows], len(cities)),
+        'rows': rows,
+        'start_hr': start_hr,
+        'num_hours': num_hours,
+    }
+
+
+def generate_orders_bulk(order_start_id, customer_df, restaurant_df, address_df, location_df,
+                         max_orders_per_customer=8, order_end_date='now', run_date='now', num_orders=None):
+    # Draws every order in one pass: order counts per customer, address, date, restaurant,
+    # hour, status and payment method are all sampled as arrays instead of row by row.
+    # run_date is the upper bound for ModifiedDate ('now' = wall clock). num_orders (one count per
+    # customer_df row) replaces the random 1 - max_orders_per_customer orders per customer.
+    now_ns = scalar_to_ns(run_date)
+    end_ns = scalar_to_ns(order_end_date)
+
+    # Customer -> contiguous block of addresses
+    addresses = address_df[address_df['CustomerID'].isin(customer_df['CustomerID'])]
+    addresses = addresses.sort_values('CustomerID', kind='stable').reset_index(drop=True)
+    address_customer = addresses['CustomerID'].to_numpy()
+    address_created_ns = to_ns(addresses['CreatedDate'])
+
+    customer_ids = customer_df['CustomerID'].to_numpy()
+    has_address = np.isin(customer_ids, address_customer)
+    customer_ids = customer_ids[has_address]
+    first_address = np.searchsorted(address_customer, customer_ids, side='left')
+    num_addresses = np.searchsorted(address_customer, customer_ids, side='right') - first_address
+
+    # Orders per customer and the address each order is placed from
+    if num_orders is None:
+        num_orders = rng.stream('orders.Count').integers(1, max_orders_per_customer + 1, size=len(customer_ids))
+    else:
+        num_orders = np.asarray(num_orders, dtype=np.int64)[has_address]
+    order_customer = np.repeat(customer_ids, num_orders)
+    order_address = np.repeat(first_address, num_orders) + (
+        rng.stream('orders.AddressID').random(len(order_customer)) * np.repeat(num_addresses, num_orders)).astype(np.int64)
+    order_ns = sample_seconds_ns(address_created_ns[order_address], np.full(len(order_address), end_ns),
+                                 stream='orders.OrderDate')
+
+    # Restaurants of the same city that already existed at order time
+    groups = build_city_restaurant_groups(restaurant_df, location_df)
+    order_city = groups['cities'].get_indexer(addresses['City'].to_numpy()[order_address])
+    in_known_city = order_city >= 0
+    num_eligible = np.zeros(len(order_customer), dtype=np.int64)
+    num_eligible[in_known_city] = grouped_searchsorted(groups['city_code'], groups['created_ns'],
+                                                       order_city[in_known_city], order_ns[in_known_city])
+
+    keep = num_eligible > 0
+    order_customer = order_customer[keep]
+    order_address = order_address[keep]
+    order_ns = order_ns[keep]
+    pick = groups['offsets'][order_city[keep]] + (rng.stream('orders.RestaurantID').random(keep.sum())
+                                                  * num_eligible[keep]).astype(np.int64)
+    restaurant_row = groups['rows'][pick]
+
+    # Random hour inside the restaurant's shift and a random minute
+    num_rows = len(restaurant_row)
+    order_hour = (groups['start_hr'][restaurant_row]
+                  + (rng.stream('orders.Hour').random(num_rows) * groups['num_hours'][restaurant_row]).astype(np.int64)) % 24
+    order_minute = rng.stream('orders.Minute').integers(0, 60, size=num_rows)
+    order_ns = order_ns - order_ns % NS_PER_DAY + order_hour * NS_PER_HOUR + order_minute * NS_PER_MINUTE
+
+    # First surviving order of every customer; rows are still grouped by customer
+    is_first_order = np.ones(num_rows, dtype=bool)
+    is_first_order[1:] = order_customer[1:] != order_customer[:-1]
+
+    return order_frame(order_start_id, order_customer, restaurant_df['RestaurantID'].to_numpy()[restaurant_row],
+                       order_ns, addresses['AddressID'].to_numpy()[order_address], is_first_order, now_ns)
+
+
+def order_frame(order_start_id, customer_ids, restaurant_ids, order_ns, address_ids, is_first_order, now_ns):
+    # ORDER_COLUMNS frame for placed orders: status, payment method, ModifiedDate and the coupon offer are
+    # drawn here, the amounts are filled in later by settlement.settle_orders
+    num_rows = len(order_ns)
+    status = rng.choice('orders.Status', ORDER_STATUSES, num_rows, ORDER_STATUS_WEIGHTS)
+    payment_method = rng.choice('orders.PaymentMethod', PAYMENT_METHODS, num_rows, PAYMENT_METHOD_WEIGHTS)
+    modified_ns = sample_seconds_ns(order_ns, np.full(num_rows, now_ns), stream='orders.ModifiedDate')
+
+    # 30% of orders are not offered the restaurant's coupons (see coupon_catalog.CouponCatalog)
+    coupons_offered = rng.stream('orders.CouponsOffered').random(num_rows) > 0.3
+
+    order_dates = from_ns(order_ns)
+    return pd.DataFrame({
+        'OrderID': np.arange(order_start_id, order_start_id + num_rows),
+        'CustomerID': customer_ids,
+        'RestaurantID': restaurant_ids,
+        'OrderDate': order_dates,
+        'TotalAmount': 0,  # Will be updated by settlement.settle_orders
+        'DiscountAmount': 0,
+        'DeliveryCharges': 0,
+        'FinalAmount': 0,
+        'Status': status,
+        'PaymentMethod': payment_method,
+        'IsFirstOrder': is_first_order,
+        'CouponsOffered': coupons_offered,
+        'CouponApplied': False,
+        'CouponCode': None,
+        'CreatedDate': order_dates,
+        'ModifiedDate': from_ns(modified_ns),
+        'AddressID': address_ids,
+    }, columns=ORDER_COLUMNS)
+
+
+def generate_orders_exact(order_start_id, num_orders, customer_df, restaurant_df, address_df, location_df,
+                          max_passes=5, **kwargs):
+    # Exactly num_orders.sum() orders (one count per customer_df row). Orders that can't be placed (no
+    # address, no restaurant in the city yet) are drawn again in up to max_passes further passes, spread
+    # over the customers that did get orders; it stops early once the total is reached.
+    customer_ids = customer_df['CustomerID'].to_numpy()
+    counts = np.asarray(num_orders, dtype=np.int64)
+    passes = [generate_orders_bulk(0, customer_df, restaurant_df, address_df, location_df,
+                                   num_orders=counts, **kwargs)]
+    remaining = int(counts.sum()) - len(passes[0])
+    for _ in range(max_passes):
+        placed = np.isin(customer_ids, pd.concat(passes)['CustomerID'].to_numpy())
+        if remaining == 0 or not placed.any():
+            break
+        passes.append(generate_orders_bulk(0, customer_df, restaurant_df, address_df, location_df,
+                                           num_orders=split_total(remaining, placed), **kwargs))
+        remaining -= len(passes[-1])
+
+    result_df = pd.concat(passes, ignore_index=True)
+    result_df = result_df.sort_values('CustomerID', kind='stable').reset_index(drop=True)
+    result_df['OrderID'] = np.arange(order_start_id, order_start_id + len(result_df))
+    result_df['IsFirstOrder'] = ~result_df['CustomerID'].duplicated().to_numpy()
+    return result_df
+
+
+def generate_order_items(order_items_start_id, order_df, menu_df, planned_items=None):
+    # Menu items of every restaurant, sorted by creation date
+    menu_index = MenuIndex(menu_df)
+    order_ns = to_ns(order_df['CreatedDate'])
+
+    # Generate 1-5 random order items, only from menu items created before the order
+    if planned_items is not None:
+        # The planned items, limited to the distinct items on the menu at order time
+        num_items = cap_counts(planned_items, menu_index.eligible(order_df['RestaurantID'].to_numpy(), order_ns)[1])
+    else:
+        num_items = rng.stream('order_items.Count').choice([1, 2, 3, 4, 5], size=len(order_df), p=[0.5, 0.3, 0.1, 0.06, 0.04])
+    item_order, item_pos = menu_index.sample_items(order_df['RestaurantID'].to_numpy(), order_ns, num_items)
+
+    # Generate random quantity and the price from the index
+    quantity = rng.stream('order_items.Quantity').choice([1, 2, 3], size=len(item_order), p=[0.65, 0.25, 0.1])
+    price = menu_index.price[item_pos]
+    subtotal = price * quantity
+
+    # Generate rating (if delivered)
+    delivered = (order_df['Status'].to_numpy() == 'Delivered')[item_order]
+    ratings = np.where(delivered, rng.stream('order_items.Ratings').choice([1, 2, 3, 4, 5], size=len(item_order),
+                                                                          p=[0.1, 0.1, 0.1, 0.3, 0.4]), np.nan)
+
+    return pd.DataFrame({
+        'OrderItemID': np.arange(order_items_start_id, order_items_start_id + len(item_order)),
+        'OrderID': order_df['OrderID'].to_numpy()[item_order],
+        'MenuItemID': menu_index.menu_item_id[item_pos],
+        'Quantity': quantity,
+        'Price': price,
+        'Subtotal': subtotal,
+        'Ratings' : ratings,
+        'CreatedDate': order_df['CreatedDate'].to_numpy()[item_order],
+        'ModifiedDate': order_df['ModifiedDate'].to_numpy()[item_order]
+    })
+
+
+def generate_deliveries(order_df, delivery_agent_df, delivery_start_id, restaurant_df):
+    # delivery_statuses = ['Delivered', 'In Transit', 'Assigned', 'Failed']
+
+    # Only generate delivery for non-canceled orders that have items
+    orders = order_df[(order_df['TotalAmount'] != 0) & (order_df['Status'] != 'Canceled')]
+
+    # Select a random delivery agent of the restaurant's location, onboarded before the order
+    agent_index = AgentIndex(delivery_agent_df, restaurant_df)
+    agent_ids = agent_index.sample_agents(orders['RestaurantID'].to_numpy(), to_ns(orders['CreatedDate']))
+    orders = orders[agent_ids >= 0]
+    agent_ids = agent_ids[agent_ids >= 0]
+    num_rows = len(orders)
+
+    # Set status based on order status
+    order_status = orders['Status'].to_numpy()
+    delivery_status = np.where(np.isin(order_status, ['Failed', 'Returned']), order_status, 'Delivered')
+
+    # Estimated time (15-55 minutes)
+    estimated_time = rng.stream('delivery.EstimatedTime').integers(15, 56, size=num_rows)
+
+    # Increase the chance of fast delivery: fast / normal / slow
+    delay_type = rng.stream('delivery.DelayType').choice(3, size=num_rows, p=[0.4, 0.4, 0.2])
+    low = np.choose(delay_type, [np.maximum(10, estimated_time - 10), estimated_time + 1, estimated_time + 11])
+    high = np.choose(delay_type, [estimated_time, estimated_time + 10, estimated_time + 30])
+    delivered_time = low + (rng.stream('delivery.DeliveredTime').random(num_rows) * (high - low + 1)).astype(np.int64)
+
+    # Delivery date based on order date, only for delivered or returned orders
+    is_delivered = np.isin(delivery_status, ['Delivered', 'Returned'])
+    delivered_time = np.where(is_delivered, delivered_time, np.nan)
+    delivery_date = pd.to_datetime(orders['OrderDate']).to_numpy() + pd.to_timedelta(delivered_time, unit='m').to_numpy()
+
+    return pd.DataFrame({
+        'DeliveryID': np.arange(delivery_start_id, delivery_start_id + num_rows),
+        'OrderID': orders['OrderID'].to_numpy(),
+        'DeliveryAgentID': agent_ids,
+        'DeliveryStatus': delivery_status,
+        'EstimatedTime': estimated_time,
+        'DeliveredTime' : delivered_time,
+        'AddressID': orders['AddressID'].to_numpy(),
+        'DeliveryDate': delivery_date,
+        'CreatedDate': orders['CreatedDate'].to_numpy(),
+        'ModifiedDate': orders['ModifiedDate'].to_numpy()
+    })
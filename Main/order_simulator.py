@@ -0,0 +1,231 @@
+import pandas as pd
+import numpy as np
+
+from index_utils import (NS_PER_SECOND, NS_PER_HOUR, NS_PER_DAY, to_ns, scalar_to_ns, group_offsets,
+                         grouped_searchsorted)
+from order_engine import build_city_restaurant_groups, order_frame
+import rng
+
+
+## LOAD CURVES
+# Relative order intensity per hour of the day (0 - 23): a breakfast bump, lunch and dinner peaks, quiet nights
+HOURLY_CURVE = [0.35, 0.2, 0.1, 0.05, 0.05, 0.1, 0.25, 0.5, 0.8, 0.8, 0.7, 0.9,
+                1.6, 1.8, 1.4, 0.8, 0.7, 0.8, 1.1, 1.7, 2.2, 2.1, 1.4, 0.7]
+
+# Relative intensity per weekday, Monday .. Sunday
+WEEKDAY_CURVE = [0.9, 0.85, 0.9, 0.95, 1.1, 1.3, 1.35]
+
+# (first day, last day as 'MM-DD', multiplier); a season may wrap the new year, overlapping seasons multiply
+FESTIVAL_SEASONS = [
+    ('01-01', '01-01', 1.4),   # New Year's Day
+    ('03-05', '03-15', 1.15),  # Holi
+    ('08-15', '08-15', 1.2),   # Independence Day
+    ('10-10', '11-15', 1.35),  # Navratri, Dussehra and Diwali
+    ('12-24', '12-31', 1.3),   # Christmas and New Year's Eve
+]
+
+# Per-city overrides of 'hourly', 'weekday' and 'festivals', plus 'rate', a multiplier on the city's share of
+# the orders (shares otherwise follow the number of customer addresses in the city)
+CITY_CURVES = {
+    'Mumbai': {'hourly': HOURLY_CURVE[-1:] + HOURLY_CURVE[:-1], 'rate': 1.2},  # everything an hour later
+    'Bangalore': {'weekday': [1.0, 0.95, 1.0, 1.0, 1.2, 1.4, 1.3]},
+    'Kolkata': {'festivals': FESTIVAL_SEASONS + [('10-01', '10-12', 1.5)]},  # Durga Puja
+}
+
+## SIMULATION
+# Events are drawn one window at a time (bounded memory, and the thinning envelope is the window's peak
+# rate instead of the whole span's)
+SIMULATION_WINDOW = '7D'
+
+
+def month_day_key(month_day):
+    # 'MM-DD' -> month * 32 + day, the index into a festival table
+    month, day = month_day.split('-')
+    return int(month) * 32 + int(day)
+
+
+def festival_table(seasons):
+    # Multiplier for every month * 32 + day key
+    keys = np.arange(13 * 32)
+    table = np.ones(len(keys))
+    for first, last, multiplier in seasons:
+        low, high = month_day_key(first), month_day_key(last)
+        inside = (keys >= low) & (keys <= high) if low <= high else (keys >= low) | (keys <= high)
+        table[inside] *= multiplier
+    return table
+
+
+def calendar_keys(ns):
+    # Hour of day, weekday (Monday = 0) and month * 32 + day of int64 nanosecond timestamps
+    ns = np.asarray(ns, dtype=np.int64)
+    days = ns // NS_PER_DAY
+    hour = (ns - days * NS_PER_DAY) // NS_PER_HOUR
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+    dates = days.astype('datetime64[D]')
+    month_start = dates.astype('datetime64[M]')
+    month = month_start.astype(np.int64) % 12 + 1
+    day = (dates - month_start.astype('datetime64[D]')).astype(np.int64) + 1
+    return hour, weekday, month * 32 + day
+
+
+class OrderSimulator:
+    # Orders as a non-homogeneous Poisson process per city. The rate is the number of customer addresses the
+    # city has at that time times the product of the city's hourly, weekday and festival curves (0 while no
+    # restaurant of the city is open), scaled so num_orders are expected over [start, end). Every event gets
+    # one of those addresses and one of those restaurants. Events are drawn by thinning: candidates at the
+    # window's peak rate, each kept with probability rate(t) / peak, all as arrays. Orders come out in
+    # timestamp order.
+
+    def __init__(self, customer_df, restaurant_df, address_df, location_df, num_orders, start, end,
+                 run_date='now', city_curves=None):
+        self.start_ns = scalar_to_ns(start)
+        self.start_ns -= self.start_ns % NS_PER_SECOND
+        self.end_ns = scalar_to_ns(end)
+        self.now_ns = scalar_to_ns(run_date)
+
+        # For every hour of the day the restaurants open in it, by city and sorted by CreatedDate
+        groups = build_city_restaurant_groups(restaurant_df, location_df)
+        cities = groups['cities']
+        self.restaurant_ids = restaurant_df['RestaurantID'].to_numpy()
+        rows = groups['rows']
+        is_open = (np.arange(24)[:, None] - groups['start_hr'][rows]) % 24 < groups['num_hours'][rows]
+        self.open_restaurants = [{
+            'rows': rows[is_open[hour]],
+            'city_code': groups['city_code'][is_open[hour]],
+            'created_ns': groups['created_ns'][is_open[hour]],
+            'offsets': group_offsets(groups['city_code'][is_open[hour]], len(cities)),
+        } for hour in range(24)]
+
+        # The customers' addresses by city, sorted by CreatedDate
+        addresses = address_df[address_df['CustomerID'].isin(customer_df['CustomerID'])]
+        city_code = cities.get_indexer(addresses['City'].to_numpy())
+        addresses, city_code = addresses[city_code >= 0], city_code[city_code >= 0]
+        created_ns = to_ns(addresses['CreatedDate'])
+        order = np.lexsort((created_ns, city_code))
+        self.address_city = city_code[order]
+        self.address_created = created_ns[order]
+        self.address_ids = addresses['AddressID'].to_numpy()[order]
+        self.address_customer = addresses['CustomerID'].to_numpy()[order]
+        self.address_offsets = group_offsets(self.address_city, len(cities))
+
+        # Curve tables, one row per city
+        city_curves = CITY_CURVES if city_curves is None else city_curves
+        settings = [city_curves.get(city, {}) for city in cities]
+        self.hourly = np.array([setting.get('hourly', HOURLY_CURVE) for setting in settings], dtype=float).reshape(-1, 24)
+        self.weekday = np.array([setting.get('weekday', WEEKDAY_CURVE) for setting in settings], dtype=float).reshape(-1, 7)
+        self.festival = np.array([festival_table(setting.get('festivals', FESTIVAL_SEASONS))
+                                  for setting in settings]).reshape(-1, 13 * 32)
+
+        # Orders per address and hour at curve value 1, so the integral of the rates over [start, end) is
+        # num_orders, split over the cities by their 'rate'
+        city_rate = np.array([setting.get('rate', 1.0) for setting in settings], dtype=float)
+        grid = self.hour_grid(self.start_ns, self.end_ns)
+        integral = (self.curve_grid(grid) * self.addresses_at(grid) * (self.open_at(grid) > 0)).sum(axis=1) * city_rate
+        self.base_rate = city_rate * num_orders / integral.sum() if integral.sum() > 0 else np.zeros(len(cities))
+
+    @staticmethod
+    def hour_grid(start_ns, end_ns):
+        # Start of every hour overlapping [start_ns, end_ns)
+        return np.arange(start_ns - start_ns % NS_PER_HOUR, end_ns, NS_PER_HOUR, dtype=np.int64)
+
+    def addresses_at(self, ns):
+        # cities x timestamps number of addresses created before each timestamp
+        num_cities = len(self.address_offsets) - 1
+        counts = grouped_searchsorted(self.address_city, self.address_created,
+                                      np.repeat(np.arange(num_cities), len(ns)), np.tile(ns, num_cities))
+        return counts.reshape(num_cities, len(ns))
+
+    def open_at(self, ns):
+        # cities x timestamps number of restaurants created before and open at each timestamp
+        num_cities = len(self.address_offsets) - 1
+        return self.open_counts(np.repeat(np.arange(num_cities), len(ns)), np.tile(ns, num_cities)).reshape(num_cities, len(ns))
+
+    def open_counts(self, city, event_ns):
+        # Per (city code, timestamp): how many of the city's restaurants are created before and open at that
+        # time; they are the first entries of the hour's group for the city
+        num_open = np.zeros(len(city), dtype=np.int64)
+        hour = (event_ns % NS_PER_DAY) // NS_PER_HOUR
+        for event_hour in np.unique(hour):
+            events = hour == event_hour
+            open_restaurants = self.open_restaurants[event_hour]
+            num_open[events] = grouped_searchsorted(open_restaurants['city_code'], open_restaurants['created_ns'],
+                                                    city[events], event_ns[events])
+        return num_open
+
+    def curve_grid(self, ns):
+        # cities x timestamps curve values
+        hour, weekday, month_day = calendar_keys(ns)
+        return self.hourly[:, hour] * self.weekday[:, weekday] * self.festival[:, month_day]
+
+    def curve(self, ns, city):
+        # Curve value of each (timestamp, city code) pair
+        hour, weekday, month_day = calendar_keys(ns)
+        return self.hourly[city, hour] * self.weekday[city, weekday] * self.festival[city, month_day]
+
+    def events(self, window_start, window_end):
+        # City code, timestamp and the city's number of addresses and open restaurants at that time of every
+        # event in [window_start, window_end), in timestamp order. Addresses only grow, the window end has the
+        # most.
+        peak = (self.base_rate * self.curve_grid(self.hour_grid(window_start, window_end)).max(axis=1, initial=0)
+                * self.addresses_at(np.array([window_end], dtype=np.int64))[:, 0])
+        counts = rng.stream('simulation.Count').poisson(peak * (window_end - window_start) / NS_PER_HOUR)
+        city = np.repeat(np.arange(len(counts)), counts)
+        event_ns = window_start + (rng.stream('simulation.OrderDate').random(len(city))
+                                   * (window_end - window_start)).astype(np.int64)
+        event_ns -= event_ns % NS_PER_SECOND
+
+        # Thinning: keep each candidate with probability rate(t) / peak
+        num_addresses = grouped_searchsorted(self.address_city, self.address_created, city, event_ns)
+        num_open = self.open_counts(city, event_ns)
+        keep = (rng.stream('simulation.Accept').random(len(city)) * peak[city]
+                < self.base_rate[city] * self.curve(event_ns, city) * num_addresses * (num_open > 0))
+        order = np.flatnonzero(keep)[np.argsort(event_ns[keep], kind='stable')]
+        return city[order], event_ns[order], num_addresses[order], num_open[order]
+
+    def place(self, city, event_ns, num_addresses, num_open):
+        # Address row and restaurant row of every event, uniform over the ones the city has at that time
+        address_row = self.address_offsets[city] + (
+            rng.stream('orders.AddressID').random(len(city)) * num_addresses).astype(np.int64)
+
+        restaurant_row = np.zeros(len(city), dtype=np.int64)
+        hour = (event_ns % NS_PER_DAY) // NS_PER_HOUR
+        pick = (rng.stream('orders.RestaurantID').random(len(city)) * num_open).astype(np.int64)
+        for event_hour in np.unique(hour):
+            events = hour == event_hour
+            open_restaurants = self.open_restaurants[event_hour]
+            restaurant_row[events] = open_restaurants['rows'][open_restaurants['offsets'][city[events]] + pick[events]]
+        return address_row, restaurant_row
+
+    def window_orders(self, order_start_id, window_start, window_end, seen_customers):
+        # Orders of one window; IsFirstOrder is set for customers not in seen_customers (sorted)
+        city, event_ns, num_addresses, num_open = self.events(window_start, window_end)
+        address_row, restaurant_row = self.place(city, event_ns, num_addresses, num_open)
+        customer_ids = self.address_customer[address_row]
+        is_first_order = ~pd.Series(customer_ids).duplicated().to_numpy() & ~np.isin(customer_ids, seen_customers)
+        return order_frame(order_start_id, customer_ids, self.restaurant_ids[restaurant_row], event_ns,
+                           self.address_ids[address_row], is_first_order, self.now_ns)
+
+    def stream(self, order_start_id, window=SIMULATION_WINDOW):
+        # Yields the orders window by window in timestamp order, OrderIDs continuing across windows
+        window_ns = pd.Timedelta(window).value
+        seen_customers = np.zeros(0, dtype=np.int64)
+        next_id = order_start_id
+        for window_start in range(self.start_ns, self.end_ns, window_ns):
+            orders = self.window_orders(next_id, window_start, min(window_start + window_ns, self.end_ns), seen_customers)
+            seen_customers = np.union1d(seen_customers, orders['CustomerID'].to_numpy())
+            next_id += len(orders)
+            yield orders
+
+    def orders(self, order_start_id, window=SIMULATION_WINDOW):
+        frames = list(self.stream(order_start_id, window))
+        if not frames:
+            return self.window_orders(order_start_id, self.start_ns, self.start_ns, np.zeros(0, dtype=np.int64))
+        return pd.concat(frames, ignore_index=True)
+
+
+def simulate_orders(order_start_id, customer_df, restaurant_df, address_df, location_df, num_orders, start, end,
+                    run_date='now', city_curves=None, window=SIMULATION_WINDOW):
+    # All simulated orders in [start, end) as one frame in timestamp order (see OrderSimulator)
+    simulator = OrderSimulator(customer_df, restaurant_df, address_df, location_df, num_orders, start, end,
+                               run_date, city_curves)
+    return simulator.orders(order_start_id, window)
@@ -0,0 +1,258 @@
+import pandas as pd
+import numpy as np
+import numbers
+import os
+
+from chunk_writer import ChunkedCSVWriter
+
+
+# Column types per table. 'timestamp' is stored as timestamp[s], 'category' as a dictionary-encoded
+# string column; columns missing from a frame are skipped, columns not listed are inferred.
+TABLE_SCHEMAS = {
+    'location': {
+        'LocationID': 'int64', 'City': 'category', 'State': 'string', 'PinCode': 'int64',
+        'ActiveFlag': 'bool', 'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'restaurant': {
+        'RestaurantID': 'int64', 'Name': 'string', 'CuisineType': 'string', 'Pricing_for_2': 'int64',
+        'Restaurant_Phone': 'int64', 'OperatingHours': 'string', 'LocationID': 'int64', 'ActiveFlag': 'bool',
+        'OpenStatus': 'string', 'Locality': 'string', 'Restaurant_Address': 'string', 'Ratings': 'float64',
+        'Coupons': 'string', 'Latitude': 'float64', 'Longitude': 'float64',
+        'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'menu_items': {
+        'MenuItemID': 'int64', 'RestaurantID': 'int64', 'ItemName': 'string', 'Description': 'string',
+        'Price': 'int64', 'Category': 'category', 'Availability': 'bool', 'ItemType': 'string',
+        'Ratings': 'float64', 'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'customer': {
+        'CustomerID': 'int64', 'Full_Name': 'string', 'Email': 'string', 'Mobile_no': 'int64',
+        'LoginByUsing': 'string', 'Gender': 'string', 'DOB': 'date', 'Anniversary': 'date', 'Rating': 'float64',
+        'Preferences': 'string', 'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'customer_address': {
+        'AddressID': 'int64', 'CustomerID': 'int64', 'FlatNo/HouseNo': 'string', 'Floor': 'string',
+        'Building': 'string', 'Landmark': 'string', 'Locality': 'string', 'City': 'category', 'State': 'string',
+        'PinCode': 'int64', 'Coordinates': 'string', 'PrimaryFlag': 'bool', 'AddressType': 'string',
+        'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp', 'LocationID': 'int64',
+    },
+    'login_audit': {
+        'LoginID': 'int64', 'CustomerID': 'int64', 'LoginType': 'string', 'DeviceInterface': 'string',
+        'MobileDeviceName': 'string', 'WebInterface': 'string', 'LastLogin': 'timestamp',
+    },
+    'delivery_agent': {
+        'DeliveryAgentID': 'int64', 'Full_Name': 'string', 'email': 'string', 'Mobile_no': 'int64',
+        'VehicleType': 'string', 'LocationID': 'int64', 'Status': 'bool', 'Gender': 'string', 'Rating': 'float64',
+        'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'orders': {
+        'OrderID': 'int64', 'CustomerID': 'int64', 'RestaurantID': 'int64', 'OrderDate': 'timestamp',
+        'TotalAmount': 'int64', 'DiscountAmount': 'int64', 'DeliveryCharges': 'int64', 'FinalAmount': 'int64',
+        'Status': 'category', 'PaymentMethod': 'category', 'IsFirstOrder': 'bool', 'CouponCode': 'string',
+        'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'order_items': {
+        'OrderItemID': 'int64', 'OrderID': 'int64', 'MenuItemID': 'int64', 'Quantity': 'int64', 'Price': 'int64',
+        'Subtotal': 'int64', 'Ratings': 'float64', 'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+    'delivery': {
+        'DeliveryID': 'int64', 'OrderID': 'int64', 'DeliveryAgentID': 'int64', 'DeliveryStatus': 'string',
+        'EstimatedTime': 'int64', 'DeliveredTime': 'float64', 'AddressID': 'int64', 'DeliveryDate': 'timestamp',
+        'CreatedDate': 'timestamp', 'ModifiedDate': 'timestamp',
+    },
+}
+
+
+# Numbers found in a timestamp column are epoch milliseconds, what DataFrame.to_json writes by default
+EPOCH_UNIT = 'ms'
+
+
+def parse_timestamps(values):
+    # Datetimes, date strings or epoch numbers -> datetime64 series. pd.to_datetime alone would read the
+    # numbers as nanoseconds (1970-01-01 00:29:52 for a 2026 epoch-ms value) without an error.
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if pd.api.types.is_bool_dtype(values):
+        raise ValueError(f"Column `{values.name}` holds booleans, not timestamps")
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit=EPOCH_UNIT)
+    is_number = values.map(lambda value: isinstance(value, numbers.Number) and not isinstance(value, (bool, np.bool_))
+                           and pd.notna(value)).to_numpy(dtype=bool)
+    if not is_number.any():
+        return pd.to_datetime(values, format='mixed')
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    parsed[is_number] = pd.to_datetime(values[is_number].astype(np.int64), unit=EPOCH_UNIT)
+    parsed[~is_number] = pd.to_datetime(values[~is_number], format='mixed')
+    return parsed
+
+
+def arrow_type(type_name):
+    import pyarrow as pa
+
+    return {
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+        'string': pa.string(),
+        'timestamp': pa.timestamp('s'),
+        'date': pa.date32(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+    }[type_name]
+
+
+def arrow_table(df, table):
+    # DataFrame -> pyarrow Table in the table's fixed schema (column order of the frame is kept)
+    import pyarrow as pa
+
+    column_types = TABLE_SCHEMAS.get(table, {})
+    arrays, fields = [], []
+    for column in df.columns:
+        values = df[column]
+        type_name = column_types.get(column)
+        if type_name is None:
+            array = pa.array(values, from_pandas=True)
+        elif type_name == 'timestamp':
+            array = pa.array(parse_timestamps(values).astype('datetime64[s]'), from_pandas=True)
+        elif type_name == 'date':
+            array = pa.array(parse_timestamps(values).dt.date, type=pa.date32(), from_pandas=True)
+        elif type_name in ('string', 'category'):
+            # Generators mix str and numbers in some text columns ('' or '12' for Floor)
+            text = values.where(values.isna(), values.astype(str)).astype(object)
+            array = pa.array(text, type=pa.string(), from_pandas=True)
+            if type_name == 'category':
+                array = array.dictionary_encode().cast(arrow_type('category'))
+        else:
+            array = pa.array(values, type=arrow_type(type_name), from_pandas=True)
+        arrays.append(array)
+        fields.append(pa.field(column, array.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def restore_timestamps(data, table):
+    # Parquet has no second resolution, timestamp[s] columns are stored as ms and cast back on read
+    column_types = TABLE_SCHEMAS.get(table, {})
+    schema = data.schema
+    for i, field in enumerate(schema):
+        if column_types.get(field.name) == 'timestamp':
+            schema = schema.set(i, field.with_type(arrow_type('timestamp')))
+    return data.cast(schema)
+
+
+class CSVBackend:
+    # The original flat files, untyped on re-read
+    extension = 'csv'
+
+    def path(self, folder, table):
+        return os.path.join(folder, f'{table}.{self.extension}')
+
+    def write(self, df, folder, table):
+        df.to_csv(self.path(folder, table), index=False)
+
+    def read(self, folder, table, columns=None):
+        return pd.read_csv(self.path(folder, table), usecols=columns)
+
+    def read_chunks(self, folder, table, chunk_size, columns=None):
+        return pd.read_csv(self.path(folder, table), usecols=columns, chunksize=chunk_size)
+
+    def chunk_writer(self, folder):
+        return ChunkedCSVWriter(folder)
+
+
+class ParquetBackend:
+    # One Parquet file per table in the TABLE_SCHEMAS types. Re-reads come back typed (datetime64,
+    # categoricals) and only the requested columns are decoded.
+    extension = 'parquet'
+
+    def path(self, folder, table):
+        return os.path.join(folder, f'{table}.{self.extension}')
+
+    def write(self, df, folder, table):
+        import pyarrow.parquet as pq
+
+        pq.write_table(arrow_table(df, table), self.path(folder, table))
+
+    def read(self, folder, table, columns=None):
+        import pyarrow.parquet as pq
+
+        data = pq.read_table(self.path(folder, table), columns=columns)
+        return restore_timestamps(data, table).to_pandas()
+
+    def read_chunks(self, folder, table, chunk_size, columns=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(self.path(folder, table)).iter_batches(batch_size=chunk_size, columns=columns):
+            yield restore_timestamps(pa.Table.from_batches([batch]), table).to_pandas()
+
+    def chunk_writer(self, folder):
+        return ChunkedParquetWriter(folder)
+
+
+class ChunkedParquetWriter:
+    # ChunkedCSVWriter counterpart: one row group per chunk, the file schema fixed by the first chunk
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.writers = {}
+        self.rows = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, table, df):
+        import pyarrow.parquet as pq
+
+        if len(df) == 0:
+            return
+        chunk = arrow_table(df, table)
+        if table not in self.writers:
+            self.writers[table] = pq.ParquetWriter(os.path.join(self.folder, f'{table}.parquet'), chunk.schema)
+            self.rows[table] = 0
+        self.writers[table].write_table(chunk.cast(self.writers[table].schema))
+        self.rows[table] += len(df)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+OUTPUT_BACKENDS = {
+    'csv': CSVBackend,
+    'parquet': ParquetBackend,
+}
+
+
+def get_backend(output_format):
+    if output_format not in OUTPUT_BACKENDS:
+        raise ValueError(f"Unknown output format `{output_format}`, expected one of {sorted(OUTPUT_BACKENDS)}")
+    return OUTPUT_BACKENDS[output_format]()
+
+
+def write_table(df, folder, table, output_format='csv'):
+    get_backend(output_format).write(df, folder, table)
+
+
+def read_table(folder, table, columns=None, output_format='csv'):
+    return get_backend(output_format).read(folder, table, columns)
+
+
+def split_path(path):
+    # 'data1/menu_items.parquet' -> backend for the extension, folder, table
+    folder, file_name = os.path.split(path)
+    table, extension = os.path.splitext(file_name)
+    return get_backend(extension.lstrip('.')), folder, table
+
+
+def read_path(path, columns=None):
+    backend, folder, table = split_path(path)
+    return backend.read(folder, table, columns)
+
+
+def write_path(df, path):
+    backend, folder, table = split_path(path)
+    backend.write(df, folder, table)
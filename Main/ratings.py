@@ -0,0 +1,98 @@
+import pandas as pd
+import numpy as np
+import os
+
+from output_layer import get_backend
+
+
+def menu_item_ratings(order_items_df):
+    # Average order item rating per MenuItemID (unrated items are skipped)
+    return order_items_df.groupby('MenuItemID')['Ratings'].mean().round(1)
+
+
+def restaurant_ratings(menu_df):
+    # Average menu item rating per RestaurantID
+    return menu_df.groupby('RestaurantID')['Ratings'].mean().round(1)
+
+
+def apply_menu_item_ratings(menu_df, ratings):
+    # Menu items without any rated order get NaN, like the row-by-row version did
+    menu_df['Ratings'] = menu_df['MenuItemID'].map(ratings).to_numpy(dtype=float)
+
+
+def apply_restaurant_ratings(restaurant_df, ratings):
+    restaurant_df['Ratings'] = restaurant_df['RestaurantID'].map(ratings).to_numpy(dtype=float)
+
+
+## RUNNING RATING TOTALS shared by Main_DG and the incremental batch scripts
+RATING_STATE_PATH = 'state/menu_item_ratings.csv'
+# Folders holding order_items, each kept as its own batch. A state is bootstrapped from the ones that
+# exist only when there is none yet; Main_DG resets it to its own data1 on every regeneration.
+RATING_SOURCE_FOLDERS = ['data1', 'data4', 'data5', 'data6']
+
+
+class RatingState:
+    # Running sum and count of order item ratings per batch (the folder the order items were written to)
+    # and MenuItemID. Lets incremental runs fold a new order_items batch into the menu ratings without
+    # re-reading every previous order_items file. A batch script overwrites its folder on every run, so its
+    # batch is replaced rather than added to, and a rerun never counts ratings twice.
+
+    def __init__(self, totals=None):
+        if totals is None:
+            totals = pd.DataFrame({'Batch': pd.Series(dtype=object), 'MenuItemID': pd.Series(dtype=np.int64),
+                                   'RatingSum': pd.Series(dtype=float), 'RatingCount': pd.Series(dtype=np.int64)})
+        self.totals = totals
+
+    @classmethod
+    def from_order_items(cls, order_items_df, batch):
+        state = cls()
+        state.add(order_items_df, batch)
+        return state
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_csv(path, dtype={'Batch': str}))
+
+    def save(self, path):
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self.totals.to_csv(path, index=False)
+
+    def batches(self):
+        return sorted(self.totals['Batch'].unique())
+
+    def add(self, order_items_df, batch):
+        # Adds to batch (e.g. the chunks of one streamed run)
+        rated = order_items_df.dropna(subset=['Ratings'])
+        added = rated.groupby('MenuItemID')['Ratings'].agg(['sum', 'count']).reset_index()
+        added.columns = ['MenuItemID', 'RatingSum', 'RatingCount']
+        added.insert(0, 'Batch', batch)
+        totals = pd.concat([self.totals, added], ignore_index=True)
+        totals = totals.groupby(['Batch', 'MenuItemID'], as_index=False)[['RatingSum', 'RatingCount']].sum()
+        totals['RatingCount'] = totals['RatingCount'].astype(np.int64)
+        self.totals = totals
+
+    def apply_batch(self, order_items_df, batch):
+        # Replaces whatever batch held before with order_items_df
+        self.totals = self.totals[self.totals['Batch'] != batch]
+        self.add(order_items_df, batch)
+
+    def menu_item_ratings(self):
+        totals = self.totals.groupby('MenuItemID')[['RatingSum', 'RatingCount']].sum()
+        return (totals['RatingSum'] / totals['RatingCount']).round(1)
+
+
+def load_rating_state(path=RATING_STATE_PATH, folders=RATING_SOURCE_FOLDERS, output_format='csv'):
+    # Saved state if there is one, otherwise bootstrap it once from the order_items of every folder that has
+    # them (a state saved before batches were recorded is rebuilt the same way)
+    if os.path.exists(path):
+        state = RatingState.load(path)
+        if 'Batch' in state.totals.columns:
+            return state
+    backend = get_backend(output_format)
+    state = RatingState()
+    for folder in folders:
+        if os.path.exists(backend.path(folder, 'order_items')):
+            state.add(backend.read(folder, 'order_items', columns=['MenuItemID', 'Ratings']), folder)
+    return state
@@ -0,0 +1,81 @@
+import numpy as np
+import hashlib
+import random
+
+
+## BIT GENERATORS
+# Both are counter based or jumpable, so every shard can skip ahead to its own, non-overlapping part of a
+# stream. Philox is the counter based one (fast to jump, same results on every platform).
+BIT_GENERATORS = {
+    'pcg64': np.random.PCG64,
+    'philox': np.random.Philox,
+}
+DEFAULT_BIT_GENERATOR = 'pcg64'
+
+
+def name_key(name):
+    # Stable 128-bit key per stream name (hash() is salted per process, so it can't be used here)
+    digest = hashlib.sha256(name.encode('utf-8')).digest()
+    return tuple(int.from_bytes(digest[i:i + 4], 'little') for i in range(0, 16, 4))
+
+
+class RngService:
+    # One numpy Generator per named substream ('customer.Gender', 'orders.Status', ...). Every stream is
+    # seeded from (seed, name) alone, so a column's values don't change when another column draws more or
+    # less, and shard n jumps every stream n times ahead instead of reseeding it.
+
+    def __init__(self, seed=None, bit_generator=DEFAULT_BIT_GENERATOR, shard=0):
+        if bit_generator not in BIT_GENERATORS:
+            raise ValueError(f"Unknown bit generator `{bit_generator}`, expected one of {sorted(BIT_GENERATORS)}")
+        # seed=None draws fresh entropy once, the streams still agree with each other for the run
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.bit_generator = bit_generator
+        self.shard = shard
+        self._streams = {}
+        self._python = {}
+
+    def stream(self, name):
+        if name not in self._streams:
+            seed_sequence = np.random.SeedSequence(self.seed, spawn_key=name_key(name))
+            bit_generator = BIT_GENERATORS[self.bit_generator](seed_sequence)
+            if self.shard:
+                bit_generator = bit_generator.jumped(self.shard)
+            self._streams[name] = np.random.Generator(bit_generator)
+        return self._streams[name]
+
+    def python(self, name):
+        # random.Random seeded from the named stream, for the per-row loops that still draw scalars
+        # (its scalar calls are several times cheaper than a Generator's)
+        if name not in self._python:
+            self._python[name] = random.Random(int(self.stream(f'{name}.python').integers(2**63)))
+        return self._python[name]
+
+    def choice(self, name, values, size, p=None):
+        # size categorical draws in one call; values stay python objects (str, bool, None)
+        values = np.asarray(values, dtype=object)
+        return values[self.stream(name).choice(len(values), size=size, p=p)]
+
+    def for_shard(self, shard):
+        return RngService(self.seed, self.bit_generator, shard)
+
+
+# The service the generators draw from, reseeded at the start of every run
+service = RngService(42)
+
+
+def seed_streams(seed, bit_generator=DEFAULT_BIT_GENERATOR, shard=0):
+    global service
+    service = RngService(seed, bit_generator, shard)
+    return service
+
+
+def stream(name):
+    return service.stream(name)
+
+
+def python_stream(name):
+    return service.python(name)
+
+
+def choice(name, values, size, p=None):
+    return service.choice(name, values, size, p)
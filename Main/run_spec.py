@@ -0,0 +1,188 @@
+from datetime import datetime
+import os
+
+from faker_pools import FakerPools
+from rng import BIT_GENERATORS
+
+
+# A run spec is a TOML (or YAML) file with a [run] and a [rows] table, e.g. run_spec.example.toml.
+# Missing keys keep Main_DG's defaults.
+RUN_KEYS = {
+    'seed': 'MASTER_SEED',
+    'rng': 'RNG_BIT_GENERATOR',
+    'workers': 'NUM_SHARDS',
+    'output_folder': 'OUTPUT_FOLDER',
+    'output_format': 'OUTPUT_FORMAT',
+    'stream_chunk_size': 'STREAM_CHUNK_SIZE',
+    'run_date': 'CURRENT_DATE',
+    'history_start': 'HISTORY_START',
+    'profile': 'PROFILE',
+    'exact': 'EXACT_CARDINALITY',
+    'simulate_orders': 'ORDER_SIMULATION',
+    'simulation_start': 'SIMULATION_START',
+    'orders_per_customer': 'SIMULATION_ORDERS_PER_CUSTOMER',
+}
+
+# Row target -> (count constant, start ID constant, end ID constant)
+ROW_KEYS = {
+    'location': ('NUM_LOCATIONS', 'LOCATION_START_ID', 'LOCATION_END_ID'),
+    'restaurant': ('NUM_RESTAURANTS', 'RESTAURANT_START_ID', 'RESTAURANT_END_ID'),
+    'menu_items': ('NUM_MENU', 'MENU_START_ID', 'MENU_END_ID'),
+    'customer': ('NUM_CUSTOMERS', 'CUSTOMER_START_ID', 'CUSTOMER_END_ID'),
+    'customer_address': ('NUM_CUSTOMER_ADDRESS', 'CUSTOMER_ADDRESS_START_ID', 'CUSTOMER_ADDRESS_END_ID'),
+    'login_audit': ('NUM_CUSTOMER_LOGIN_AUDIT', 'CUSTOMER_LOGIN_AUDIT_START_ID', 'CUSTOMER_LOGIN_AUDIT_END_ID'),
+    'delivery_agent': ('NUM_DELIVERY_AGENT', 'DELIVERY_AGENT_START_ID', 'DELIVERY_AGENT_END_ID'),
+    'orders': ('NUM_ORDERS', 'ORDER_START_ID', 'ORDER_END_ID'),
+    'order_items': ('NUM_ORDERS_ITEMS', 'ORDER_ITEMS_START_ID', 'ORDER_ITEMS_END_ID'),
+}
+
+# Tables whose generator produces exactly the target; the others follow from their parents (40 cities,
+# restaurants per city, 1-3 addresses and 1-8 orders per customer, ...) unless run.exact is set
+EXACT_TARGETS = {'customer', 'login_audit'}
+MAX_LOCATIONS = 40
+
+# Benchmark stage -> table, for the dry-run estimate
+STAGE_TABLES = {
+    'location': 'location', 'restaurant': 'restaurant', 'menu': 'menu_items', 'customer': 'customer',
+    'address': 'customer_address', 'login_audit': 'login_audit', 'delivery_agent': 'delivery_agent',
+    'orders': 'orders', 'order_items': 'order_items', 'delivery': 'delivery',
+}
+CUSTOMER_TABLES = ['customer', 'customer_address', 'login_audit', 'orders', 'order_items', 'delivery']
+
+
+def load_run_spec(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            spec = tomllib.load(f)
+    elif extension in ('.yaml', '.yml'):
+        import yaml
+        with open(path) as f:
+            spec = yaml.safe_load(f) or {}
+    else:
+        raise ValueError(f"Unknown run spec format `{extension}`, expected .toml, .yaml or .yml")
+    return validate_run_spec(spec)
+
+
+def validate_run_spec(spec):
+    unknown = set(spec) - {'run', 'rows'}
+    unknown |= {f'run.{key}' for key in set(spec.get('run', {})) - set(RUN_KEYS)}
+    unknown |= {f'rows.{key}' for key in set(spec.get('rows', {})) - set(ROW_KEYS)}
+    if unknown:
+        raise ValueError(f"Unknown run spec keys: {sorted(unknown)}")
+
+    run = dict(spec.get('run', {}))
+    rows = dict(spec.get('rows', {}))
+    for table, count in rows.items():
+        if not isinstance(count, int) or count < 0:
+            raise ValueError(f"rows.{table} must be a non-negative integer, got {count!r}")
+    if 'run_date' in run and not isinstance(run['run_date'], datetime):
+        run['run_date'] = datetime.fromisoformat(str(run['run_date']))
+    if isinstance(run.get('history_start'), str) and not run['history_start'].startswith('-'):
+        run['history_start'] = datetime.fromisoformat(run['history_start'])
+    if run.get('output_format', 'csv') not in ('csv', 'parquet'):
+        raise ValueError(f"run.output_format must be 'csv' or 'parquet', got {run['output_format']!r}")
+    if run.get('rng', 'pcg64') not in BIT_GENERATORS:
+        raise ValueError(f"run.rng must be one of {sorted(BIT_GENERATORS)}, got {run['rng']!r}")
+    if run.get('exact') and run.get('simulate_orders'):
+        raise ValueError("run.exact and run.simulate_orders can't be combined, simulated order counts are random")
+    if isinstance(run.get('simulation_start'), str) and not run['simulation_start'].startswith('-'):
+        run['simulation_start'] = datetime.fromisoformat(run['simulation_start'])
+    if run.get('exact') and rows.get('location', 0) > MAX_LOCATIONS:
+        raise ValueError(f"rows.location can be at most {MAX_LOCATIONS}, the number of known cities")
+    if run.get('stream_chunk_size') == 0:
+        run['stream_chunk_size'] = None
+    return {'run': run, 'rows': rows}
+
+
+def apply_run_spec(spec, dg):
+    # Sets the Main_DG module constants from the spec; end IDs and the derived address / login counts
+    # are recomputed from the customer target unless the spec sets them
+    for key, value in spec['run'].items():
+        setattr(dg, RUN_KEYS[key], value)
+    if 'seed' in spec['run']:
+        dg.faker_pools = FakerPools('en_IN', spec['run']['seed'])
+
+    rows = dict(spec['rows'])
+    if 'customer' in rows:
+        rows.setdefault('customer_address', rows['customer'] * 2)
+        rows.setdefault('login_audit', rows['customer'] * 3)
+        if spec['run'].get('exact'):
+            # Averages of the random mode: 4.5 orders per customer, 1.76 items per order
+            rows.setdefault('orders', round(rows['customer'] * 4.5))
+            rows.setdefault('order_items', round(rows['orders'] * 1.76))
+    for table, count in rows.items():
+        num_name, start_name, end_name = ROW_KEYS[table]
+        setattr(dg, num_name, count)
+        setattr(dg, end_name, getattr(dg, start_name) + count)
+
+
+def enforced_targets(spec):
+    return set(ROW_KEYS) if spec['run'].get('exact') else EXACT_TARGETS
+
+
+def unenforced_targets(spec):
+    return sorted(set(spec['rows']) - enforced_targets(spec))
+
+
+def estimate_run(spec, dg, calibration_customers=1000):
+    # Dry run: the stages are run once at calibration_customers, their rows, rows/s and in-memory frame
+    # size per customer are scaled to the spec's customer count (dimension tables stay as measured).
+    # Returns {table: {'rows', 'seconds', 'frame_mb'}} plus a 'write' entry (export time, no rows of its
+    # own) and a 'total' entry.
+    from benchmark import run_scale
+
+    num_customers = spec['rows'].get('customer', dg.NUM_CUSTOMERS)
+    calibration = {result['stage']: result for result in run_scale(calibration_customers, spec['run'].get('seed', 42))}
+    factor = num_customers / calibration_customers
+
+    estimate = {}
+    for stage, table in STAGE_TABLES.items():
+        measured = calibration[stage]
+        scale = factor if table in CUSTOMER_TABLES else 1
+        rows = measured['rows'] * scale
+        if table in spec['rows'] and table in enforced_targets(spec) and measured['rows']:
+            rows = spec['rows'][table]
+            scale = rows / measured['rows']
+        estimate[table] = {
+            'rows': int(rows),
+            'seconds': measured['seconds'] * scale,
+            'frame_mb': measured['frame_mb'] * scale,
+        }
+    for stage in ('settlement', 'rating_rollup'):
+        estimate['orders']['seconds'] += calibration[stage]['seconds'] * factor
+    # Export: write times scaled by the rows written, customer-side and dimension tables separately
+    # (the same as measured unless exact targets change the dimension tables)
+    write_seconds = 0
+    for write_stage, tables in (('write_customer_tables', CUSTOMER_TABLES),
+                                ('write_dimension_tables', [t for t in STAGE_TABLES.values() if t not in CUSTOMER_TABLES])):
+        measured_rows = sum(calibration[stage]['rows'] for stage, table in STAGE_TABLES.items() if table in tables)
+        estimated_rows = sum(estimate[table]['rows'] for table in tables)
+        write_seconds += calibration[write_stage]['seconds'] * estimated_rows / max(measured_rows, 1)
+    estimate['write'] = {'rows': 0, 'seconds': write_seconds, 'frame_mb': 0}
+
+    chunk_size = spec['run'].get('stream_chunk_size') or dg.STREAM_CHUNK_SIZE
+    held = sum(estimate[table]['frame_mb'] for table in estimate)
+    if chunk_size:
+        # Only one chunk of the customer-side tables is held at a time
+        chunk_factor = min(1, chunk_size / max(num_customers, 1))
+        held = (sum(estimate[t]['frame_mb'] for t in estimate if t not in CUSTOMER_TABLES)
+                + chunk_factor * sum(estimate[t]['frame_mb'] for t in CUSTOMER_TABLES))
+    workers = spec['run'].get('workers', dg.NUM_SHARDS)
+    seconds = sum(estimate[table]['seconds'] for table in estimate)
+    if workers > 1:
+        parallel = sum(estimate[t]['seconds'] for t in ('customer', 'customer_address', 'login_audit', 'orders'))
+        seconds -= parallel * (1 - 1 / workers)
+    estimate['total'] = {'rows': sum(e['rows'] for e in estimate.values()), 'seconds': seconds, 'frame_mb': held}
+    return estimate
+
+
+def format_estimate(estimate, spec):
+    lines = [f"{'table':<18}{'rows':>14}{'seconds':>12}{'memory MB':>12}"]
+    for table, entry in estimate.items():
+        rows = '-' if table == 'write' else f"{entry['rows']:,}"
+        lines.append(f"{table:<18}{rows:>14}{entry['seconds']:>12,.1f}{entry['frame_mb']:>12,.0f}")
+    for table in unenforced_targets(spec):
+        lines.append(f"note: rows.{table} is not enforced, {table} rows follow from their parent tables")
+    return '\n'.join(lines)
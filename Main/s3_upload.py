@@ -1,38 +1,47 @@
 
-import boto3
 from datetime import datetime
+import os
 from dotenv import dotenv_values
+
+from upload_stage import FileSystemStore, S3Store, UploadManifest, partition_prefix, upload_files
+
 my_secrets = dotenv_values(".env")
 
-s3 = boto3.client(
-     's3',
-     aws_access_key_id=f'{my_secrets['AWS_ACCESS_KEY']}',
-     aws_secret_access_key=f'{my_secrets['AWS_SECRET_KEY']}'
-)
+## 's3' or 'filesystem' (a local stand-in for the bucket under LOCAL_STORE_PATH). Set AWS_S3_ENDPOINT_URL
+## in .env to run the 's3' backend against an S3-compatible server instead of AWS.
+UPLOAD_BACKEND = 's3'
+LOCAL_STORE_PATH = 'state/s3_local'
+
+## Uploaded object keys with their ETags; files already in it are skipped on a rerun
+MANIFEST_PATH = 'state/upload_manifest.json'
 
-today = datetime.today()
-day = 28
-month = 4
-year = today.year
+MAX_WORKERS = 8
+COMPRESS = True
 
-print(day, month, year)
+## Date partition of the run (year/month/day in the object key), None = today
+RUN_DATE = None
+
+run_date = RUN_DATE or datetime.today()
+print(run_date.day, run_date.month, run_date.year)
 
 folder_name = 'data5'
 file_names = ['customer_address','customer','delivery_agent','delivery','location','login_audit','menu_items','order_items','orders','restaurant']
 # file_names = ['delivery_agent']
 
-bucket_name = f'{my_secrets['AWS_S3_BUCKET_NAME']}'
+if UPLOAD_BACKEND == 's3':
+    store = S3Store(my_secrets['AWS_S3_BUCKET_NAME'], my_secrets['AWS_ACCESS_KEY'], my_secrets['AWS_SECRET_KEY'],
+                    my_secrets.get('AWS_S3_ENDPOINT_URL'))
+else:
+    store = FileSystemStore(LOCAL_STORE_PATH)
+
+prefix = partition_prefix(my_secrets.get('AWS_S3_BUCKET_FOLDER_NAME', 'data'), run_date)
+paths = [f'{folder_name}/{files}.json' if files in ['delivery_agent'] else f'{folder_name}/{files}.csv'
+         for files in file_names]
 
-for files in file_names:
-    if files in ['delivery_agent']:
-        file_name = f'{folder_name}/{files}.json'
-        object_name = f'{my_secrets['AWS_S3_BUCKET_FOLDER_NAME']}/{year}/{month}/{day}/{files}.json'
+results = upload_files(paths, store, prefix, UploadManifest(MANIFEST_PATH), MAX_WORKERS, COMPRESS)
+for path, result in results.items():
+    files = os.path.splitext(os.path.basename(path))[0]
+    if isinstance(result, Exception):
+        print(f'{files} failed due to : ', result)
     else:
-        file_name = f'{folder_name}/{files}.csv'
-        object_name = f'{my_secrets['AWS_S3_BUCKET_FOLDER_NAME']}/{year}/{month}/{day}/{files}.csv'
-    
-    try:
-        s3.upload_file(file_name, bucket_name, object_name)
-        print(f'{files} uploaded successfully')
-    except Exception as e:
-        print(f'{files} failed due to : ',e)
\ No newline at end of file
+        print(f'{files} {result} successfully' if result == 'uploaded' else f'{files} already uploaded, skipped')
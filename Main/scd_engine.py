@@ -0,0 +1,87 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime
+
+import rng
+
+
+def pick_columns(num_rows, num_columns, columns_per_row, stream='scd.columns'):
+    # num_rows x num_columns mask with between columns_per_row[0] and columns_per_row[1] distinct columns
+    # set per row (random keys ranked per row, the lowest k ranks win)
+    low, high = columns_per_row
+    k = rng.stream(f'{stream}.count').integers(low, min(high, num_columns) + 1, size=num_rows)
+    rank = rng.stream(stream).random((num_rows, num_columns)).argsort(axis=1).argsort(axis=1)
+    return rank < k[:, None]
+
+
+def mutate_sample(df, sample_size, rules, columns_per_row=(1, 2), modified_at=None, modified_column='ModifiedDate'):
+    # Slowly changing dimension batch: samples sample_size rows, picks which rule columns change per row and
+    # asks each rule for all of its new values at once. rules maps column -> rule(rows) returning one value per
+    # row of the rows frame; rules run in order, so a rule sees the columns changed before it (Email after
+    # Full_Name). Every sampled row gets ModifiedDate = modified_at (the run time by default).
+    sample = df.sample(min(sample_size, len(df)), random_state=rng.stream('scd.sample')).copy()
+    columns = list(rules)
+    changed = pick_columns(len(sample), len(columns), columns_per_row)
+
+    for position, column in enumerate(columns):
+        rows = changed[:, position]
+        if rows.any():
+            # Merged as objects and re-inferred, so e.g. None into an int column becomes a float column
+            # instead of a failed setitem
+            column_values = sample[column].to_numpy(dtype=object, copy=True)
+            column_values[rows] = rules[column](sample[rows])
+            sample[column] = pd.Series(column_values, index=sample.index).infer_objects()
+
+    if modified_column is not None:
+        if modified_at is None:
+            modified_at = datetime.now().replace(microsecond=0)
+        sample[modified_column] = pd.Timestamp(modified_at)
+    return sample
+
+
+## Vectorized value makers for rules
+# All of them draw from the 'scd.values' rng substream unless given their own stream
+
+def choice(values, p=None, stream='scd.values'):
+    return lambda rows: rng.choice(stream, values, len(rows), p)
+
+
+def integers(low, high, stream='scd.values'):
+    # Uniform integers in [low, high]
+    return lambda rows: rng.stream(stream).integers(low, high + 1, size=len(rows), dtype=np.int64)
+
+
+def uniform(low, high, decimals=1, stream='scd.values'):
+    return lambda rows: np.round(rng.stream(stream).uniform(low, high, size=len(rows)), decimals)
+
+
+def optional(rule, fill_rate, stream='scd.values'):
+    # rule's value for fill_rate of the rows, None for the rest
+    def make(rows):
+        values = np.asarray(rule(rows), dtype=object)
+        values[rng.stream(stream).random(len(rows)) >= fill_rate] = None
+        return values
+    return make
+
+
+def distinct_samples(values, low, high, size, stream='scd.values'):
+    # size lists of low - high distinct values each, in random order (random.sample per row, in one draw)
+    values = np.asarray(values, dtype=object)
+    order = rng.stream(stream).random((size, len(values))).argsort(axis=1)
+    k = rng.stream(f'{stream}.count').integers(low, min(high, len(values)) + 1, size=size)
+    return [values[order[row, :k[row]]].tolist() for row in range(size)]
+
+
+def email_from(name_column, domains=('gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'), stream='scd.values'):
+    # name + 1-999 + domain, like the generators build emails
+    def make(rows):
+        return emails(rows[name_column], domains, stream)
+    return make
+
+
+def emails(names, domains=('gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'), stream='emails'):
+    # name without spaces, lower case + 1-999 + @domain, one per name
+    names = pd.Series(names).astype(str).str.lower().str.replace(' ', '', regex=False)
+    numbers = pd.Series(rng.stream(stream).integers(1, 1000, size=len(names)), index=names.index).astype(str)
+    picked = pd.Series(rng.choice(f'{stream}.domain', domains, len(names)), index=names.index)
+    return (names + numbers + '@' + picked).to_numpy(dtype=object)
@@ -0,0 +1,73 @@
+import pandas as pd
+import numpy as np
+
+import rng
+
+
+SETTLEMENT_COLUMNS = ['TotalAmount', 'DeliveryCharges', 'DiscountAmount', 'CouponApplied', 'CouponCode', 'FinalAmount']
+
+# (lowest order total, highest order total (exclusive), min charge, max charge)
+DELIVERY_CHARGE_TIERS = [
+    (None, 199, 80, 100),
+    (200, 399, 50, 80),
+    (400, 599, 30, 50),
+]
+
+
+def delivery_charges_for(order_total):
+    # Delivery charges by order total tier, free above ₹599
+    order_total = np.asarray(order_total)
+    charges = np.zeros(len(order_total), dtype=np.int64)
+    for low, high, min_charge, max_charge in DELIVERY_CHARGE_TIERS:
+        in_tier = order_total < high
+        if low is not None:
+            in_tier &= order_total >= low
+        charges[in_tier] = rng.stream('orders.DeliveryCharges').integers(min_charge, max_charge + 1, size=in_tier.sum())
+    return charges
+
+
+def best_eligible_coupons(orders, offered_coupons):
+    # orders: OrderID, TotalAmount, PaymentMethod, IsFirstOrder
+    # offered_coupons: CouponCatalog.offered_for_orders rows (OrderID, code, min_amount, discount_amount,
+    # payment_method, is_first_order, rank)
+    candidates = offered_coupons.merge(orders, on='OrderID')
+
+    # 1. Order amount meets minimum
+    # 2. Payment method matches (if payment-specific)
+    # 3. First order status (if first-order coupon)
+    eligible = candidates[
+        (candidates['TotalAmount'] >= candidates['min_amount'])
+        & (candidates['payment_method'].isna() | (candidates['payment_method'] == candidates['PaymentMethod']))
+        & ~(candidates['is_first_order'] & ~candidates['IsFirstOrder'].astype(bool))
+    ]
+
+    # Most discount wins, ties go to the coupon listed first
+    eligible = eligible.sort_values(['OrderID', 'discount_amount', 'rank'], ascending=[True, False, True])
+    best = eligible.drop_duplicates('OrderID')
+    return best[['OrderID', 'code', 'discount_amount']].rename(
+        columns={'code': 'CouponCode', 'discount_amount': 'DiscountAmount'})
+
+
+def settle_orders(order_df, order_items_df, offered_coupons):
+    # TotalAmount, DeliveryCharges, DiscountAmount, CouponCode and FinalAmount for every order
+    # that has items, computed column-wise and joined back onto order_df in one go.
+    totals = order_items_df.groupby('OrderID', sort=False)['Subtotal'].sum()
+    settled = pd.DataFrame({'OrderID': totals.index.to_numpy(), 'TotalAmount': totals.to_numpy()})
+    settled = settled.merge(order_df[['OrderID', 'PaymentMethod', 'IsFirstOrder']], on='OrderID')
+    settled['DeliveryCharges'] = delivery_charges_for(settled['TotalAmount'].to_numpy())
+
+    best = best_eligible_coupons(settled, offered_coupons)
+    settled = settled.merge(best, on='OrderID', how='left')
+
+    settled['CouponApplied'] = settled['CouponCode'].notna()
+    settled['DiscountAmount'] = settled['DiscountAmount'].fillna(0).astype(np.int64)
+    settled['FinalAmount'] = np.maximum(settled['TotalAmount'] - settled['DiscountAmount'], 0) + settled['DeliveryCharges']
+    settled = settled[['OrderID'] + SETTLEMENT_COLUMNS]
+
+    # Orders without items keep their zero amounts
+    result = order_df.drop(columns=SETTLEMENT_COLUMNS).merge(settled, on='OrderID', how='left')
+    for column in ['TotalAmount', 'DeliveryCharges', 'DiscountAmount', 'FinalAmount']:
+        result[column] = result[column].fillna(0).astype(settled[column].dtype)
+    result['CouponApplied'] = result['CouponApplied'].fillna(False).astype(bool)
+
+    return result[order_df.columns]
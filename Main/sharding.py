@@ -0,0 +1,83 @@
+import pandas as pd
+import numpy as np
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+import rng
+
+
+def split_range(start_id, count, num_shards):
+    # Contiguous [start, end) ranges covering start_id .. start_id + count
+    bounds = start_id + np.linspace(0, count, num_shards + 1).astype(np.int64)
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(num_shards)]
+
+
+def generate_customer_shard(task):
+    # Runs in a worker process: seeds the rng substreams from the master seed, jumped ahead by the shard
+    # number so shards never overlap, then builds the shard's customers, addresses, logins and orders
+    # with shard-local IDs starting at 0
+    generators = importlib.import_module(task['module'])
+    generators.CURRENT_DATE = task['run_date']
+    for name, value in task['settings'].items():
+        setattr(generators, name, value)
+    rng.seed_streams(task['seed'], task['bit_generator'], task['shard'])
+
+    customer_start_id, customer_end_id = task['customers']
+    customer_df = generators.generate_customer_data(customer_start_id, customer_end_id)
+    address_df = generators.generate_customer_address_data(0, 0, customer_df, task['location_df'])
+    login_audit_df = generators.generate_login_audit_data(0, task['num_logins'], customer_df)
+    order_df = generators.generate_orders_data(0, 0, customer_df, task['restaurant_df'], address_df, task['location_df'])
+    return customer_df, address_df, login_audit_df, order_df
+
+
+def generate_customer_shards(num_shards, master_seed, run_date, location_df, restaurant_df,
+                             customer_start_id, num_customers, address_start_id,
+                             login_start_id, num_logins, order_start_id,
+                             max_workers=None, module='Main_DG', settings=None, bit_generator=rng.DEFAULT_BIT_GENERATOR):
+    # Splits the customer ID range across a process pool. Shards are concatenated in shard order
+    # and the address, login and order IDs renumbered, so IDs stay contiguous and the output is
+    # the same for a given master seed and shard count whatever the worker scheduling.
+    # settings are module attributes set in every worker (e.g. values a run spec changed in the parent).
+    customer_ranges = split_range(customer_start_id, num_customers, num_shards)
+    login_counts = [end - start for start, end in split_range(0, num_logins, num_shards)]
+
+    tasks = [{
+        'module': module,
+        'seed': master_seed,
+        'bit_generator': bit_generator,
+        'shard': shard,
+        'run_date': run_date,
+        'customers': customer_ranges[shard],
+        'num_logins': login_counts[shard],
+        'location_df': location_df,
+        'restaurant_df': restaurant_df,
+        'settings': settings or {},
+    } for shard in range(num_shards)]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        shards = list(pool.map(generate_customer_shard, tasks))
+
+    customers, addresses, logins, orders = [], [], [], []
+    next_address_id, next_login_id, next_order_id = address_start_id, login_start_id, order_start_id
+    for customer_df, address_df, login_audit_df, order_df in shards:
+        address_df = address_df.copy()
+        order_df = order_df.copy()
+        login_audit_df = login_audit_df.copy()
+
+        # Shard-local IDs start at 0, shift them to the next free global ID
+        address_df['AddressID'] += next_address_id
+        order_df['AddressID'] += next_address_id
+        order_df['OrderID'] += next_order_id
+        login_audit_df['LoginID'] += next_login_id
+
+        next_address_id += len(address_df)
+        next_order_id += len(order_df)
+        next_login_id += len(login_audit_df)
+
+        customers.append(customer_df)
+        addresses.append(address_df)
+        logins.append(login_audit_df)
+        orders.append(order_df)
+
+    return (pd.concat(customers, ignore_index=True), pd.concat(addresses, ignore_index=True),
+            pd.concat(logins, ignore_index=True), pd.concat(orders, ignore_index=True))
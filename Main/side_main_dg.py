@@ -2,10 +2,18 @@ import pandas as pd
 import numpy as np
 from faker import Faker
 import random
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta
 import json
 import os
 
+from order_engine import generate_orders_bulk, generate_order_items, generate_deliveries
+from settlement import settle_orders
+from coupon_catalog import CouponCatalog
+from ratings import (menu_item_ratings, restaurant_ratings, apply_menu_item_ratings,
+                     apply_restaurant_ratings, load_rating_state, RATING_STATE_PATH)
+from faker_pools import FakerPools
+from id_registry import IDRegistry
+
 
 start_time = datetime.now()
 print(f"Program started at: {start_time}")
@@ -16,6 +24,7 @@ print(f"Program started at: {start_time}")
 
 # Initialize Faker
 fake = Faker('en_IN')  # Using Indian locale
+faker_pools = FakerPools('en_IN', 42)  # names, companies and street names drawn once and cached
 
 
 if not os.path.exists('data5'):
@@ -75,6 +84,14 @@ ORDER_ITEMS_END_ID = ORDER_ITEMS_START_ID + NUM_ORDERS_ITEMS
 
 DELIVERY_START_ID = 393710
 
+# Orders, order items and deliveries take their start IDs from the shared ID registry,
+# the *_START_ID values are only used for a table the registry has not seen yet
+id_registry = IDRegistry()
+
+## RUNNING RATING TOTALS (ratings.RATING_STATE_PATH): every run overwrites data6, so this batch replaces
+## the data6 ratings of the previous run instead of adding to them
+RATING_BATCH = 'data6'
+
 ## DELIVERY AGENTS - Distributed across locations
 NUM_DELIVERY_AGENT = 150
 DELIVERY_AGENT_START_ID = 4967
@@ -323,6 +340,7 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
     ]
     
     data = []
+    coupon_rows = []
     # Get only active locations
     active_locations = location_df[location_df['ActiveFlag'] == True]
     
@@ -380,7 +398,7 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
             open_status = 'Open' if active_flag == True else 'Closed'
     
             # Address and locality
-            locality = f"{fake.street_name()}"
+            locality = f"{faker_pools.street_name()}"
             city_pincode = location_row['PinCode']
             restaurant_address = f'{random.choice(["Ground Floor,","First Floor,","Second Floor,","Third Floor,", ""])} {locality}, {city_name} - {city_pincode}'
             
@@ -398,24 +416,22 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
             num_coupons = random.randint(3, 5)
             restaurant_coupons = random.sample(coupon_types, min(num_coupons, len(coupon_types)))
             
-            # Create JSON structure for coupons
-            coupons_json = []
-            for coupon in restaurant_coupons:
+            # Add the coupons to the coupon catalog (serialized to JSON only at export time)
+            for rank, coupon in enumerate(restaurant_coupons):
                 # Slightly vary the coupon parameters to make them unique
                 min_amount_variation = random.uniform(0.9, 1.1)
                 discount_variation = random.uniform(0.9, 1.1)
                 
-                coupon_data = {
-                    "code": f"{coupon[0]}_{restaurant_id}",
-                    "min_amount": int(coupon[1] * min_amount_variation),
-                    "discount_amount": int(coupon[2] * discount_variation),
-                    "description": coupon[3],
-                    "payment_method": coupon[4]  # None or specific payment method
-                }
-                coupons_json.append(coupon_data)
-            
-            # Convert to JSON string
-            coupons_str = json.dumps(coupons_json)
+                coupon_rows.append({
+                    'RestaurantID': restaurant_id,
+                    'code': f"{coupon[0]}_{restaurant_id}",
+                    'min_amount': int(coupon[1] * min_amount_variation),
+                    'discount_amount': int(coupon[2] * discount_variation),
+                    'description': coupon[3],
+                    'payment_method': coupon[4],  # None or specific payment method
+                    'is_first_order': coupon[0] == 'FIRSTORDER',
+                    'rank': rank
+                })
             
             
             data.append({
@@ -431,7 +447,7 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
                 'Locality': locality,
                 'Restaurant_Address': restaurant_address,
                 'Ratings': 0,
-                'Coupons': coupons_str,  # New field for coupons
+                'Coupons': None,  # Filled from the coupon catalog at export time
                 'Latitude': latitude,
                 'Longitude': longitude,
                 'CreatedDate': created_date,
@@ -445,7 +461,7 @@ def generate_restaurant_data(restaurant_start_id, restaurant_end_id, location_df
         # if restaurant_id >= restaurant_end_id:
         #     break
     
-    return pd.DataFrame(data)
+    return pd.DataFrame(data), CouponCatalog(coupon_rows)
 
 
 def generate_menu_data(menu_start_id, menu_end_id, restaurant_df):
@@ -619,11 +635,11 @@ def generate_customer_data(customer_start_id, customer_end_id):
         # Basic info
         gender = np.random.choice(genders , p=[0.49,0.48,0.03])
         if gender == 'Male':
-            name = fake.name_male()
+            name = faker_pools.name_male()
         elif gender == 'Female':
-            name = fake.name_female()
+            name = faker_pools.name_female()
         else:
-            name = fake.name()
+            name = faker_pools.name()
             
         mobile = f"{random.randint(7000000000, 9999999999)}"
         email_domain = random.choice(['gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com'])
@@ -704,8 +720,8 @@ def generate_customer_address_data(customer_address_start_id, customer_address_e
             flat_no = str(random.randint(1, 50))
             # house_no = str(random.randint(1, 10)) if random.random() > 0.5 else ""
             floor = str(random.randint(1, 40)) if random.random() > 0.3 else ""
-            building = fake.company() + " " + random.choice(['Apartments', 'Residency', 'Heights', 'Towers', 'Complex'])
-            landmark = random.choice(["Near ","Opp. ","B/h. ","Beside ","Behind ",""]) + fake.company()
+            building = faker_pools.company() + " " + random.choice(['Apartments', 'Residency', 'Heights', 'Towers', 'Complex'])
+            landmark = random.choice(["Near ","Opp. ","B/h. ","Beside ","Behind ",""]) + faker_pools.company()
             
             # Locality
             locality =  locality = random.choice([
@@ -821,11 +837,11 @@ def generate_delivery_agent_data(delivery_agents_start_id, delivery_agent_end_id
             gender = np.random.choice(['Male', 'Female', 'Other'], p=[0.9, 0.09, 0.01])
             
             if gender == 'Male':
-                name = fake.name_male()
+                name = faker_pools.name_male()
             elif gender == 'Female':
-                name = fake.name_female()
+                name = faker_pools.name_female()
             else:
-                name = fake.name()
+                name = faker_pools.name()
                 
             phone = f"{random.randint(6000000000, 9999999999)}"
             vehicle_type = random.choice(vehicle_types)
@@ -872,433 +888,28 @@ def generate_delivery_agent_data(delivery_agents_start_id, delivery_agent_end_id
 
 
 def generate_orders_data(order_start_id, order_end_id, customer_df, restaurant_df, address_df, location_df):
-    order_statuses = ['Delivered', 'Canceled', 'Failed', 'Returned']
-    payment_methods = ['Cash', 'UPI', 'CreditCard', 'DebitCard']
-    
-    data = []
-    order_id = order_start_id
-    
-    # Add location information to address_df for easier joining
-    address_with_location = pd.DataFrame()
-    
-    # For each customer, generate orders from restaurants in the same city as their address
-    for customer_id in customer_df['CustomerID']:
-        # Get all addresses for this customer
-        customer_addresses = address_df[address_df['CustomerID'] == customer_id]
-        
-        if len(customer_addresses) == 0:
-            continue
-            
-        # Generate 1-5 orders for this customer
-        num_orders = random.randint(1, 8)
-        
-        # Track if this is the first order for this customer
-        is_first_order = True
-        
-        for _ in range(num_orders):
-            
-            # Randomly select one of the customer's addresses
-            address = customer_addresses.sample(1).iloc[0]
-            # print(pd.to_datetime(address['CreatedDate']))
-            address_id = address['AddressID']
-            city = address['City']
-            
-            
-            # Order date (last 90 days)
-            start_date = datetime(2020, 8, 1, 0, 0, 0)
-            end_date = datetime(2020, 12, 31, 23, 59, 59)
-            order_date = fake.date_time_between(start_date=pd.to_datetime(address['CreatedDate']), end_date=end_date)
-            # print(order_date)
-            # Created and modified dates
-            created_date = order_date
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
-            
-            # Find restaurants in the same city
-            city_location_ids = location_df[location_df['City'] == city]['LocationID'].tolist()
-            city_restaurants = restaurant_df[restaurant_df['LocationID'].isin(city_location_ids)]
-            # print(city_restaurants)
-            # Skip if no restaurants found in this city
-            if len(city_restaurants) == 0:
-                continue
-                
-            # Select a random restaurant from the same city
-            filtered_restaurants = city_restaurants[pd.to_datetime(city_restaurants['CreatedDate']) < order_date]
-            # print(filtered_restaurants)
-            # print(len(filtered_restaurants))
-            if len(filtered_restaurants) == 0:
-                continue
-            # print('hello')
-            restaurant = filtered_restaurants.sample(1).iloc[0]
-            # print(restaurant)
-            restaurant_id = restaurant['RestaurantID']
-            # print(restaurant_id)
-            
-             # Parse operating hours from restaurant
-            start_hr, end_hr = [
-                int(time_part.split(":")[0]) for time_part in restaurant['OperatingHours'].replace(" ", "").split("-")
-            ]
-
-            # Construct available hours across midnight
-            if end_hr > start_hr:
-                available_hours = list(range(start_hr, end_hr))
-            else:
-                available_hours = list(range(start_hr, 24)) + list(range(0, end_hr))
-
-            # Just pick a random hour — shift probability already handled upstream
-            order_hour = random.choice(available_hours)
-
-            # Final order datetime
-            # order_date_date = pd.to_datetime(address['CreatedDate']) + timedelta(days=random.randint(1, 90))
-            order_date = datetime.combine(order_date.date(), time(hour=order_hour, minute=random.randint(0, 59)))
-            
-            # Order amount (initially set to 0, will be updated later)
-            total_amount = 0
-            final_amount = 0
-            
-            # Status
-            # days_since_order = (datetime.now() - order_date).days
-            status = random.choices(
-                    order_statuses, 
-                    weights=[0.8, 0.1, 0.03, 0.07]
-            )[0]
-            
-            # Payment method
-            payment_method = np.random.choice(payment_methods,p=[0.2,0.7,0.05,0.05])
-            
-            # Created and modified dates
-            created_date = order_date
-            modified_date = fake.date_time_between(start_date=created_date, end_date='now')
-            # Get restaurant coupons
-            coupon_applied = False
-            coupon_code = None
-            discount_amount = 0
-            delivery_charges = 0
-            restaurant_coupons = None
-            try:
-                restaurant_coupons = json.loads(restaurant['Coupons'])
-            except:
-                restaurant_coupons = None
-            
-            # Randomly decide whether to keep the coupons or set them to None
-            if np.random.rand() > 0.3:
-                restaurant_coupons = restaurant_coupons
-            else:
-                restaurant_coupons = None
-                   
-            data.append({
-                'OrderID': order_id,
-                'CustomerID': customer_id,
-                'RestaurantID': restaurant_id,
-                'OrderDate': order_date,
-                'TotalAmount': total_amount,  # Will be updated in order_items function
-                'DiscountAmount': discount_amount,
-                'DeliveryCharges' : delivery_charges,
-                'FinalAmount' : final_amount,
-                'Status': status,
-                'PaymentMethod': payment_method,
-                'IsFirstOrder': is_first_order,
-                'RestaurantCoupons': restaurant['Coupons'] if restaurant_coupons != None else None,  # Store all restaurant coupons
-                'CouponApplied': coupon_applied,
-                'CouponCode': coupon_code,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date,
-                'AddressID': address_id
-            })
-            
-            order_id += 1
-            is_first_order = False  # Mark subsequent orders as not first orders
-        #     if order_id >= 10:
-        #         break
-                
-        # if order_id >= 10:
-        #     break
-    
-    result_df = pd.DataFrame(data)
-    
-    return result_df
+    # Orders are drawn in one batched pass (1-8 orders per customer, restaurants from the address's city)
+    end_date = datetime(2020, 12, 31, 23, 59, 59)
+    return generate_orders_bulk(order_start_id, customer_df, restaurant_df, address_df, location_df,
+                                max_orders_per_customer=8, order_end_date=end_date)
 
 
 def generate_order_items_data(order_items_start_id,order_df, menu_df):
-    data = []
-    order_item_id = order_items_start_id
-    
-    # Get the mapping of restaurant to their menu items
-    restaurant_menu_map = {}
-    for _, menu_item in menu_df.iterrows():
-        restaurant_id = menu_item['RestaurantID']
-        menu_id = menu_item['MenuItemID']
-        
-        if restaurant_id not in restaurant_menu_map:
-            restaurant_menu_map[restaurant_id] = []
-            
-        restaurant_menu_map[restaurant_id].append(menu_id)
-    
-    # For each order, generate 1-5 order items
-    for idx, order in order_df.iterrows():
-        order_id = order['OrderID']
-        order_date = order['CreatedDate']
-        restaurant_id = order['RestaurantID']
-        payment_method = order['PaymentMethod']
-        # print('Payment method' , payment_method)
-        is_first_order = order['IsFirstOrder']
-        
-        
-        # Get available menu items for this restaurant
-        menu_ids = restaurant_menu_map.get(restaurant_id, [])
-        # print('menu ids',menu_ids)
-        if not menu_ids:
-            continue
-            
-        filtered_menu_id = []
-        for menu_id in menu_ids:
-            if pd.to_datetime(menu_df[menu_df['MenuItemID'] == menu_id]['CreatedDate'].values[0]) < pd.to_datetime(order_date):
-                filtered_menu_id.append(menu_id)
-        
-        if not filtered_menu_id:
-            continue
-        # print('filtered menu ids',filtered_menu_id)
-        # Generate 1-5 random order items
-        # num_items = random.randint(1, 5)
-        num_items = random.choices(
-            population=[1, 2, 3, 4, 5],
-            weights=[0.5, 0.3, 0.1, 0.06, 0.04],
-            k=1
-        )[0]
-        # Select unique menu items
-        selected_menu_ids = random.sample(filtered_menu_id, min(num_items, len(filtered_menu_id)))
-        
-        order_total = 0
-        
-        for menu_id in selected_menu_ids:
-            # Get the menu item details
-            menu_item = menu_df[menu_df['MenuItemID'] == menu_id].iloc[0]
-            price = menu_item['Price']
-            
-            # Generate random quantity
-            # quantity = random.randint(1, 3)
-            quantity = random.choices(
-                population=[1, 2, 3],
-                weights=[0.65, 0.25, 0.1],
-                k=1
-            )[0]
-            
-            # Calculate subtotal
-            subtotal = price * quantity
-            order_total += subtotal
-            
-            # Generate rating (if delivered)
-            if order['Status'] == 'Delivered':
-                ratings = np.random.choice([1, 2, 3, 4, 5], p=[0.1, 0.1, 0.1, 0.3, 0.4])
-            else:
-                ratings = None
-            
-            # Dates
-            created_date = order['CreatedDate']
-            modified_date = order['ModifiedDate']
-            
-            data.append({
-                'OrderItemID': order_item_id,
-                'OrderID': order_id,
-                'MenuItemID': menu_id,
-                'Quantity': quantity,
-                'Price': price,
-                'Subtotal': subtotal,
-                'Ratings' : ratings,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date
-            })
-            
-            order_item_id += 1
-
-    
-        # Now that we know the total order amount, we can apply coupons
-        final_amount = order_total  # Default to original amount
-        coupon_applied = False
-        coupon_code = None
-        discount_amount = 0
-        delivery_charges = 0
-
-        if order_total < 199:
-            delivery_charges = random.randint(80,100)
-        elif order_total >= 200 and order_total < 399 :
-            delivery_charges = random.randint(50,80)
-        elif order_total >= 400 and order_total < 599 :
-            delivery_charges = random.randint(30, 50)
-        else :
-            delivery_charges = 0
-
-        # Check if there are available coupons
-        if 'RestaurantCoupons' in order_df.columns and order['RestaurantCoupons'] is not None:
-            try:
-                restaurant_coupons = json.loads(order['RestaurantCoupons'])
-                eligible_coupons = []
-                
-                # Find eligible coupons based on:
-                # 1. Order amount meets minimum
-                # 2. Payment method matches (if payment-specific)
-                # 3. First order status (if first-order coupon)
-                for coupon in restaurant_coupons:
-                    # Skip if the order amount doesn't meet the minimum
-                    if order_total < coupon['min_amount']:
-                        continue
-                    
-                    # Skip if it's a payment-specific coupon and payment method doesn't match
-                    if coupon['payment_method'] is not None and coupon['payment_method'] != payment_method:
-                        continue
-                    
-                    # Skip if it's a first-order coupon but this isn't the first order
-                    if 'FIRSTORDER' in coupon['code'] and not is_first_order:
-                        continue
-                    
-                    # Add to eligible coupons
-                    eligible_coupons.append(coupon)
-                
-                # Apply the best coupon (most discount)
-                if eligible_coupons:
-                    # Sort by discount amount, highest first
-                    eligible_coupons.sort(key=lambda x: x['discount_amount'], reverse=True)
-                    best_coupon = eligible_coupons[0]
-                    
-                    coupon_code = best_coupon['code']
-                    discount_amount = best_coupon['discount_amount']
-                    final_amount = max(0, order_total - discount_amount)
-                    coupon_applied = True
-                    
-                    # Update the order with the coupon information
-                    order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-                    order_df.loc[order_df['OrderID'] == order_id, 'CouponApplied'] = coupon_applied
-                    order_df.loc[order_df['OrderID'] == order_id, 'CouponCode'] = coupon_code
-                    order_df.loc[order_df['OrderID'] == order_id, 'DiscountAmount'] = discount_amount
-                    
-                    order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-                    order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-
-                else:
-                    # No eligible coupons, update order with the original amount
-                    # order_df.at[idx, 'TotalAmount'] = order_total
-                    order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-                    order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-                    order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-            except Exception as e:
-                # If there's an error applying coupons, just use the original amount
-                order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-                order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-                order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-        else:
-            # No coupons available, update with the original amount
-           order_df.loc[order_df['OrderID'] == order_id, 'TotalAmount'] = order_total
-           order_df.loc[order_df['OrderID'] == order_id,'DeliveryCharges'] = delivery_charges
-           order_df.loc[order_df['OrderID'] == order_id, 'FinalAmount'] = final_amount + delivery_charges
-    
-    return pd.DataFrame(data)
+    # 1-5 items per order, only from menu items created before the order (see order_engine)
+    return generate_order_items(order_items_start_id, order_df, menu_df)
 
 
 def generate_delivery_data(order_df, delivery_agent_df, delivery_start_id,restaurant_df):
-    # delivery_statuses = ['Delivered', 'In Transit', 'Assigned', 'Failed']
-    
-    data = []
-    delivery_id = delivery_start_id
-    
-    # For each order, generate a delivery record
-    for _, order in order_df.iterrows():
-        order_id = order['OrderID']
-        address_id = order['AddressID']
-        order_date = order['CreatedDate']
-        
-        total_amount = order['TotalAmount']
-        if total_amount == 0:
-            continue
-        # Only generate delivery for non-canceled orders
-        if order['Status'] not in ['Canceled']:
-            # Find delivery agents in the same city as the restaurant
-            restaurant_id = order['RestaurantID']
-            restaurant_location_id = restaurant_df[restaurant_df['RestaurantID'] == restaurant_id]['LocationID'].values[0]            
-            available_agents = delivery_agent_df[delivery_agent_df['LocationID'] == restaurant_location_id]
-            # Get delivery agents (we'll assume agents can deliver to any location)
-            if len(available_agents) == 0:
-                continue
-            
-            filtered_available_agents = available_agents[pd.to_datetime(available_agents['CreatedDate']) < order_date]
-            
-            if len(filtered_available_agents) == 0:
-                continue
-            
-            # Select a random delivery agent
-            agent = filtered_available_agents.sample(1).iloc[0]
-            agent_id = agent['DeliveryAgentID']
-            
-            # Set status based on order status
-            if order['Status'] == 'Failed':
-                delivery_status = 'Failed'
-            elif order['Status'] == 'Returned':
-                delivery_status = 'Returned'
-            else:
-                delivery_status = 'Delivered'
-            
-            # Estimated time (10-60 minutes)
-            estimated_time = random.randint(15, 55)
-
-            if delivery_status in ['Delivered', 'Returned']:
-                # Increase the chance of fast delivery
-                delay_type = np.random.choice(['fast', 'normal', 'slow'], p=[0.4, 0.4, 0.2])
-
-                if delay_type == 'fast':
-                    delivered_time = random.randint(max(10, estimated_time - 10), estimated_time)
-                elif delay_type == 'normal':
-                    delivered_time = random.randint(estimated_time + 1, estimated_time + 10)
-                else:  # slow
-                    delivered_time = random.randint(estimated_time + 11, estimated_time + 30)
-            else:
-                delivered_time = None
-            
-            # Delivery date based on order date
-            if delivery_status in ['Delivered','Returned']:
-                # Add 30-90 minutes to order date
-                minutes_to_add = random.randint(30, 90)
-                delivery_date = pd.to_datetime(order['OrderDate']) + timedelta(minutes=int(delivered_time))
-            else:
-                delivery_date = None
-            
-            if delivered_time != None:
-                delivered_time = int(delivered_time)
-            
-            # Dates
-            created_date = order['CreatedDate']
-            modified_date = order['ModifiedDate']
-            
-            data.append({
-                'DeliveryID': delivery_id,
-                'OrderID': order_id,
-                'DeliveryAgentID': agent_id,
-                'DeliveryStatus': delivery_status,
-                'EstimatedTime': estimated_time,
-                'DeliveredTime' : delivered_time,
-                'AddressID': address_id,
-                'DeliveryDate': delivery_date,
-                'CreatedDate': created_date,
-                'ModifiedDate': modified_date
-            })
-            
-            delivery_id += 1
-
-            # if(delivery_id >= 100):
-            #     break
-    
-    return pd.DataFrame(data)
+    return generate_deliveries(order_df, delivery_agent_df, delivery_start_id, restaurant_df)
 
 
 def update_menu_item_ratings(order_items_df,menu_df):
-    for _,items in menu_df.iterrows():
-        menu_id = items['MenuItemID']
-        avg_of_menu_item_ratings = order_items_df[order_items_df['MenuItemID'] == menu_id]['Ratings'].agg('mean')
-        menu_df.loc[menu_df['MenuItemID'] == menu_id,'Ratings'] = round(avg_of_menu_item_ratings,1)
+    # One groupby over all order items instead of a filter per menu item
+    apply_menu_item_ratings(menu_df, menu_item_ratings(order_items_df))
 
 
 def update_restaurant_ratings(menu_df,restaurant_df):
-    for _,restaurant in restaurant_df.iterrows():
-        restaurant_id = restaurant['RestaurantID']
-        avg_of_restaurant_ratings = menu_df[menu_df['RestaurantID'] == restaurant_id]['Ratings'].agg('mean')
-        restaurant_df.loc[restaurant_df['RestaurantID'] == restaurant_id, 'Ratings'] = round(avg_of_restaurant_ratings,1)
+    apply_restaurant_ratings(restaurant_df, restaurant_ratings(menu_df))
 
 
 
@@ -1312,6 +923,7 @@ restaurant_df = pd.read_csv('data5/restaurant.csv')
 # restaurant_df = restaurant_df.sample(1000) # to update some restaunrants
 restaurant_df['CreatedDate'] = pd.to_datetime(restaurant_df['CreatedDate'])
 restaurant_df = restaurant_df[restaurant_df['CreatedDate'].dt.year.isin([2020])]
+coupon_catalog = CouponCatalog.from_restaurants(restaurant_df)
 print('filtered customer data', restaurant_df)
 
 menu_df = pd.read_csv('data5/menu_items.csv') ## menu_items.csv
@@ -1347,7 +959,7 @@ print('filtered customer data', delivery_agent_df)
 # print('Location Data Generated')
 
 
-# restaurant_df = generate_restaurant_data(RESTAURANT_START_ID, RESTAURANT_END_ID, location_df)
+# restaurant_df, coupon_catalog = generate_restaurant_data(RESTAURANT_START_ID, RESTAURANT_END_ID, location_df)
 # print('Restaurant Data Generated')
 
 
@@ -1371,24 +983,29 @@ print('filtered customer data', delivery_agent_df)
 # print('Delivery Agent Data Generated')
 
 
-order_df = generate_orders_data(ORDER_START_ID, ORDER_END_ID, customer_df, restaurant_df, address_df, location_df)
+order_df = generate_orders_data(0, 0, customer_df, restaurant_df, address_df, location_df)
+order_df['OrderID'] += id_registry.allocate('orders', len(order_df), ORDER_START_ID)
 print('order data generated')
 
 
-order_items_df = generate_order_items_data(ORDER_ITEMS_START_ID,order_df, menu_df)
+order_items_df = generate_order_items_data(0,order_df, menu_df)
+order_items_df['OrderItemID'] += id_registry.allocate('order_items', len(order_items_df), ORDER_ITEMS_START_ID)
 print('order item data generated')
+
+order_df = settle_orders(order_df, order_items_df, coupon_catalog.offered_for_orders(order_df))
 order_df = order_df[(order_df['TotalAmount'] != 0)]
 print('order totalprice and all updated')
 
 
-delivery_df = generate_delivery_data(order_df, delivery_agent_df, DELIVERY_START_ID,restaurant_df)
+delivery_df = generate_delivery_data(order_df, delivery_agent_df, 0,restaurant_df)
+delivery_df['DeliveryID'] += id_registry.allocate('delivery', len(delivery_df), DELIVERY_START_ID)
 print('delivered')
 
 
 
     # Remove temporary columns
-if 'RestaurantCoupons' in order_df.columns:
-    order_df = order_df.drop(columns=['RestaurantCoupons'])
+if 'CouponsOffered' in order_df.columns:
+    order_df = order_df.drop(columns=['CouponsOffered'])
     
 if 'AddressID' in order_df.columns:
     order_df = order_df.drop(columns=['AddressID'])
@@ -1400,13 +1017,11 @@ if 'LocationID' in address_df.columns:
     address_df =  address_df.drop(columns=['LocationID'])
 
 
-order_items_df_old = pd.read_csv('data1/order_items.csv')
-order_items_df_old1 = pd.read_csv('data5/order_items.csv')
-
-order_items_df_merged = pd.concat([order_items_df_old1, order_items_df_old], ignore_index=True)
-order_items_df_merged = pd.concat([order_items_df, order_items_df_merged], ignore_index=True)
+# fold this batch into the running rating totals
+rating_state = load_rating_state()
+rating_state.apply_batch(order_items_df, RATING_BATCH)
 
-update_menu_item_ratings(order_items_df_merged,menu_df)
+apply_menu_item_ratings(menu_df, rating_state.menu_item_ratings())
 print('menu rattings updated')
 update_restaurant_ratings(menu_df,restaurant_df)    
 print('restaurant rattings updated')
@@ -1426,6 +1041,7 @@ menu_df.to_csv('data6/menu_items.csv', index=False)
 order_df.to_csv('data6/orders.csv', index=False)
 order_items_df.to_csv('data6/order_items.csv', index=False)
 delivery_df.to_csv('data6/delivery.csv', index=False)
+rating_state.save(RATING_STATE_PATH)
 
 
 end_time = datetime.now()
@@ -1,22 +1,48 @@
 import pandas as pd
+import os
 
-menu_file_1 = 'data1/menu_items.csv'
-menu_file_2 = 'data2/menu_items.csv'
+from output_layer import get_backend, read_table
+from merge_store import build_merge_store, is_current, upsert_batches
 
+## 'csv' or 'parquet'
+OUTPUT_FORMAT = 'csv'
 
-def sync_updated_menu_prices(main_csv_path, updated_csv_path):
+## Update batches, applied oldest first onto the data1 tables kept in the merge store (state/merged).
+## Only the key-range partitions a batch touches are rewritten, data1 itself is left as generated:
+## generate_new_orders builds its dimension store from the merge store wherever it is current.
+## A table's store is rebuilt from data1 when data1 was regenerated since.
+UPDATE_FOLDERS = ['data2']
+SYNC_TABLES = ['menu_items', 'restaurant', 'customer', 'customer_address', 'delivery_agent']
 
-    main_menu_df = pd.read_csv(main_csv_path)
-    updated_menu_df = pd.read_csv(updated_csv_path)
-    
-    main_menu_df.set_index('MenuItemID', inplace=True)
-    updated_menu_df.set_index('MenuItemID', inplace=True)
-    
-    main_menu_df.update(updated_menu_df[['Price']])
-    
-    main_menu_df.reset_index(inplace=True)
-    
-    main_menu_df.to_csv(main_csv_path, index=False)
-    print(f"Prices and other updates synced from {updated_csv_path} to {main_csv_path}.")
+backend = get_backend(OUTPUT_FORMAT)
 
-sync_updated_menu_prices(menu_file_1, menu_file_2)
\ No newline at end of file
+
+def batch_path(folder, table):
+    # delivery_agent is kept as JSON next to the csv files
+    if table == 'delivery_agent' and OUTPUT_FORMAT == 'csv':
+        return os.path.join(folder, 'delivery_agent.json')
+    return backend.path(folder, table)
+
+
+def read_batch(folder, table):
+    path = batch_path(folder, table)
+    if not os.path.exists(path):
+        return None
+    if path.endswith('.json'):
+        return pd.read_json(path)
+    return read_table(folder, table, output_format=OUTPUT_FORMAT)
+
+
+def sync_updates(table, update_folders):
+    if not is_current(table):
+        build_merge_store(table, read_batch('data1', table), source_path=batch_path('data1', table))
+        print(f"merge store for {table} built from data1")
+
+    batches = [batch for batch in (read_batch(folder, table) for folder in update_folders) if batch is not None]
+    stats = upsert_batches(table, batches)
+    print(f"{table}: {stats['updated']} updated, {stats['inserted']} inserted from {update_folders}, "
+          f"{stats['partitions_written']} partitions rewritten.")
+
+
+for table in SYNC_TABLES:
+    sync_updates(table, UPDATE_FOLDERS)
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in Main/ and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rng
+
+
+@pytest.fixture(autouse=True)
+def seeded_streams():
+    # Every test draws from the same substreams, whatever ran before it
+    rng.seed_streams(1234)
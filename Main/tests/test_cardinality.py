@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardinality import cap_counts, plan_counts, split_total
+
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parent_weights(num_parents):
+    return np.arange(1, num_parents + 1)
+
+
+@pytest.mark.parametrize('total, num_parents, minimum', [(1000, 37, 1), (10, 37, 1), (0, 5, 0), (123456, 1, 2)])
+def test_split_total_is_exact(total, num_parents, minimum):
+    counts = split_total(total, parent_weights(num_parents), minimum)
+    assert counts.sum() == total
+    assert len(counts) == num_parents
+    if total >= minimum * num_parents:
+        assert counts.min() >= minimum
+
+
+def test_split_total_over_no_parents():
+    assert len(split_total(0, [])) == 0
+    with pytest.raises(ValueError):
+        split_total(5, [])
+
+
+def test_plan_counts_keeps_the_total():
+    assert plan_counts(4321, 500, 1, 5).sum() == 4321
+
+
+def test_cap_counts_respects_capacity_and_keeps_the_total_when_it_fits():
+    planned = np.array([5, 1, 8, 0, 3])
+    capacity = np.array([2, 10, 3, 4, 3])
+    capped = cap_counts(planned, capacity)
+    assert (capped <= capacity).all()
+    assert capped.sum() == planned.sum()
+
+
+
+def test_exact_run_hits_every_target(tmp_path):
+    targets = {'location': 5, 'restaurant': 60, 'menu_items': 700, 'customer': 80, 'customer_address': 130,
+               'login_audit': 200, 'delivery_agent': 40, 'orders': 300, 'order_items': 520}
+    spec = tmp_path / 'spec.toml'
+    spec.write_text('[run]\nseed = 7\nexact = true\noutput_folder = "out"\nrun_date = 2026-01-01T00:00:00\n\n[rows]\n'
+                    + ''.join(f'{table} = {count}\n' for table, count in targets.items()))
+
+    subprocess.run([sys.executable, os.path.join(MAIN_DIR, 'cli.py'), 'generate', str(spec)], cwd=tmp_path,
+                   check=True, capture_output=True)
+
+    for table, count in targets.items():
+        assert len(pd.read_csv(tmp_path / 'out' / f'{table}.csv')) == count, table
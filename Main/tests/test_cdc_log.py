@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from cdc_log import append_changes, change_records, delete_records, insert_records, read_changes, replay
+from scd_engine import choice, integers, mutate_sample, optional, uniform
+
+
+def make_customers(num_rows=50):
+    ids = np.arange(1, num_rows + 1)
+    return pd.DataFrame({
+        'CustomerID': ids,
+        'Full_Name': [f'Customer {i}' for i in ids],
+        'Mobile_no': 9000000000 + ids,
+        'Gender': np.where(ids % 2, 'Male', 'Female'),
+        'Rating': np.round(3 + (ids % 20) / 10, 1),
+        'ModifiedDate': pd.Timestamp('2025-01-01 10:00:00') + pd.to_timedelta(ids, unit='min'),
+    })
+
+
+def test_replay_of_an_update_batch_equals_the_batch(tmp_path):
+    # Update_data writes the mutated rows to data2 and their changed cells to the log: replaying the log
+    # over data1 gives data2's rows back and leaves the other rows alone
+    log_path = str(tmp_path / 'cdc')
+    data1 = make_customers()
+    data2 = mutate_sample(data1, 20, {
+        'Mobile_no': integers(7000000000, 9999999999),
+        'Gender': optional(choice(['Male', 'Female']), 0.5),
+        'Rating': uniform(3.0, 5.0),
+    }, modified_at='2025-02-01 08:30:00')
+    append_changes(change_records('customer', 'CustomerID', data1, data2, data2['ModifiedDate'].max()), log_path)
+
+    replayed = replay(data1, 'customer', 'CustomerID', log_path=log_path).set_index('CustomerID')
+
+    pd.testing.assert_frame_equal(replayed.loc[data2['CustomerID']], data2.set_index('CustomerID'), check_dtype=False)
+    untouched = data1[~data1['CustomerID'].isin(data2['CustomerID'])].set_index('CustomerID')
+    pd.testing.assert_frame_equal(replayed.loc[untouched.index], untouched, check_dtype=False)
+
+
+def test_replay_applies_inserts_and_deletes_in_order(tmp_path):
+    log_path = str(tmp_path / 'cdc')
+    data1 = make_customers(5)
+    new_rows = make_customers(7).iloc[5:]
+    append_changes(insert_records('customer', 'CustomerID', new_rows, '2025-02-01'), log_path)
+    append_changes(delete_records('customer', [2, 6], '2025-02-02'), log_path)
+
+    assert len(read_changes('customer', until='2025-02-01', log_path=log_path)) == 2 * (len(new_rows.columns) - 1)
+    as_of_first = replay(data1, 'customer', 'CustomerID', until='2025-02-01', log_path=log_path)
+    assert as_of_first['CustomerID'].tolist() == [1, 2, 3, 4, 5, 6, 7]
+    latest = replay(data1, 'customer', 'CustomerID', log_path=log_path)
+    assert sorted(latest['CustomerID']) == [1, 3, 4, 5, 7]
+    assert latest.set_index('CustomerID').loc[7, 'Full_Name'] == 'Customer 7'
+
+
+def test_replay_onto_a_csv_base_keeps_its_timestamp_text(tmp_path):
+    # Update_data reads data1 from csv, so ModifiedDate is text there; the replayed rows have to read like
+    # data2/customer.csv, not mix in the ISO 'T' strings the log stores
+    log_path = str(tmp_path / 'cdc')
+    make_customers().to_csv(tmp_path / 'customer.csv', index=False)
+    data1 = pd.read_csv(tmp_path / 'customer.csv')
+    data2 = mutate_sample(data1, 10, {'Rating': uniform(3.0, 5.0)}, modified_at='2025-02-01 08:30:00')
+    data2.to_csv(tmp_path / 'data2_customer.csv', index=False)
+    append_changes(change_records('customer', 'CustomerID', data1, data2, data2['ModifiedDate'].max()), log_path)
+
+    replayed = replay(data1, 'customer', 'CustomerID', log_path=log_path).set_index('CustomerID')
+
+    expected = pd.read_csv(tmp_path / 'data2_customer.csv').set_index('CustomerID')
+    pd.testing.assert_frame_equal(replayed.loc[expected.index], expected)
+    assert not replayed['ModifiedDate'].str.contains('T').any()
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_items(folder, ids, quantity):
+    os.makedirs(folder)
+    pd.DataFrame({'OrderItemID': ids, 'OrderID': ids, 'Quantity': quantity}).to_csv(
+        os.path.join(folder, 'order_items.csv'), index=False)
+
+
+def test_newest_folder_wins_per_key(tmp_path):
+    write_items(tmp_path / 'data1', [1, 2, 3, 3], [1, 1, 1, 9])
+    write_items(tmp_path / 'data2', [2, 4], [2, 2])
+    write_items(tmp_path / 'data5', [3], [5])
+
+    result = subprocess.run([sys.executable, os.path.join(MAIN_DIR, 'combine.py')], cwd=tmp_path,
+                            check=True, capture_output=True, text=True)
+
+    combined = pd.read_csv(tmp_path / 'temp' / 'combined.csv').set_index('OrderItemID').sort_index()
+    assert combined['Quantity'].to_dict() == {1: 1, 2: 2, 3: 5, 4: 2}
+    assert '7 rows read, 3 duplicates dropped, 4 written' in result.stdout
+    assert os.listdir(tmp_path / 'temp') == ['combined.csv']  # the key set is removed
@@ -0,0 +1,40 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from coupon_catalog import CouponCatalog
+
+
+RESTAURANTS = pd.DataFrame({
+    'RestaurantID': [1, 2, 3],
+    'Coupons': [
+        json.dumps([{'code': 'CREDITCARD_1', 'min_amount': 807, 'discount_amount': 154,
+                     'description': '₹150 off with Credit Card', 'payment_method': 'CreditCard'},
+                    {'code': 'FESTIVAL_1', 'min_amount': 1392, 'discount_amount': 278,
+                     'description': '₹300 off', 'payment_method': None}]),
+        json.dumps([{'code': 'FIRSTORDER_2', 'min_amount': 270, 'discount_amount': 78,
+                     'description': None, 'payment_method': None}]),
+        np.nan,
+    ],
+})
+
+
+def test_json_column_round_trip():
+    catalog = CouponCatalog.from_restaurants(RESTAURANTS)
+
+    assert len(catalog) == 3
+    assert catalog.lookup(2)['is_first_order'].tolist() == [True]
+    assert len(catalog.lookup(3)) == 0
+    column = catalog.to_json_column([3, 2, 1, 4])
+    assert list(column[:3]) == ['[]', RESTAURANTS['Coupons'][1], RESTAURANTS['Coupons'][0]]
+    assert column[3] == '[]'
+
+
+def test_offered_for_orders_only_lists_orders_with_coupons_offered():
+    catalog = CouponCatalog.from_restaurants(RESTAURANTS)
+    orders = pd.DataFrame({'OrderID': [10, 11, 12], 'RestaurantID': [1, 1, 2], 'CouponsOffered': [True, False, True]})
+
+    offered = catalog.offered_for_orders(orders)
+
+    assert list(zip(offered['OrderID'], offered['code'])) == [(10, 'CREDITCARD_1'), (10, 'FESTIVAL_1'), (12, 'FIRSTORDER_2')]
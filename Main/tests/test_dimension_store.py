@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+
+from dimension_store import build_dimension_store, load_dimension_window, stale_dimension_tables
+from merge_store import build_merge_store, upsert_batches
+from output_layer import read_table
+
+
+TABLES = ['delivery_agent']
+
+
+def write_agents(folder, created):
+    os.makedirs(folder, exist_ok=True)
+    pd.DataFrame({
+        'DeliveryAgentID': range(1, len(created) + 1),
+        'Full_Name': 'Agent',
+        'Rating': 4.2,
+        'CreatedDate': created,
+        'ModifiedDate': '2025-06-01 00:00:00',
+    }).to_csv(os.path.join(folder, 'delivery_agent.csv'), index=False)
+
+
+def test_store_is_rebuilt_only_when_its_source_changes(tmp_path):
+    source, store = str(tmp_path / 'data1'), str(tmp_path / 'dimensions')
+    write_agents(source, ['2024-01-05 10:00:00', '2024-02-10 11:30:00', '2024-02-28 23:59:59'])
+
+    assert stale_dimension_tables(source, store, tables=TABLES) == TABLES
+    build_dimension_store(source, store, tables=TABLES)
+    assert stale_dimension_tables(source, store, tables=TABLES) == []
+
+    window = load_dimension_window('delivery_agent', '2024-02-01', '2024-02-28 23:59:59', store_path=store)
+    assert window['DeliveryAgentID'].tolist() == [2]
+    assert window['CreatedDate'].iloc[0] == pd.Timestamp('2024-02-10 11:30:00')
+
+    write_agents(source, ['2024-01-05 10:00:00', '2024-02-10 11:30:00', '2024-02-28 23:59:59', '2024-03-01 00:00:00'])
+    assert stale_dimension_tables(source, store, tables=TABLES) == TABLES
+
+
+def test_synced_tables_are_read_from_a_current_merge_store(tmp_path):
+    source, store, merged = str(tmp_path / 'data1'), str(tmp_path / 'dimensions'), str(tmp_path / 'merged')
+    write_agents(source, ['2024-01-05 10:00:00', '2024-02-10 11:30:00'])
+    agents = read_table(source, 'delivery_agent')
+    build_merge_store('delivery_agent', agents, store_path=merged,
+                      source_path=os.path.join(source, 'delivery_agent.csv'))
+    upsert_batches('delivery_agent', [pd.DataFrame({'DeliveryAgentID': [2], 'Rating': [1.5]})], store_path=merged)
+
+    build_dimension_store(source, store, tables=TABLES, merge_store_path=merged)
+    window = load_dimension_window('delivery_agent', '2024-01-01', '2024-03-01', store_path=store)
+    assert window.set_index('DeliveryAgentID')['Rating'].to_dict() == {1: 4.2, 2: 1.5}
+    assert stale_dimension_tables(source, store, tables=TABLES, merge_store_path=merged) == []
+
+    # A later sync rewrites a partition, a regenerated data1 makes the merge store stale: both rebuild
+    upsert_batches('delivery_agent', [pd.DataFrame({'DeliveryAgentID': [2], 'Rating': [2.5]})], store_path=merged)
+    assert stale_dimension_tables(source, store, tables=TABLES, merge_store_path=merged) == TABLES
+    build_dimension_store(source, store, tables=TABLES, merge_store_path=merged)
+    write_agents(source, ['2024-01-05 10:00:00'])
+    assert stale_dimension_tables(source, store, tables=TABLES, merge_store_path=merged) == TABLES
+    build_dimension_store(source, store, tables=TABLES, merge_store_path=merged)
+    window = load_dimension_window('delivery_agent', '2024-01-01', '2024-03-01', store_path=store)
+    assert window['Rating'].tolist() == [4.2]
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from event_stream import EventEmitter, RotatingFileSink, order_events
+
+
+def test_rotating_file_sink_rotates_and_keeps_the_newest_files(tmp_path):
+    sink = RotatingFileSink(str(tmp_path), max_bytes=10, max_files=2)
+    for line in [b'aaaa\n', b'bbbb\n', b'cccc\n', b'dddd\n', b'eeeeeeeeeeeeeeee\n']:
+        sink.write(line)
+    sink.close()
+
+    assert sorted(os.listdir(tmp_path)) == ['events-000002.ndjson', 'events-000003.ndjson']
+    assert (tmp_path / 'events-000002.ndjson').read_bytes() == b'cccc\ndddd\n'
+    assert (tmp_path / 'events-000003.ndjson').read_bytes() == b'eeeeeeeeeeeeeeee\n'  # never split
+
+
+def test_order_events_come_in_event_time_order():
+    orders = pd.DataFrame({'OrderID': [2, 1], 'CreatedDate': ['2026-01-01 10:05:00', '2026-01-01 10:00:00']})
+    items = pd.DataFrame({'OrderItemID': [7, 8], 'OrderID': [1, 2],
+                          'CreatedDate': ['2026-01-01 10:00:00', '2026-01-01 10:05:00']})
+    delivery = pd.DataFrame({'DeliveryID': [3, 4], 'OrderID': [1, 2],
+                             'DeliveryDate': ['2026-01-01 10:30:00', None],
+                             'CreatedDate': ['2026-01-01 10:00:00', '2026-01-01 10:05:00']})
+
+    events = order_events(orders, items, delivery)
+
+    assert list(zip(events['type'], events['key'])) == [
+        ('order', 1), ('order_item', 7), ('order', 2), ('order_item', 8), ('delivery', 4), ('delivery', 3)]
+    first = json.loads(events['line'][0])
+    assert first['ts'] == '2026-01-01T10:00:00' and first['data']['OrderID'] == 1
+
+
+class FailingSink:
+    def __init__(self):
+        self.closed = False
+
+    def write(self, data):
+        raise BrokenPipeError('consumer went away')
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_with_a_dead_sink_writer_raises_instead_of_hanging():
+    sink = FailingSink()
+    emitter = EventEmitter(sink, backpressure='drop', queue_batches=1, report_interval=None)
+    emitter.enqueue(['{}'], ['order'])
+    emitter.writer.join(timeout=5)
+    emitter.queue.put_nowait((b'{}\n', 1))  # queued before the writer died, nobody reads it any more
+
+    outcome = {}
+
+    def close():
+        try:
+            emitter.close()
+        except BrokenPipeError as error:
+            outcome['error'] = error
+    closing = threading.Thread(target=close, daemon=True)
+    closing.start()
+    closing.join(timeout=5)
+
+    assert not closing.is_alive()
+    assert isinstance(outcome.get('error'), BrokenPipeError)
+    assert sink.closed
+
+
+def test_a_sink_error_is_raised_once():
+    emitter = EventEmitter(FailingSink(), report_interval=None)
+    emitter.enqueue(['{}'], ['order'])
+    emitter.writer.join(timeout=5)
+
+    with pytest.raises(BrokenPipeError):
+        emitter.enqueue(['{}'], ['order'])
+    emitter.close()  # already raised by enqueue
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from id_registry import IDRegistry
+
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_allocate_hands_out_disjoint_ranges(tmp_path):
+    registry = IDRegistry(str(tmp_path / 'state' / 'ids.sqlite'))
+    assert registry.last_id('orders') is None
+    assert registry.allocate('orders', 10, first_start_id=500) == 500
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        starts = list(pool.map(lambda _: registry.allocate('orders', 5), range(40)))
+
+    assert sorted(starts) == list(range(510, 510 + 40 * 5, 5))
+    assert registry.last_id('orders') == 709
+
+
+def test_record_never_lowers_a_watermark(tmp_path):
+    registry = IDRegistry(str(tmp_path / 'ids.sqlite'))
+    registry.record('orders', 78391)
+    registry.record('orders', 12026)  # a smaller regeneration afterwards
+    registry.record('delivery', 40)
+
+    assert registry.watermarks() == {'delivery': 40, 'orders': 78391}
+    assert registry.allocate('orders', 1) == 78392
+
+
+def test_runs_outside_data1_leave_the_registry_alone(tmp_path):
+    registry = IDRegistry(str(tmp_path / 'state' / 'id_registry.sqlite'))
+    registry.record('orders', 78391)
+    (tmp_path / 'spec.toml').write_text('[run]\nseed = 3\nexact = true\noutput_folder = "out_exact"\n'
+                                        'run_date = 2026-01-01T00:00:00\n\n[rows]\nlocation = 2\ncustomer = 20\n')
+
+    subprocess.run([sys.executable, os.path.join(MAIN_DIR, 'cli.py'), 'generate', 'spec.toml'], cwd=tmp_path,
+                   check=True, capture_output=True)
+
+    assert os.path.exists(tmp_path / 'out_exact' / 'orders.csv')
+    assert registry.watermarks() == {'orders': 78391}
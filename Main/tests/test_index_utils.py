@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from index_utils import distinct_picks, grouped_searchsorted, resolve_relative
+import rng
+
+
+def test_grouped_searchsorted_counts_strictly_lower_values_of_the_same_group():
+    stream = rng.stream('test')
+    data_groups = np.sort(stream.integers(0, 5, size=200))
+    data_values = stream.integers(0, 50, size=200)
+    order = np.lexsort((data_values, data_groups))
+    data_groups, data_values = data_groups[order], data_values[order]
+    query_groups = stream.integers(0, 6, size=300)
+    query_values = stream.integers(-5, 55, size=300)
+
+    counts = grouped_searchsorted(data_groups, data_values, query_groups, query_values)
+
+    expected = [np.sum((data_groups == g) & (data_values < v)) for g, v in zip(query_groups, query_values)]
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_resolve_relative_offsets_and_errors():
+    reference = datetime(2026, 1, 1, 12, 0)
+    assert resolve_relative('now', reference) == reference
+    assert resolve_relative('-2d', reference) == datetime(2025, 12, 30, 12, 0)
+    assert resolve_relative('-6m', reference) == datetime(2026, 1, 1, 11, 54)  # minutes, like Faker
+    assert resolve_relative(datetime(2020, 5, 1), reference) == datetime(2020, 5, 1)
+    with pytest.raises(ValueError):
+        resolve_relative('yesterday', reference)
+
+
+def test_distinct_picks_are_distinct_per_row_and_cover_every_value():
+    counts = np.array([1, 3, 0, 2, 5, 3] * 200)
+    picks = distinct_picks(counts, 4, 'test.picks')
+
+    assert len(picks) == np.minimum(counts, 4).sum()
+    rows = np.split(picks, np.cumsum(np.minimum(counts, 4))[:-1])
+    assert all(len(set(row)) == len(row) and set(row) <= {0, 1, 2, 3} for row in rows)
+    assert set(rows[4].tolist()) == {0, 1, 2, 3}
+    # Uniform: every value is picked about equally often as a first pick
+    first = np.array([row[0] for row in rows if len(row)])
+    assert np.bincount(first, minlength=4).min() > len(first) / 4 * 0.8
@@ -0,0 +1,61 @@
+import pandas as pd
+
+from merge_store import PARTITION_KEYS, build_merge_store, is_current, read_merged, upsert_batches
+
+
+def make_agents(ids):
+    return pd.DataFrame({
+        'DeliveryAgentID': ids,
+        'Full_Name': [f'Agent {i}' for i in ids],
+        'Rating': [4.0] * len(ids),
+        'CreatedDate': pd.to_datetime(['2024-03-01 08:15:30'] * len(ids)),
+        'ModifiedDate': pd.to_datetime(['2025-01-02 09:00:00'] * len(ids)),
+    })
+
+
+def test_round_trip_keeps_rows_and_timestamps(tmp_path):
+    store = str(tmp_path)
+    base = make_agents([1, 2, PARTITION_KEYS + 1])
+    build_merge_store('delivery_agent', base, store_path=store)
+
+    # A re-read JSON batch carries epoch milliseconds, a csv batch strings
+    updates = pd.DataFrame({'DeliveryAgentID': [2, 5], 'Rating': [3.5, 4.8],
+                            'ModifiedDate': [pd.Timestamp('2025-06-01 12:30:00').value // 10 ** 6,
+                                             pd.Timestamp('2025-06-02 07:45:10').value // 10 ** 6]})
+    late = pd.DataFrame({'DeliveryAgentID': [2], 'ModifiedDate': ['2025-07-01 00:00:01']})
+    stats = upsert_batches('delivery_agent', [updates, late], store_path=store)
+
+    assert stats == {'partitions_written': 1, 'updated': 2, 'inserted': 1}
+    merged = read_merged('delivery_agent', store_path=store).set_index('DeliveryAgentID').sort_index()
+    assert list(merged.index) == [1, 2, 5, PARTITION_KEYS + 1]
+    assert pd.api.types.is_datetime64_any_dtype(merged['ModifiedDate'])
+    assert merged.loc[1, 'ModifiedDate'] == pd.Timestamp('2025-01-02 09:00:00')
+    assert merged.loc[2, 'ModifiedDate'] == pd.Timestamp('2025-07-01 00:00:01')  # the later batch wins
+    assert merged.loc[2, 'Rating'] == 3.5
+    assert merged.loc[5, 'ModifiedDate'] == pd.Timestamp('2025-06-02 07:45:10')
+    assert pd.isna(merged.loc[5, 'CreatedDate'])
+    assert merged.loc[PARTITION_KEYS + 1, 'CreatedDate'] == pd.Timestamp('2024-03-01 08:15:30')
+
+
+def test_repeated_batches_rewrite_nothing(tmp_path):
+    store = str(tmp_path)
+    build_merge_store('delivery_agent', make_agents([1, 2, PARTITION_KEYS + 1]), store_path=store)
+    updates = pd.DataFrame({'DeliveryAgentID': [2], 'Rating': [3.5]})
+
+    assert upsert_batches('delivery_agent', [updates], store_path=store)['partitions_written'] == 1
+    assert upsert_batches('delivery_agent', [updates], store_path=store)['partitions_written'] == 0
+
+
+def test_a_store_is_current_until_its_source_changes(tmp_path):
+    source = tmp_path / 'delivery_agent.csv'
+    agents = make_agents([1, 2])
+    agents.to_csv(source, index=False)
+    store = str(tmp_path / 'merged')
+
+    assert not is_current('delivery_agent', store)
+    build_merge_store('delivery_agent', agents, store_path=store, source_path=str(source))
+    assert is_current('delivery_agent', store)
+    assert len(read_merged('delivery_agent', store_path=store)) == 2  # the source record is not read as data
+
+    make_agents([1, 2, 3]).to_csv(source, index=False)
+    assert not is_current('delivery_agent', store)
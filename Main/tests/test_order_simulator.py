@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from order_simulator import calendar_keys, festival_table, month_day_key
+
+
+def test_festival_table_ranges_wrap_and_multiply():
+    table = festival_table([('10-20', '11-15', 1.5), ('12-20', '01-05', 1.2), ('11-10', '11-12', 2.0)])
+
+    assert table[month_day_key('10-19')] == 1
+    assert table[month_day_key('10-20')] == 1.5
+    assert table[month_day_key('11-15')] == 1.5
+    assert table[month_day_key('11-11')] == 3.0  # overlapping seasons multiply
+    assert table[month_day_key('12-31')] == 1.2
+    assert table[month_day_key('01-05')] == 1.2  # a season across the new year wraps
+    assert table[month_day_key('01-06')] == 1
+    assert table[month_day_key('06-15')] == 1
+
+
+def test_calendar_keys_match_pandas():
+    stamps = pd.date_range('1999-12-30', '2031-03-02', periods=5000).floor('s')
+    ns = stamps.as_unit('ns').asi8
+
+    hour, weekday, month_day = calendar_keys(ns)
+
+    np.testing.assert_array_equal(hour, stamps.hour)
+    np.testing.assert_array_equal(weekday, stamps.weekday)
+    np.testing.assert_array_equal(month_day, stamps.month * 32 + stamps.day)
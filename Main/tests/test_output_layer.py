@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from output_layer import get_backend, parse_timestamps, read_table, write_table
+
+
+def make_menu_items():
+    return pd.DataFrame({
+        'MenuItemID': [1, 2, 3],
+        'RestaurantID': [7, 7, 9],
+        'ItemName': ['Paneer Tikka', 'Masala Dosa', None],
+        'Description': ['Smoky', 'Soft', 'Crisp'],
+        'Price': [250, 120, 90],
+        'Category': ['Starter', 'Main Course', 'Starter'],
+        'Availability': [True, False, True],
+        'ItemType': ['Veg', 'Veg', 'Veg'],
+        'Ratings': [4.5, np.nan, 3.9],
+        'CreatedDate': pd.to_datetime(['2024-01-02 03:04:05', '2024-05-06 07:08:09', '2025-12-31 23:59:59']),
+        'ModifiedDate': pd.to_datetime(['2025-01-01 00:00:00', '2025-02-02 12:00:00', '2026-01-01 00:00:01']),
+    })
+
+
+def test_csv_round_trip_keeps_values(tmp_path):
+    menu = make_menu_items()
+    write_table(menu, str(tmp_path), 'menu_items', 'csv')
+
+    read = read_table(str(tmp_path), 'menu_items', output_format='csv')
+
+    assert list(read.columns) == list(menu.columns)
+    pd.testing.assert_frame_equal(read.drop(columns=['CreatedDate', 'ModifiedDate']),
+                                  menu.drop(columns=['CreatedDate', 'ModifiedDate']), check_dtype=False)
+    assert (pd.to_datetime(read['CreatedDate']) == menu['CreatedDate']).all()
+
+
+def test_parquet_round_trip_is_typed(tmp_path):
+    menu = make_menu_items()
+    write_table(menu, str(tmp_path), 'menu_items', 'parquet')
+
+    read = read_table(str(tmp_path), 'menu_items', output_format='parquet')
+
+    assert isinstance(read['Category'].dtype, pd.CategoricalDtype)
+    assert read['CreatedDate'].dtype == 'datetime64[s]'
+    assert read['Availability'].tolist() == [True, False, True]
+    assert read['ItemName'].isna().tolist() == [False, False, True]
+    pd.testing.assert_series_equal(read['ModifiedDate'], menu['ModifiedDate'].astype('datetime64[s]'))
+    assert read_table(str(tmp_path), 'menu_items', columns=['MenuItemID', 'Price'],
+                      output_format='parquet').columns.tolist() == ['MenuItemID', 'Price']
+
+
+def test_parquet_chunks_match_the_whole_table(tmp_path):
+    menu = make_menu_items()
+    backend = get_backend('parquet')
+    with backend.chunk_writer(str(tmp_path)) as writer:
+        writer.write('menu_items', menu.iloc[:2])
+        writer.write('menu_items', menu.iloc[2:])
+
+    chunks = list(backend.read_chunks(str(tmp_path), 'menu_items', chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    # Every chunk carries its own dictionary, so categories are compared by value
+    combined = pd.concat([chunk.astype({'Category': str}) for chunk in chunks], ignore_index=True)
+    pd.testing.assert_frame_equal(combined, backend.read(str(tmp_path), 'menu_items').astype({'Category': str}))
+
+
+def test_parse_timestamps_reads_numbers_as_epoch_milliseconds():
+    stamp = pd.Timestamp('2026-01-01 10:30:00')
+    parsed = parse_timestamps(pd.Series([stamp.value // 10 ** 6, '2026-01-02 00:00:00', None], dtype=object))
+    assert parsed.tolist()[:2] == [stamp, pd.Timestamp('2026-01-02')]
+    assert pd.isna(parsed[2])
+    with pytest.raises(ValueError):
+        parse_timestamps(pd.Series([True, False]))
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_backend('xlsx')
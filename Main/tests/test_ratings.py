@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from ratings import RatingState, load_rating_state, menu_item_ratings
+
+
+def make_items(menu_item_ids, ratings):
+    return pd.DataFrame({'MenuItemID': menu_item_ids, 'Ratings': ratings})
+
+
+def test_running_sums_match_the_mean_over_every_batch():
+    chunks = [make_items([1, 2, 2, 3], [4.0, 3.0, np.nan, 5.0]), make_items([2, 3, 4], [5.0, 2.0, np.nan])]
+    state = RatingState()
+    for chunk in chunks:
+        state.add(chunk, 'data1')
+
+    pd.testing.assert_series_equal(state.menu_item_ratings(), menu_item_ratings(pd.concat(chunks)).dropna(),
+                                  check_names=False)
+    assert state.batches() == ['data1']
+
+
+def test_applying_a_batch_again_replaces_it(tmp_path):
+    path = str(tmp_path / 'state' / 'ratings.csv')
+    state = RatingState.from_order_items(make_items([1, 2], [4.0, 2.0]), 'data1')
+    state.apply_batch(make_items([1], [2.0]), 'data4')
+    state.save(path)
+
+    rerun = RatingState.load(path)
+    rerun.apply_batch(make_items([1], [2.0]), 'data4')
+    assert rerun.menu_item_ratings().to_dict() == {1: 3.0, 2: 2.0}
+    rerun.apply_batch(make_items([2], [4.0]), 'data4')
+    assert rerun.menu_item_ratings().to_dict() == {1: 4.0, 2: 3.0}
+    assert rerun.batches() == ['data1', 'data4']
+
+
+def test_bootstrap_reads_every_order_items_folder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for folder, ratings in (('data1', [4.0, 5.0]), ('data5', [1.0, np.nan])):
+        os.makedirs(folder)
+        make_items([1, 2], ratings).to_csv(os.path.join(folder, 'order_items.csv'), index=False)
+    # A state saved before batches were recorded is rebuilt
+    os.makedirs('state')
+    pd.DataFrame({'MenuItemID': [1], 'RatingSum': [100.0], 'RatingCount': [1]}).to_csv('state/ratings.csv', index=False)
+
+    state = load_rating_state('state/ratings.csv')
+
+    assert state.batches() == ['data1', 'data5']
+    assert state.menu_item_ratings().to_dict() == {1: 2.5, 2: 5.0}
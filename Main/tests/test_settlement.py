@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from coupon_catalog import CouponCatalog
+from settlement import SETTLEMENT_COLUMNS, settle_orders
+
+
+def make_orders():
+    orders = pd.DataFrame({
+        'OrderID': [1, 2, 3, 4],
+        'RestaurantID': [10, 10, 20, 20],
+        'PaymentMethod': ['UPI', 'Cash', 'UPI', 'UPI'],
+        'IsFirstOrder': [True, False, False, True],
+        'CouponsOffered': [True, True, True, False],
+    })
+    for column in SETTLEMENT_COLUMNS:
+        orders[column] = 0
+    orders['CouponApplied'] = False
+    orders['CouponCode'] = None
+    return orders
+
+
+def make_catalog():
+    return CouponCatalog([
+        {'RestaurantID': 10, 'code': 'UPISAVE_10', 'min_amount': 400, 'discount_amount': 80, 'description': None,
+         'payment_method': 'UPI', 'is_first_order': False, 'rank': 0},
+        {'RestaurantID': 10, 'code': 'FIRSTORDER_10', 'min_amount': 300, 'discount_amount': 120, 'description': None,
+         'payment_method': None, 'is_first_order': True, 'rank': 1},
+        {'RestaurantID': 20, 'code': 'FESTIVAL_20', 'min_amount': 50, 'discount_amount': 1000, 'description': None,
+         'payment_method': None, 'is_first_order': False, 'rank': 0},
+    ])
+
+
+def test_settle_orders_totals_coupons_and_final_amount():
+    orders = make_orders()
+    items = pd.DataFrame({'OrderID': [1, 1, 2, 3], 'Subtotal': [300, 250, 700, 90]})
+    catalog = make_catalog()
+
+    settled = settle_orders(orders, items, catalog.offered_for_orders(orders)).set_index('OrderID')
+
+    assert list(settled.columns) == [c for c in orders.columns if c != 'OrderID']
+    assert settled['TotalAmount'].to_dict() == {1: 550, 2: 700, 3: 90, 4: 0}
+    # Order 1 is a first order paid by UPI: the bigger first-order coupon wins; order 2 pays cash and is not
+    # a first order, so neither coupon applies; order 3's coupon discount is larger than its total
+    assert settled['CouponCode'].to_dict()[1] == 'FIRSTORDER_10'
+    assert pd.isna(settled.loc[2, 'CouponCode'])
+    assert settled.loc[3, 'CouponCode'] == 'FESTIVAL_20'
+    assert settled['CouponApplied'].to_dict() == {1: True, 2: False, 3: True, 4: False}
+
+    has_items = settled.index != 4
+    expected = (np.maximum(settled['TotalAmount'] - settled['DiscountAmount'], 0) + settled['DeliveryCharges'])
+    np.testing.assert_array_equal(settled['FinalAmount'][has_items], expected[has_items])
+    assert settled.loc[3, 'FinalAmount'] == settled.loc[3, 'DeliveryCharges']
+
+
+def test_orders_without_items_keep_zero_amounts():
+    orders = make_orders()
+    items = pd.DataFrame({'OrderID': [1], 'Subtotal': [100]})
+
+    settled = settle_orders(orders, items, make_catalog().offered_for_orders(orders)).set_index('OrderID')
+
+    for column in ['TotalAmount', 'DeliveryCharges', 'DiscountAmount', 'FinalAmount']:
+        assert (settled.loc[[2, 3, 4], column] == 0).all()
+    assert not settled.loc[[2, 3, 4], 'CouponApplied'].any()
@@ -0,0 +1,53 @@
+import filecmp
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+import rng
+from sharding import generate_customer_shards, split_range
+
+
+MAIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN_DATE = datetime(2026, 1, 1)
+
+
+def test_split_range_covers_the_range_contiguously():
+    ranges = split_range(101, 10, 3)
+    assert ranges[0][0] == 101 and ranges[-1][1] == 111
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+
+
+def test_shards_do_not_depend_on_worker_scheduling(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the Faker pool cache goes to state/
+    import Main_DG as dg
+
+    rng.seed_streams(5)
+    location_df = dg.generate_location_data(1, 3)
+    restaurant_df, _ = dg.generate_restaurant_data(1, 1, location_df)
+    menu_df = dg.generate_menu_data(1, 1, restaurant_df)
+    restaurants = dg.order_restaurant_data(restaurant_df, menu_df)
+
+    def run(max_workers):
+        return generate_customer_shards(3, 5, RUN_DATE, location_df, restaurants, 1, 90, 1, 1, 270, 1,
+                                        max_workers=max_workers, settings={'HISTORY_START': '-5y'})
+
+    for serial, parallel in zip(run(1), run(3)):
+        pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_sharded_runs_are_byte_identical(tmp_path):
+    spec = ('[run]\nseed = 11\nworkers = 3\noutput_folder = "out"\nrun_date = 2026-01-01T00:00:00\n\n'
+            '[rows]\nlocation = 3\ncustomer = 300\n')
+    for run in ('first', 'second'):
+        os.makedirs(tmp_path / run)
+        (tmp_path / run / 'spec.toml').write_text(spec)
+        subprocess.run([sys.executable, os.path.join(MAIN_DIR, 'cli.py'), 'generate', 'spec.toml'],
+                       cwd=tmp_path / run, check=True, capture_output=True)
+
+    files = sorted(os.listdir(tmp_path / 'first' / 'out'))
+    assert 'orders.csv' in files
+    _, mismatch, errors = filecmp.cmpfiles(tmp_path / 'first' / 'out', tmp_path / 'second' / 'out', files, shallow=False)
+    assert mismatch == [] and errors == []
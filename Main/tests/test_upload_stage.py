@@ -0,0 +1,42 @@
+import gzip
+import os
+from datetime import date
+
+from upload_stage import FileSystemStore, UploadManifest, partition_prefix, upload_files
+
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_manifest_persists_and_notices_changed_files(tmp_path):
+    source = write(tmp_path / 'orders.csv', 'OrderID\n1\n')
+    manifest_path = str(tmp_path / 'state' / 'manifest.json')
+
+    manifest = UploadManifest(manifest_path)
+    assert not manifest.is_done('raw/orders.csv.gz', source)
+    manifest.add('raw/orders.csv.gz', source, 'etag-1')
+    assert manifest.is_done('raw/orders.csv.gz', source)
+
+    reloaded = UploadManifest(manifest_path)
+    assert reloaded.is_done('raw/orders.csv.gz', source)
+    assert reloaded.entries['raw/orders.csv.gz']['etag'] == 'etag-1'
+
+    write(source, 'OrderID\n1\n2\n')
+    assert not reloaded.is_done('raw/orders.csv.gz', source)
+
+
+def test_upload_files_resumes_with_missing_files(tmp_path):
+    sources = [write(tmp_path / f'{table}.csv', f'{table}\n') for table in ('orders', 'customer')]
+    store = FileSystemStore(str(tmp_path / 'bucket'))
+    manifest = UploadManifest(str(tmp_path / 'manifest.json'))
+    prefix = partition_prefix('raw', date(2026, 1, 1))
+
+    assert set(upload_files(sources[:1], store, prefix, manifest).values()) == {'uploaded'}
+    results = upload_files(sources, store, prefix, manifest)
+
+    assert results == {sources[0]: 'skipped', sources[1]: 'uploaded'}
+    with gzip.open(os.path.join(store.root, prefix, 'customer.csv.gz'), 'rt') as f:
+        assert f.read() == 'customer\n'
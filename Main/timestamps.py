@@ -0,0 +1,46 @@
+import numpy as np
+
+import rng
+
+from index_utils import NS_PER_SECOND, to_ns, scalar_to_ns, resolve_relative, uniform_seconds_between
+
+
+def bounds_ns(bound, size, reference=None):
+    # A scalar bound (datetime, timestamp string or, with a reference, a Faker-style offset such as '-5y')
+    # repeated size times, or a per-row column of bounds -> int64 nanoseconds
+    if np.ndim(bound) == 0:
+        if reference is not None:
+            bound = resolve_relative(bound, reference)
+        return np.full(size, scalar_to_ns(bound), dtype=np.int64)
+    return to_ns(bound)
+
+
+def sample_seconds_ns(lower_ns, upper_ns, weights=None, stream='timestamps'):
+    # Whole-second timestamps between per-row bounds. weights spread the draw over equal slices of
+    # every row's span, e.g. [1, 1, 4] makes the last third four times as likely as each other third.
+    if weights is None:
+        return uniform_seconds_between(lower_ns, upper_ns, stream)
+
+    lower_s = np.asarray(lower_ns, dtype=np.int64) // NS_PER_SECOND
+    upper_s = np.asarray(upper_ns, dtype=np.int64) // NS_PER_SECOND
+    span = np.maximum(upper_s - lower_s, 0)
+
+    p = np.asarray(weights, dtype=float)
+    p = p / p.sum()
+    fraction = (rng.stream(f'{stream}.slice').choice(len(p), size=len(lower_s), p=p)
+                + rng.stream(stream).random(len(lower_s))) / len(p)
+    offset = (fraction * (span + 1)).astype(np.int64)
+    return (lower_s + np.minimum(offset, span)) * NS_PER_SECOND
+
+
+def timestamps_between(lower, upper, size=None, weights=None, fill_rate=1.0, reference=None, stream='timestamps'):
+    # datetime64[ns] column of timestamps between lower and upper, either of which may be a scalar or a
+    # per-row column (e.g. the parent's CreatedDate). With fill_rate < 1 the remaining rows are NaT,
+    # for optional columns like ModifiedDate. stream names the rng substream, e.g. 'customer.CreatedDate'.
+    if size is None:
+        size = len(lower) if np.ndim(lower) else len(upper)
+    sampled = sample_seconds_ns(bounds_ns(lower, size, reference), bounds_ns(upper, size, reference), weights, stream)
+    stamps = sampled.astype('datetime64[ns]')
+    if fill_rate < 1:
+        stamps[rng.stream(f'{stream}.fill').random(size) >= fill_rate] = np.datetime64('NaT')
+    return stamps
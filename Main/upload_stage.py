@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import shutil
+import gzip
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+## MULTIPART TUNING: files above the threshold go up in parts of PART_SIZE, PART_CONCURRENCY parts at a time
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+PART_SIZE = 16 * 1024 * 1024
+PART_CONCURRENCY = 4
+MAX_ATTEMPTS = 10
+
+
+def partition_prefix(folder_prefix, run_date):
+    # <prefix>/<year>/<month>/<day>, the layout the bucket already uses (month and day not zero padded)
+    return f'{folder_prefix}/{run_date.year}/{run_date.month}/{run_date.day}'
+
+
+def gzip_file(path, folder):
+    # Streams path into <folder>/<name>.gz without loading it
+    gz_path = os.path.join(folder, os.path.basename(path) + '.gz')
+    with open(path, 'rb') as source, gzip.open(gz_path, 'wb', compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    return gz_path
+
+
+class S3Store:
+    # Bucket behind boto3; endpoint_url points it at an S3-compatible stand-in (MinIO, moto server)
+
+    def __init__(self, bucket, access_key=None, secret_key=None, endpoint_url=None):
+        import boto3
+        from botocore.config import Config
+        from boto3.s3.transfer import TransferConfig
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            's3',
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            endpoint_url=endpoint_url,
+            config=Config(retries={'max_attempts': MAX_ATTEMPTS, 'mode': 'adaptive'}),
+        )
+        self.transfer_config = TransferConfig(multipart_threshold=MULTIPART_THRESHOLD,
+                                              multipart_chunksize=PART_SIZE,
+                                              max_concurrency=PART_CONCURRENCY)
+
+    def upload(self, path, key, content_encoding=None):
+        extra_args = {'ContentEncoding': content_encoding} if content_encoding else None
+        self.client.upload_file(path, self.bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+        return self.client.head_object(Bucket=self.bucket, Key=key)['ETag'].strip('"')
+
+
+class FileSystemStore:
+    # Local stand-in for the bucket: objects are files under root, ETag is the MD5 of the content
+    # (what S3 returns for a single-part upload)
+
+    def __init__(self, root):
+        self.root = root
+
+    def upload(self, path, key, content_encoding=None):
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        md5 = hashlib.md5()
+        with open(path, 'rb') as source, open(target + '.tmp', 'wb') as out:
+            for block in iter(lambda: source.read(1024 * 1024), b''):
+                md5.update(block)
+                out.write(block)
+        os.replace(target + '.tmp', target)
+        return md5.hexdigest()
+
+
+class UploadManifest:
+    # Object key -> ETag and the size / mtime of the source file it was uploaded from. Saved after every
+    # finished upload, so an interrupted run resumes with the files that are still missing.
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def is_done(self, key, path):
+        entry = self.entries.get(key)
+        stat = os.stat(path)
+        return entry is not None and entry['source_size'] == stat.st_size and entry['source_mtime'] == stat.st_mtime
+
+    def add(self, key, path, etag):
+        stat = os.stat(path)
+        with self.lock:
+            self.entries[key] = {'etag': etag, 'source_size': stat.st_size, 'source_mtime': stat.st_mtime}
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(self.path + '.tmp', self.path)
+
+
+def upload_files(paths, store, prefix, manifest, max_workers=8, compress=True):
+    # Uploads every path to <prefix>/<file name>[.gz] on a thread pool, skipping files the manifest
+    # already has. Returns {path: 'uploaded' | 'skipped' | the exception}.
+    results = {}
+    pending = {}
+    for path in paths:
+        key = f'{prefix}/{os.path.basename(path)}' + ('.gz' if compress else '')
+        if manifest.is_done(key, path):
+            results[path] = 'skipped'
+        else:
+            pending[path] = key
+
+    def upload_one(path, key, work_dir):
+        source = gzip_file(path, work_dir) if compress else path
+        try:
+            etag = store.upload(source, key, 'gzip' if compress else None)
+        finally:
+            if source != path:
+                os.remove(source)
+        manifest.add(key, path, etag)
+
+    with tempfile.TemporaryDirectory() as work_dir, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(upload_one, path, key, work_dir): path for path, key in pending.items()}
+        for future in as_completed(futures):
+            path = futures[future]
+            error = future.exception()
+            results[path] = 'uploaded' if error is None else error
+    return results